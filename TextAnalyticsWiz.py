@@ -1,21 +1,35 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import time
-from google_play_scraper import Sort, reviews as gp_reviews, app as gp_app
-import re
+from google_play_scraper import Sort
 from wordcloud import WordCloud
 import matplotlib.pyplot as plt
 from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.probability import FreqDist
-from nltk.util import ngrams
 import altair as alt
-from collections import Counter
-from textblob import TextBlob
+from taxonomy import taxonomy_version, get_taxonomy
+import yaml
+from pipeline import stage_key, source_artifact
+from dedup import DedupPlan
+from jobs import get_runner, DONE, FAILED, CANCELLED
+from stages import normalize_stage, scrape_stage, backfill_stage, label_stage, sentiment_stage, topic_stage, warehouse_stage
+from warehouse import get_warehouse
+from streaming import read_snapshot, SENTIMENTS
+from backfill import read_backfill
+from normalize import NORMALIZE_VERSION
+from rollups import TrendRollups, FREQUENCIES, DIMENSIONS
+import polars_backend
+from polars_backend import ENGINES, DEFAULT_ENGINE
+import text_stats
+from keyness import build_keyness, keyness_from_counts, METRICS as KEYNESS_METRICS
+import ingest
+from shared_cache import get_shared_cache
+from session_store import get_registry
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from near_duplicates import near_duplicate_clusters, representatives_mask
+from search_index import ReviewIndex, filter_mask, search_reviews, reviews_with_word
 import nltk
-nltk.download('punkt')
 import plotly.express as px
-import io
 
 nltk.download('stopwords')
 
@@ -25,8 +39,10 @@ st.set_page_config(page_title="RevAI Fusion 360", layout="wide")
 # Initialize session state
 if 'logged_in' not in st.session_state:
     st.session_state['logged_in'] = False
-if 'reviews_data' not in st.session_state:
-    st.session_state['reviews_data'] = None
+if 'jobs' not in st.session_state:
+    st.session_state['jobs'] = {}
+if 'stage_results' not in st.session_state:
+    st.session_state['stage_results'] = {}
 
 # Helper function to download data as CSV
 def download_csv(data, filename):
@@ -38,67 +54,50 @@ def download_csv(data, filename):
         mime='text/csv',
     )
 
+# Engine for this session's column work; see polars_backend.py
+def analysis_engine():
+    return st.session_state.get('engine', DEFAULT_ENGINE)
+
+# Archives are read by worker processes once per upload, not on every rerun
+@st.cache_data(show_spinner="Reading archive...", max_entries=4)
+def cached_zip_reviews(file_id, _data, engine):
+    return ingest.read_zip(_data, engine=engine)
+
 # New helper function to process uploaded files
 def process_uploaded_file(uploaded_file):
-    """Process uploaded CSV or text file and return DataFrame with reviews"""
+    """Process an uploaded CSV, text, Parquet, Arrow, JSON Lines or zip file and return DataFrame with reviews"""
     try:
-        if uploaded_file.type == "text/csv":
-            # Read CSV file with encoding detection
-            try:
-                df = pd.read_csv(uploaded_file, encoding='utf-8')
-            except UnicodeDecodeError:
-                # Try different encodings
-                uploaded_file.seek(0)  # Reset file pointer
-                try:
-                    df = pd.read_csv(uploaded_file, encoding='latin-1')
-                except UnicodeDecodeError:
-                    uploaded_file.seek(0)
-                    df = pd.read_csv(uploaded_file, encoding='cp1252')
-            
-            # Try to identify the review column
-            review_columns = []
-            for col in df.columns:
-                col_lower = col.lower()
-                if any(keyword in col_lower for keyword in ['review', 'comment', 'feedback', 'text', 'content']):
-                    review_columns.append(col)
-            
-            if review_columns:
-                # Use the first identified review column
-                review_col = review_columns[0]
+        kind = ingest.file_format(uploaded_file.name) or {'text/csv': 'csv', 'text/plain': 'text'}.get(uploaded_file.type)
+        data = uploaded_file.getvalue()
+        if kind == 'zip':
+            # Every file in the archive, read in parallel and tagged with its name
+            reviews_df, skipped = cached_zip_reviews(uploaded_file.file_id, data, analysis_engine())
+            if skipped:
+                st.warning(f"Skipped {len(skipped)} file(s) without a supported format or review column: {', '.join(skipped[:10])}")
+            if reviews_df is None:
+                st.error("No reviews found in the archive.")
+                return None
+            st.write(f"Combined {reviews_df['Source'].nunique()} files from the archive")
+
+        elif kind == 'text':
+            # Split by lines and treat each line as a review
+            reviews_df = ingest.text_reviews(data)
+
+        elif kind is not None:
+            # Detect the review column from the header or schema, then read only the columns we keep
+            source = ingest.open_source(data, kind)
+            review_col = ingest.review_column(source.columns)
+            if review_col:
                 st.write(f"Using column '{review_col}' as review text")
-                reviews_df = pd.DataFrame({
-                    'Review': df[review_col].astype(str)
-                })
             else:
                 # Let user select column
-                selected_col = st.selectbox("Select the column containing review text:", df.columns.tolist())
-                if selected_col:
-                    reviews_df = pd.DataFrame({
-                        'Review': df[selected_col].astype(str)
-                    })
-                else:
+                review_col = st.selectbox("Select the column containing review text:", source.columns)
+                if not review_col:
                     return None
-                    
-        elif uploaded_file.type == "text/plain":
-            # Read text file with encoding detection
-            try:
-                content = uploaded_file.read().decode('utf-8')
-            except UnicodeDecodeError:
-                # Try different encodings
-                uploaded_file.seek(0)  # Reset file pointer
-                try:
-                    content = uploaded_file.read().decode('latin-1')
-                except UnicodeDecodeError:
-                    uploaded_file.seek(0)
-                    content = uploaded_file.read().decode('cp1252')
-            
-            # Split by lines and treat each line as a review
-            reviews = [line.strip() for line in content.split('\n') if line.strip()]
-            reviews_df = pd.DataFrame({
-                'Review': reviews
-            })
+            reviews_df = ingest.source_reviews(source, review_col, engine=analysis_engine())
+
         else:
-            st.error("Unsupported file type. Please upload a CSV or text file.")
+            st.error("Unsupported file type. Please upload a CSV, text, Parquet, Arrow, JSON Lines or zip file.")
             return None
             
         return reviews_df
@@ -119,7 +118,14 @@ def app1():
         st.write("[Click here for a guide on how to find the Google Play Store app ID](https://www.sociablekit.com/how-to-find-google-play-app-id/)")
 
         app_id = st.text_input('Enter the Google Play App ID:')
-        num_reviews = st.slider('Select number of reviews to scrape', min_value=1, max_value=1000, step=1, value=100)
+        backfill = st.checkbox(
+            "Backfill to disk",
+            help="Stream a large scrape page by page into parquet files; a repeated backfill resumes where the last one stopped"
+        )
+        if backfill:
+            num_reviews = st.number_input('Number of reviews to backfill', min_value=1, max_value=1_000_000, step=1000, value=10_000)
+        else:
+            num_reviews = st.slider('Select number of reviews to scrape', min_value=1, max_value=1000, step=1, value=100)
         sort_order = st.selectbox('Select the sort order of the reviews', ['Newest', 'Rating'])
         sort_order_map = {'Newest': Sort.NEWEST, 'Rating': Sort.RATING}
         sort_order_selected = sort_order_map[sort_order]
@@ -129,30 +135,38 @@ def app1():
             min_rating, max_rating = st.slider('Select the rating range', min_value=1, max_value=5, value=(1, 5))
 
         if st.button('Scrape Reviews'):
-            reviews = scrape_google_play(app_id, num_reviews, sort_order_selected, min_rating, max_rating)
-            if reviews:
-                app_details = fetch_google_play_app_details(app_id)
+            stage, func = ('backfill', backfill_stage) if backfill else ('scrape', scrape_stage)
+            start_stage(stage, (app_id, num_reviews, sort_order, min_rating, max_rating), f"Scraping {app_id}",
+                        func, app_id, num_reviews, sort_order_selected, min_rating, max_rating)
+
+        if backfill and not show_stage_status('backfill') and stage_result('backfill') is not None:
+            out_dir, rows, finished = stage_result('backfill')
+            st.write(f"{rows:,} reviews saved to `{out_dir}`" + (" (no more reviews available)" if finished else ""))
+            st.dataframe(read_backfill(out_dir, limit=100))
+
+        if not backfill and not show_stage_status('scrape') and stage_result('scrape') is not None:
+            scrape_key = st.session_state['stage_results']['scrape']
+            reviews, app_details = stage_result('scrape')
+            if len(reviews):
                 st.write(f"App Title: {app_details['title']}")
                 st.write(f"Installs: {app_details['installs']}")
                 st.write(f"Average Rating: {app_details['score']}")
                 st.write(f"Total Ratings: {app_details['ratings']}")
                 st.write(f"Total Reviews: {app_details['reviews']}")
                 st.write(f"Description: {app_details['description']}")
-                st.write(f"Scraped {len(reviews)} reviews for App ID {app_id}")
-                reviews_df = pd.DataFrame(reviews, columns=['Review'])
-                st.dataframe(reviews_df)
-                st.session_state['reviews_data'] = reviews_df  # Store reviews in session state for next step
-                download_csv(reviews_df, 'google_play_reviews.csv')
+                st.write(f"Scraped {len(reviews)} reviews for App ID {scrape_key[0]}")
+                st.dataframe(reviews)
+                download_csv(reviews, 'google_play_reviews.csv')
             else:
                 st.write("No reviews found or unable to scrape.")
     
     with tab2:
-        st.write("Upload a CSV file (with review text in a column) or a text file (with one review per line)")
+        st.write("Upload a CSV, Parquet, Arrow or JSON Lines file (with review text in a column), a text file (with one review per line), or a zip archive of several such files")
         
         uploaded_file = st.file_uploader(
             "Choose a file", 
-            type=['csv', 'txt'],
-            help="Upload a CSV file with review text or a text file with one review per line"
+            type=ingest.UPLOAD_TYPES,
+            help="Upload a file with review text in a column, a text file with one review per line, or a zip of them"
         )
         
         if uploaded_file is not None:
@@ -164,164 +178,472 @@ def app1():
                 st.write(f"Processed {len(reviews_df)} reviews from uploaded file")
                 st.dataframe(reviews_df.head(10))  # Show first 10 rows
                 
-                st.session_state['reviews_data'] = reviews_df  # Store reviews in session state for next step
+                set_source(reviews_df, uploaded_file.name)  # Store reviews for next step
                 download_csv(reviews_df, f'uploaded_reviews_{uploaded_file.name.split(".")[0]}.csv')
                 
                 st.success("✅ File successfully processed! You can now proceed to the Review Labeler.")
     
     st.write("Note: Scraping reviews from certain websites may violate their terms of service. Use responsibly and ensure compliance with the website's policies.")
 
+# Background jobs: the session keeps {'job_id', 'key'} per stage in 'jobs' and the key of
+# each finished output in 'stage_results'; the outputs live in the session's data store
+def session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else 'local'
+
+# Memory-accounted store for this session's datasets and stage outputs
+def data_store():
+    return get_registry().store(session_id())
+
+def start_stage(stage, key, name, func, *args, **kwargs):
+    runner = get_runner()
+    previous = st.session_state['jobs'].get(stage)
+    if previous is not None:
+        runner.cancel(previous['job_id'])
+    job_id = runner.submit(name, func, *args, owner=session_id(), **kwargs)
+    st.session_state['jobs'][stage] = {'job_id': job_id, 'key': key}
+
+def stage_result(stage, key=None):
+    if stage not in st.session_state['stage_results']:
+        return None
+    if key is not None and st.session_state['stage_results'][stage] != key:
+        return None
+    return data_store().get(f'stage:{stage}')
+
+# Make `reviews_df` the session's dataset, unless the same content is already loaded
+def set_source(reviews_df, origin, location=None):
+    source = source_artifact(reviews_df, origin, location)
+    current = data_store().get('reviews')
+    if current is None or current.key != source.key:
+        data_store().set('reviews', source)
+
+# Attach a finished scrape to the session as the dataset for the next steps
+def attach_scrape(key, value):
+    reviews, app_details = value
+    if len(reviews):
+        set_source(reviews, key[0])
+
+# Normalized text is derived once per dataset; labeling, tokenization and sentiment all use it
+def normalized_reviews():
+    store = data_store()
+    reviews = store.get('reviews')
+    if reviews is None:
+        return None
+    key = stage_key('normalize', reviews.key, NORMALIZE_VERSION)
+    normalized = store.get('normalized')
+    if normalized is None or normalized.key != key:
+        text = normalize_stage(reviews.column('Review'), analysis_engine())
+        normalized = reviews.derive('normalize', key, meta={'dedup': DedupPlan(text)}, clean_review=text)
+        store.set('normalized', normalized)
+    return normalized
+
+# Derive the labeled artifact from the normalized reviews; skipped when already derived for `key`
+def attach_labels(key, value):
+    labels, hits, dedup_summary = value
+    store = data_store()
+    normalized = normalized_reviews()
+    labeled = store.get('labeled')
+    if normalized is None or (labeled is not None and labeled.key == key) or not labels.index.equals(normalized.index):
+        return
+    columns = {'Label': labels['Label'], 'Category': labels['Category']}
+    if hits is not None:
+        columns['Also Mentions'] = hits.also_mentions()
+    store.set('label_hits', hits)
+    store.set('labeled', normalized.derive('labels', key, meta={'dedup_summary': dedup_summary}, **columns))
+
+# Load a finished backfill from its part files as the session's dataset
+def attach_backfill(key, value):
+    out_dir, rows, finished = value
+    if rows:
+        set_source(read_backfill(out_dir, limit=key[1]), key[0], out_dir)
+
+ATTACH_HOOKS = {'scrape': attach_scrape, 'backfill': attach_backfill, 'labeling': attach_labels}
+
+# Move outputs of this session's finished jobs into the session, whatever page is open
+def attach_finished_jobs():
+    runner = get_runner()
+    for stage, entry in list(st.session_state['jobs'].items()):
+        job = runner.get(entry['job_id'])
+        if job is None:
+            del st.session_state['jobs'][stage]
+        elif job.status == DONE:
+            st.session_state['stage_results'][stage] = entry['key']
+            data_store().set(f'stage:{stage}', job.result)
+            del st.session_state['jobs'][stage]
+            if stage in ATTACH_HOOKS:
+                ATTACH_HOOKS[stage](entry['key'], job.result)
+
+# Polls a running job without rerunning the page; a full rerun attaches the result
+@st.fragment(run_every=1.0)
+def job_progress(job_id):
+    runner = get_runner()
+    job = runner.get(job_id)
+    if job is None or job.finished:
+        st.rerun()
+    st.progress(job.progress, text=f"{job.name}: {job.message}")
+    if st.button("Cancel", key=f"cancel_{job_id}", disabled=job.cancel_requested):
+        runner.cancel(job_id)
+
+# Status of the session's job for `stage`; returns True while it is still running
+def show_stage_status(stage):
+    entry = st.session_state['jobs'].get(stage)
+    if entry is None:
+        return False
+    job = get_runner().get(entry['job_id'])
+    if job is None:
+        return False
+    if job.status == FAILED:
+        st.error(f"{job.name} failed: {job.message}")
+        return False
+    if job.status == CANCELLED:
+        st.info(f"{job.name} was cancelled.")
+        return False
+    job_progress(job.id)
+    return True
+
+def run_stage(stage, key, name, func, *args, **kwargs):
+    """Return the output of `stage` for `key`, starting a background job if needed.
+
+    Returns None while the job runs; its progress and a Cancel button are shown instead.
+    """
+    value = stage_result(stage, key)
+    if value is not None:
+        return value
+    entry = st.session_state['jobs'].get(stage)
+    if entry is None or entry['key'] != key:
+        start_stage(stage, key, name, func, *args, **kwargs)
+    if not show_stage_status(stage):
+        # Failed or cancelled: only start again when asked to
+        if st.button("Retry", key=f"retry_{stage}"):
+            start_stage(stage, key, name, func, *args, **kwargs)
+            st.rerun()
+    return None
+
+# Sidebar job table for this session and the shared cache metrics
+def jobs_panel():
+    jobs = get_runner().jobs(owner=session_id())
+    if jobs:
+        with st.sidebar.expander("Background jobs"):
+            for job in sorted(jobs, key=lambda j: j.created, reverse=True):
+                st.write(f"**{job.name}**: {job.status} ({job.progress:.0%})")
+    stats = get_shared_cache().stats()
+    with st.sidebar.expander("Shared cache"):
+        st.write(f"Hit rate: {stats['hit_rate']:.0%} ({stats['hits']} hits, {stats['misses']} misses)")
+        st.write(f"Memory: {stats['memory_mb']:.1f} MB in {stats['entries']} entries")
+        st.write(f"Disk: {stats['disk_mb']:.1f} MB in {stats['disk_entries']} entries")
+
+# One inverted index per dataset, shared across reruns and sessions
+@st.cache_resource(show_spinner="Building search index...")
+def cached_review_index(fingerprint, _reviews):
+    return ReviewIndex(_reviews.reset_index(drop=True))
+
+# Search box with BM25 ranking, "phrase" queries and Label/Category/sentiment filters;
+# the index is shared by every artifact derived from the same source dataset
+def review_search(data, key, source_key, within=None):
+    index = cached_review_index(source_key, data['Review'])
+    query = st.text_input('Search reviews (use "quotes" for exact phrases)', key=f'{key}_query')
+    filters = {}
+    filter_columns = [c for c in ['Label', 'Category', 'sentiment_type'] if c in data.columns]
+    for column, widget in zip(filter_columns, st.columns(max(len(filter_columns), 1))):
+        filters[column] = widget.multiselect(column, sorted(data[column].dropna().unique()), key=f'{key}_{column}')
+    if query:
+        results = search_reviews(index, data, query, filters, within=within)
+        st.write(f"Top {len(results)} matching reviews")
+        st.dataframe(results)
+
+# Near-duplicate clusters are computed over the distinct texts only
+@st.cache_data(show_spinner="Finding near-duplicate reviews...")
+def cached_near_duplicate_clusters(unique_texts):
+    return near_duplicate_clusters(unique_texts)
+
+# Row mask keeping one representative per near-duplicate cluster (exact duplicates included)
+def near_duplicate_mask(plan):
+    clusters = cached_near_duplicate_clusters(plan.unique_texts)
+    first_occurrence = np.zeros(plan.num_rows, dtype=bool)
+    first_occurrence[np.unique(plan.codes, return_index=True)[1]] = True
+    keep = representatives_mask(clusters)[plan.codes] & first_occurrence
+    return pd.Series(keep, index=plan.index)
+
+# Daily/weekly rollups of a scored dataset, built once per artifact and reused on every rerun.
+# A dataset that grew from the previous one (a resumed backfill) only adds its new rows
+def trend_rollups(scored):
+    store = data_store()
+    rollups = store.get('rollups')
+    if rollups is None or rollups.key != scored.key:
+        frame = scored.frame
+        new_rows = rollups.new_rows(frame) if rollups is not None else None
+        if new_rows is None:
+            rollups, new_rows = TrendRollups(), frame
+        rollups.key = scored.key
+        store.set('rollups', rollups.add(new_rows))
+    return rollups
+
+# Trend of review counts, mean polarity or mean rating per Label/Category, read from the rollups;
+# its options only rerun the chart
+@st.fragment
+def trend_chart(rollups):
+    col1, col2, col3 = st.columns(3)
+    frequency = col1.radio("Bucket", list(FREQUENCIES), horizontal=True, key='trend_frequency')
+    dimension = col2.radio("Group by", list(DIMENSIONS), index=1, horizontal=True, key='trend_dimension')
+    metric = col3.selectbox("Metric", ['reviews', 'mean_polarity', 'mean_rating'], key='trend_metric')
+    trend = rollups.query(frequency, dimension)
+    values = st.multiselect(dimension, sorted(trend[dimension].unique()), key=f'trend_{dimension}')
+    if values:
+        trend = rollups.query(frequency, dimension, values)
+    chart = alt.Chart(trend).mark_line(point=True).encode(
+        x=alt.X('period:T', title=frequency),
+        y=alt.Y(metric, title=metric.replace('_', ' ').capitalize()),
+        color=dimension,
+        tooltip=['period:T', dimension, 'reviews', 'mean_polarity', 'mean_rating']
+    )
+    st.altair_chart(chart, use_container_width=True)
+
 # App 2: Review Labeling and Categorization App
 def app2():
     st.title('Review Labeling and Categorization App')
 
-    if st.session_state['reviews_data'] is not None:
-        reviews_df = st.session_state['reviews_data']
-
-        # Convert the 'Review' column to string data type
-        reviews_df['Review'] = reviews_df['Review'].astype(str)
+    normalized = normalized_reviews()
+    if normalized is not None:
 
-        # Apply the classify_review function to the 'Review' column
-        reviews_df['Label'] = reviews_df['Review'].apply(classify_review)
+        multi_label = st.checkbox(
+            "Record all area and category hits",
+            help="Scan each review once for every category it mentions, not just the first match"
+        )
 
-        # Apply the categorize_review function to the 'Review' column
-        reviews_df['Category'] = reviews_df['Review'].apply(categorize_review)
+        # Label and categorize in the background; the taxonomy version is part of the
+        # key, so editing a taxonomy file invalidates previously computed labels
+        key = stage_key('labels', normalized.key, taxonomy_version(), multi_label)
+        result = run_stage('labeling', key, "Labeling reviews", label_stage, normalized.column('clean_review'), multi_label,
+                           analysis_engine())
+        if result is None:
+            return
+        attach_labels(key, result)
+        hits, dedup_summary = result[1], result[2]
+        st.caption(f"Duplicate collapse: {dedup_summary}")
 
         # Display the labeled and categorized reviews
-        st.write(reviews_df)
-
-        # Store labeled data for next step
-        st.session_state['labeled_data'] = reviews_df
+        labeled_df = data_store().get('labeled').frame
+        st.write(labeled_df)
+
+        if hits is not None:
+            st.subheader("Category Co-occurrence")
+            co_occurrence = hits.co_occurrence('categories').stack().reset_index()
+            co_occurrence.columns = ['Category', 'Also Mentions', 'Reviews']
+            heatmap = alt.Chart(co_occurrence).mark_rect().encode(
+                x=alt.X('Also Mentions', sort=None),
+                y=alt.Y('Category', sort=None),
+                color='Reviews',
+                tooltip=['Category', 'Also Mentions', 'Reviews']
+            )
+            st.altair_chart(heatmap, use_container_width=True)
 
         # Allow the user to download the labeled and categorized reviews
-        download_csv(reviews_df, 'labeled_categorized_reviews.csv')
+        download_csv(labeled_df, 'labeled_categorized_reviews.csv')
     else:
         st.write("No review data available. Please scrape reviews first or upload a file.")
 
 # App 3: Text and Sentiment Preliminary Analysis
+INSIGHT_VIEWS = ["Word Cloud", "Text Analytics", "Sentiment Analysis", "N-grams", "Top Words", "Search", "Trends"]
+# Views that need sentiment scores; the others never wait for the sentiment job
+SENTIMENT_VIEWS = {"Sentiment Analysis", "Top Words", "Search", "Trends"}
+
+# Stopwords are loaded once per process
+@st.cache_resource
+def stop_word_set():
+    return set(stopwords.words('english'))
+
+# Function to analyze text data
+def analyze_text(texts, exclude_words, engine='pandas'):
+    return text_stats.analyze_text(texts, stop_word_set(), exclude_words, engine)
+
+# Each view's result is computed the first time the view is opened and cached per
+# `view_key` (dataset, labels and near-duplicate setting) and view parameters
+@st.cache_data(show_spinner="Counting words...", max_entries=32)
+def word_frequencies(view_key, _texts, exclude_words, engine='pandas'):
+    return text_stats.word_frequencies(_texts, stop_word_set(), exclude_words, engine)
+
+@st.cache_data(show_spinner="Drawing word cloud...", max_entries=32)
+def wordcloud_image(view_key, _texts, exclude_words, max_words, engine='pandas'):
+    words = analyze_text(_texts, exclude_words, engine)
+    return WordCloud(width=800, height=400, max_words=max_words, background_color='white').generate(' '.join(words)).to_array()
+
+@st.cache_data(show_spinner="Counting n-grams...", max_entries=32)
+def ngram_frequencies(view_key, _texts, exclude_words, n, engine='pandas'):
+    return text_stats.ngram_frequencies(_texts, stop_word_set(), exclude_words, n, engine=engine)
+
+# Term counts per sentiment type and per Category, aggregated once for every keyness chart
+@st.cache_resource(show_spinner="Finding distinctive words...", max_entries=8)
+def cached_keyness(key, _data, exclude_words, min_count):
+    return build_keyness(_data['clean_review'], _data[['sentiment_type', 'Category']], stop_word_set(), exclude_words, min_count)
+
+@st.cache_data(show_spinner="Preparing download...", max_entries=4)
+def cached_csv(key, _data):
+    return _data.to_csv(index=False).encode('utf-8')
+
+# Function to perform sentiment analysis
+def sentiment_analysis(labeled, key, polarity):
+    store = data_store()
+    scored = store.get('scored')
+    if scored is None or scored.key != key:
+        sentiment_type = polarity.apply(lambda x: 'Positive' if x > 0 else ('Negative' if x < 0 else 'Neutral'))
+        scored = labeled.derive('sentiment', key, sentiment=polarity, sentiment_type=sentiment_type)
+        store.set('scored', scored)
+        # Every scored dataset is kept in the warehouse for the History page
+        start_stage('warehouse', key, "Saving to warehouse", warehouse_stage, scored.frame, scored.meta.get('origin'), key)
+    return scored
+
+# Scored artifact for `labeled`, starting the sentiment job on first use; None while it runs
+def scored_reviews(labeled):
+    sentiment_key = stage_key('sentiment', labeled.key)
+    polarity = run_stage('sentiment', sentiment_key, "Scoring sentiment",
+                         sentiment_stage, labeled.column('clean_review'))
+    if polarity is None:
+        return None
+    return sentiment_analysis(labeled, sentiment_key, polarity)
+
+# Plot word cloud; the word limit only redraws this view
+@st.fragment
+def word_cloud_view(view_key, texts, exclude_words):
+    max_words = st.number_input("Maximum Words", value=200, min_value=1)
+    # An explicit figure rather than pyplot's global current figure, which concurrent sessions share
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.imshow(wordcloud_image(view_key, texts, exclude_words, max_words, analysis_engine()), interpolation='bilinear')
+    ax.axis('off')
+    st.pyplot(fig)
+    plt.close(fig)
+
+# Plot sentiment analysis
+def plot_sentiment(data):
+    sentiment_counts = data['sentiment_type'].value_counts().reset_index()
+    sentiment_counts.columns = ['sentiment', 'count']
+    chart = alt.Chart(sentiment_counts).mark_bar().encode(
+        x='sentiment',
+        y='count',
+        color='sentiment'
+    ).properties(
+        title="Sentiment Analysis"
+    )
+    st.altair_chart(chart, use_container_width=True)
+
+# Plot n-grams
+def plot_ngrams(n_grams_df, n):
+    chart = alt.Chart(n_grams_df).mark_bar().encode(
+        x=alt.X('ngram', sort='-y'),
+        y='count',
+        tooltip=['ngram', 'count']
+    ).properties(
+        title=f"Top 50 {'Bigrams' if n == 2 else 'Trigrams'}"
+    )
+    st.altair_chart(chart, use_container_width=True)
+
+# Plot the words most distinctive of a sentiment type or Category
+def plot_top_words(words_df, group, metric='log_odds'):
+    chart = alt.Chart(words_df).mark_bar().encode(
+        x=alt.X('word', sort='-y'),
+        y=alt.Y(metric, title=KEYNESS_METRICS[metric]),
+        color=alt.value({'Positive': 'green', 'Negative': 'red'}.get(group, 'steelblue')),
+        tooltip=['word', 'count', alt.Tooltip('log_odds', format='.2f'), alt.Tooltip('chi2', format='.1f')]
+    ).properties(
+        title=f"Top 20 Distinctive {group} Words"
+    )
+    st.altair_chart(chart, use_container_width=True)
+
+# Only the open tab is computed; switching tabs reruns this fragment, not the page
+@st.fragment
+def insight_views(labeled, keep, view_key, exclude_words, min_freq):
+    texts = labeled.column('clean_review')
+    if keep is not None:
+        texts = texts[keep]
+    tabs = st.tabs(INSIGHT_VIEWS, key='insights_view', on_change='rerun')
+    view = next((name for name, tab in zip(INSIGHT_VIEWS, tabs) if tab.open), INSIGHT_VIEWS[0])
+
+    with tabs[INSIGHT_VIEWS.index(view)]:
+        st.header(view)
+        scored = None
+        if view in SENTIMENT_VIEWS:
+            scored = scored_reviews(labeled)
+            if scored is None:
+                return
+            sentiment_data = scored.frame
+            view_data = sentiment_data if keep is None else sentiment_data[keep]
+
+        if view == "Word Cloud":
+            word_cloud_view(view_key, texts, exclude_words)
+
+        elif view == "Text Analytics":
+            text_freq = word_frequencies(view_key, texts, exclude_words, analysis_engine())
+            st.dataframe(text_freq)
+
+            # Drill down from a top word to the reviews behind it
+            drill_word = st.selectbox("Show reviews containing", [''] + text_freq['word'].head(100).tolist())
+            if drill_word:
+                data = labeled.frame
+                index = cached_review_index(labeled.source_key, data['Review'])
+                st.dataframe(reviews_with_word(index, data, drill_word))
+
+        elif view == "Sentiment Analysis":
+            plot_sentiment(view_data)
+            st.dataframe(view_data[['Review', 'sentiment', 'sentiment_type']])
+
+        elif view == "N-grams":
+            plot_ngrams(ngram_frequencies(view_key, texts, exclude_words, 2, analysis_engine()), 2)
+            plot_ngrams(ngram_frequencies(view_key, texts, exclude_words, 3, analysis_engine()), 3)
+
+        elif view == "Top Words":
+            # Ranked by keyness against the other reviews, not raw counts, so words common to every group drop out
+            keyness = cached_keyness(stage_key('keyness', scored.key, keep is not None, exclude_words, min_freq),
+                                     view_data, exclude_words, min_freq)
+            if keyness.empty:
+                st.info("No words left to rank: the reviews are empty once punctuation, stop words and excluded words are removed.")
+            else:
+                metric = st.radio("Rank by", list(KEYNESS_METRICS), format_func=KEYNESS_METRICS.get, horizontal=True)
+                for sentiment in ['Positive', 'Negative']:
+                    if sentiment in keyness.values('sentiment_type'):
+                        plot_top_words(keyness.top('sentiment_type', sentiment, by=metric), sentiment, metric)
+                categories = sorted(keyness.values('Category'))
+                if categories:
+                    category = st.selectbox("Distinctive words of Category", categories)
+                    plot_top_words(keyness.top('Category', category, by=metric), category, metric)
+
+        elif view == "Search":
+            review_search(sentiment_data, 'insights_search', scored.source_key)
+
+        elif view == "Trends":
+            if 'Date' in scored:
+                rollups = trend_rollups(scored)
+                if rollups.undated:
+                    st.caption(f"{rollups.undated:,} reviews without a date are left out")
+                trend_chart(rollups)
+            else:
+                st.info("This dataset has no review dates. Scrape reviews, or upload a file with a date column.")
+
+    # Download button, once sentiment has been scored
+    scored = data_store().get('scored')
+    if scored is not None and scored.key == stage_key('sentiment', labeled.key):
+        st.download_button("Download Results", data=cached_csv(scored.key, scored.frame), file_name="results.csv", mime="text/csv")
+
 def app3():
     st.title('Text and Sentiment Preliminary Analysis')
 
-    # Load stopwords
-    stop_words = set(stopwords.words('english'))
-
     # Sidebar for input parameters
     st.sidebar.header("Input Parameters")
     exclude_words = st.sidebar.text_input("Words to Exclude (comma separated)", "")
     min_freq = st.sidebar.number_input("Minimum Frequency", value=2, min_value=1)
-    max_words = st.sidebar.number_input("Maximum Words", value=200, min_value=1)
-
-    # Function to clean text
-    def clean_text(text):
-        if isinstance(text, str):
-            text = text.lower()
-            text = ''.join([c for c in text if c not in ('!', '.', ':', ',', '?')])
-            return text
-        else:
-            return ""
-
-    # Function to analyze text data
-    def analyze_text(data, column):
-        data[column] = data[column].apply(clean_text)
-        words = ' '.join(data[column]).split()
-        words = [word for word in words if word not in stop_words]
-        if exclude_words:
-            exclude = exclude_words.split(',')
-            words = [word for word in words if word not in exclude]
-        return words
-
-    # Function to perform sentiment analysis
-    def sentiment_analysis(data, column):
-        data['sentiment'] = data[column].apply(lambda x: TextBlob(x).sentiment.polarity if x else 0)
-        data['sentiment_type'] = data['sentiment'].apply(lambda x: 'Positive' if x > 0 else ('Negative' if x < 0 else 'Neutral'))
-        return data
-
-    # Plot word cloud
-    def plot_wordcloud(words):
-        wordcloud = WordCloud(width=800, height=400, max_words=max_words, background_color='white').generate(' '.join(words))
-        plt.figure(figsize=(10, 5))
-        plt.imshow(wordcloud, interpolation='bilinear')
-        plt.axis('off')
-        st.pyplot(plt)
-
-    # Plot sentiment analysis
-    def plot_sentiment(data):
-        sentiment_counts = data['sentiment_type'].value_counts().reset_index()
-        sentiment_counts.columns = ['sentiment', 'count']
-        chart = alt.Chart(sentiment_counts).mark_bar().encode(
-            x='sentiment',
-            y='count',
-            color='sentiment'
-        ).properties(
-            title="Sentiment Analysis"
-        )
-        st.altair_chart(chart, use_container_width=True)
-
-    # Plot n-grams
-    def plot_ngrams(words, n):
-        n_grams = ngrams(words, n)
-        n_grams_freq = FreqDist(n_grams).most_common(50)
-        n_grams_df = pd.DataFrame(n_grams_freq, columns=['ngram', 'count'])
-        n_grams_df['ngram'] = n_grams_df['ngram'].apply(lambda x: ' '.join(x))
-        chart = alt.Chart(n_grams_df).mark_bar().encode(
-            x=alt.X('ngram', sort='-y'),
-            y='count',
-            tooltip=['ngram', 'count']
-        ).properties(
-            title=f"Top 50 {'Bigrams' if n == 2 else 'Trigrams'}"
-        )
-        st.altair_chart(chart, use_container_width=True)
-
-    # Plot top positive and negative words
-    def plot_top_words(data, sentiment):
-        words = data[data['sentiment_type'] == sentiment]['Review'].str.cat(sep=' ').split()
-        words = [word for word in words if word not in stop_words]
-        words_freq = Counter(words).most_common(20)
-        words_df = pd.DataFrame(words_freq, columns=['word', 'count'])
-        chart = alt.Chart(words_df).mark_bar().encode(
-            x=alt.X('word', sort='-y'),
-            y='count',
-            color=alt.value('green' if sentiment == 'Positive' else 'red')
-        ).properties(
-            title=f"Top 20 {sentiment} Words"
-        )
-        st.altair_chart(chart, use_container_width=True)
+    collapse_near_duplicates = st.sidebar.checkbox(
+        "Collapse near-duplicate reviews",
+        help="Count templated or copy-paste reviews once, using one representative per cluster"
+    )
 
     # Main panel for displaying analysis
-    if st.session_state['labeled_data'] is not None:
-        data = st.session_state['labeled_data']
-        words = analyze_text(data, 'Review')
-        sentiment_data = sentiment_analysis(data, 'Review')
-
-        tab1, tab2, tab3, tab4, tab5 = st.tabs(["Word Cloud", "Text Analytics", "Sentiment Analysis", "N-grams", "Top Words"])
-
-        with tab1:
-            st.header("Word Cloud")
-            plot_wordcloud(words)
-
-        with tab2:
-            st.header("Text Analytics")
-            text_freq = pd.DataFrame(FreqDist(words).most_common(), columns=['word', 'count'])
-            st.dataframe(text_freq)
-
-        with tab3:
-            st.header("Sentiment Analysis")
-            plot_sentiment(sentiment_data)
-            st.dataframe(sentiment_data[['Review', 'sentiment', 'sentiment_type']])
-
-        with tab4:
-            st.header("N-grams")
-            plot_ngrams(words, 2)
-            plot_ngrams(words, 3)
-
-        with tab5:
-            st.header("Top Words")
-            plot_top_words(sentiment_data, 'Positive')
-            plot_top_words(sentiment_data, 'Negative')
-
-        # Download button
-        csv = sentiment_data.to_csv(index=False).encode('utf-8')
-        st.download_button("Download Results", data=csv, file_name="results.csv", mime="text/csv")
+    labeled = data_store().get('labeled')
+    if labeled is not None:
+        plan = labeled.meta['dedup']
+        st.caption(f"Duplicate collapse: {plan.summary()}")
+        keep = None
+        if collapse_near_duplicates:
+            keep = near_duplicate_mask(plan)
+            st.caption(f"Near-duplicate collapse: {keep.sum():,} representative reviews of {len(keep):,}")
+        insight_views(labeled, keep, stage_key('insights', labeled.key, collapse_near_duplicates), exclude_words, min_freq)
     else:
         st.info("No labeled data available. Please label reviews first.")
 
@@ -393,63 +715,272 @@ def app4():
             unsafe_allow_html=True
         )
 
-    st.sidebar.header("Choose Sentiment Colors")
-    positive_color = st.sidebar.color_picker("Positive Sentiment Color", "#00FF00")
-    negative_color = st.sidebar.color_picker("Negative Sentiment Color", "#FF0000")
-    neutral_color = st.sidebar.color_picker("Neutral Sentiment Color", "#979797")
+    scored = data_store().get('scored')
+    if scored is not None:
 
-    sentiment_filter = st.sidebar.radio(
-        "Select Sentiment Type",
-        ('All', 'Positive', 'Negative', 'Neutral')
-    )
+        # "Also mentions" filter, answered from the hit matrix without rescanning the text
+        also_mentions = []
+        hits = data_store().get('label_hits')
+        if hits is not None:
+            also_mentions = st.sidebar.multiselect("Also Mentions", hits.labels_of('categories'))
 
-    if st.session_state['labeled_data'] is not None:
-        df = st.session_state['labeled_data']
+        treemap_view(scored, hits, tuple(also_mentions))
+    else:
+        st.write("No scored data available. Please label reviews and run Text2Insights first.")
+
+# Reviews behind the tree map, shared per scored dataset and "also mentions" filter. The
+# hit matrix comes with the scored dataset (its key covers the labeling run that built
+# both), never from the session store, which belongs to whichever session ran first
+@st.cache_resource(max_entries=8)
+def treemap_reviews(key, also_mentions, _scored, _hits):
+    df = _scored.frame.dropna(subset=['Label', 'Category', 'sentiment_type'])
+    for category in also_mentions:
+        if _hits is not None:
+            df = df[_hits.mentions(category).reindex(df.index, fill_value=False)]
+    return df
+
+# Colours and the sentiment filter only restyle or refilter the chart, so they rerun
+# this fragment instead of the whole page
+@st.fragment
+def treemap_view(scored, hits, also_mentions):
+    with st.popover("Chart options"):
+        st.subheader("Choose Sentiment Colors")
+        positive_color = st.color_picker("Positive Sentiment Color", "#00FF00")
+        negative_color = st.color_picker("Negative Sentiment Color", "#FF0000")
+        neutral_color = st.color_picker("Neutral Sentiment Color", "#979797")
+
+        sentiment_filter = st.radio(
+            "Select Sentiment Type",
+            ('All', 'Positive', 'Negative', 'Neutral')
+        )
 
-        df.dropna(subset=['Label', 'Category', 'sentiment_type'], inplace=True)
+    scored_df = scored.frame
+    df = treemap_reviews(scored.key, also_mentions, scored, hits)
 
-        if sentiment_filter != 'All':
-            df = df[df['sentiment_type'] == sentiment_filter]
+    if sentiment_filter != 'All':
+        df = df[df['sentiment_type'] == sentiment_filter]
 
-        path = ['Label', 'Category', 'sentiment_type']
-        color_col = 'sentiment_type'
+    path = ['Label', 'Category', 'sentiment_type']
+    color_col = 'sentiment_type'
 
+    if analysis_engine() == 'polars':
+        aggregated_df = polars_backend.treemap_counts(df, path)
+    else:
         aggregated_df = df.groupby(path).size().reset_index(name='counts')
 
-        try:
-            fig = px.treemap(
-                aggregated_df,
-                path=path,
-                values='counts',
-                color=color_col,
-                color_discrete_map={
-                    'Positive': positive_color,
-                    'Negative': negative_color,
-                    'Neutral': neutral_color
-                },
-                hover_data={'counts': True}
-            )
+    try:
+        fig = px.treemap(
+            aggregated_df,
+            path=path,
+            values='counts',
+            color=color_col,
+            color_discrete_map={
+                'Positive': positive_color,
+                'Negative': negative_color,
+                'Neutral': neutral_color
+            },
+            hover_data={'counts': True}
+        )
 
-            fig.update_traces(
-                texttemplate='<b>%{label}<br>%{value}</b>',
-                textfont=dict(family="Poppins", color="white", size=20)
-            )
+        fig.update_traces(
+            texttemplate='<b>%{label}<br>%{value}</b>',
+            textfont=dict(family="Poppins", color="white", size=20)
+        )
 
-            fig.update_layout(
-                margin=dict(t=50, l=25, r=25, b=25),
-                font=dict(family="Poppins", size=14, color='#333'),
-                paper_bgcolor='#f5f5f5',
-                plot_bgcolor='#f5f5f5',
-                treemapcolorway=["#06516F", "#0098DB", "#FAAF3B", "#333333", "#979797"]
-            )
+        fig.update_layout(
+            margin=dict(t=50, l=25, r=25, b=25),
+            font=dict(family="Poppins", size=14, color='#333'),
+            paper_bgcolor='#f5f5f5',
+            plot_bgcolor='#f5f5f5',
+            treemapcolorway=["#06516F", "#0098DB", "#FAAF3B", "#333333", "#979797"]
+        )
 
-            st.plotly_chart(fig, use_container_width=True)
-        except ValueError as e:
-            st.error(f"ValueError: {e}")
-        except Exception as e:
-            st.error(f"An error occurred: {e}")
-    else:
-        st.write("No labeled data available. Please label reviews first or upload a file.")
+        st.plotly_chart(fig, use_container_width=True)
+    except ValueError as e:
+        st.error(f"ValueError: {e}")
+    except Exception as e:
+        st.error(f"An error occurred: {e}")
+
+    # Drill down into the reviews behind a tree map box
+    with st.expander("Reviews behind a box"):
+        col1, col2 = st.columns(2)
+        drill_label = col1.selectbox("Label", [''] + sorted(aggregated_df['Label'].unique()))
+        drill_category = col2.selectbox("Category", [''] + sorted(aggregated_df['Category'].unique()))
+        if drill_label or drill_category:
+            box = filter_mask(df, {'Label': [drill_label] if drill_label else [], 'Category': [drill_category] if drill_category else []})
+            st.dataframe(df[box])
+        review_search(scored_df, 'treemap_search', scored.source_key, within=scored_df.index.isin(df.index))
+
+# Saved runs from the warehouse: the Text2Insights and tree map summaries as SQL across runs
+def history_page():
+    st.title('Review History')
+    warehouse = get_warehouse()
+    runs = warehouse.runs()
+    if runs.empty:
+        st.info("No saved runs yet. Every dataset scored in Text2Insights is saved here.")
+        return
+
+    names = {row.run_id: f"{row.source} · {row.created_at:%Y-%m-%d %H:%M} ({row.rows:,} reviews)" for row in runs.itertuples()}
+    selected = st.multiselect("Runs", list(names), default=list(names)[:5], format_func=names.get)
+    if not selected:
+        return
+
+    st.subheader("Sentiment by run")
+    breakdown = warehouse.sentiment_breakdown(selected)
+    breakdown['run'] = breakdown['run_id'].map(names)
+    chart = alt.Chart(breakdown).mark_bar().encode(
+        x=alt.X('run', sort=None, title=None),
+        y=alt.Y('count', stack='normalize', title='share of reviews'),
+        color='sentiment',
+        tooltip=['run', 'sentiment', 'count']
+    )
+    st.altair_chart(chart, use_container_width=True)
+
+    st.subheader("Sentiment by month")
+    monthly = warehouse.monthly_sentiment(selected)
+    chart = alt.Chart(monthly).mark_line(point=True).encode(
+        x='month:T',
+        y='count',
+        color='sentiment',
+        tooltip=['month:T', 'sentiment', 'count', 'mean_polarity']
+    )
+    st.altair_chart(chart, use_container_width=True)
+
+    st.subheader("Tree map")
+    sentiment_filter = st.radio("Sentiment", ('All', 'Positive', 'Negative', 'Neutral'), horizontal=True)
+    counts = warehouse.treemap_counts(selected, sentiment_filter)
+    if not counts.empty:
+        fig = px.treemap(
+            counts,
+            path=['Label', 'Category', 'sentiment_type'],
+            values='counts',
+            color='sentiment_type',
+            color_discrete_map={'Positive': '#00FF00', 'Negative': '#FF0000', 'Neutral': '#979797'}
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+    keyness = keyness_from_counts(warehouse.sentiment_term_counts(selected, stop_word_set()), 'sentiment_type')
+    if keyness.empty:
+        st.info("No words to rank in the selected runs once stop words are removed.")
+        return
+    col1, col2 = st.columns(2)
+    for col, sentiment in [(col1, 'Positive'), (col2, 'Negative')]:
+        if sentiment in keyness.values('sentiment_type'):
+            with col:
+                plot_top_words(keyness.top('sentiment_type', sentiment), sentiment)
+
+# Aggregates of a running `python streaming.py`, re-read every few seconds; only the
+# snapshot file is read, never the reviews behind it
+@st.fragment(run_every=2.0)
+def live_stream_view():
+    snapshot = read_snapshot()
+    if snapshot is None:
+        st.info("No stream is running. Start one with `python streaming.py <drop file>` (JSONL or CSV), "
+                "or pipe records in with `python streaming.py -`.")
+        return
+    st.caption(f"Updated {snapshot['updated']} · sliding window of {snapshot['window_seconds'] / 60:g} minutes")
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Reviews in window", f"{snapshot['records_window']:,}")
+    col2.metric("Reviews since start", f"{snapshot['records_total']:,}")
+    mean_polarity = snapshot['mean_polarity']
+    col3.metric("Mean polarity", "–" if mean_polarity is None else f"{mean_polarity:.3f}")
+
+    series = pd.DataFrame(snapshot['series'])
+    if not series.empty:
+        series = series.melt(id_vars=['start'], value_vars=list(SENTIMENTS), var_name='sentiment', value_name='reviews')
+        chart = alt.Chart(series).mark_area().encode(
+            x=alt.X('start:T', title=None),
+            y='reviews',
+            color=alt.Color('sentiment', scale=alt.Scale(domain=list(SENTIMENTS), range=['#00FF00', '#FF0000', '#979797'])),
+            tooltip=['start:T', 'sentiment', 'reviews']
+        )
+        st.altair_chart(chart, use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Categories")
+        categories = pd.DataFrame(list(snapshot['categories'].items()), columns=['category', 'count'])
+        st.bar_chart(categories, x='category', y='count')
+    with col2:
+        st.subheader("Heavy-hitter terms")
+        st.dataframe(pd.DataFrame(snapshot['heavy_hitters'], columns=['term', 'count', 'error']), hide_index=True)
+
+def live_stream_page():
+    st.title('Live Stream')
+    live_stream_view()
+
+# Topic discovery over the reviews that no taxonomy keyword matched
+def topics_page():
+    st.title('Topic Discovery')
+
+    labeled = data_store().get('labeled')
+    if labeled is None:
+        st.info("No labeled data available. Please label reviews first.")
+        return
+
+    category_fallback = get_taxonomy('categories').fallback
+    area_fallback = get_taxonomy('areas').fallback
+    buckets = {
+        f"{category_fallback} or {area_fallback}": (labeled.column('Category') == category_fallback) | (labeled.column('Label') == area_fallback),
+        category_fallback: labeled.column('Category') == category_fallback,
+        area_fallback: labeled.column('Label') == area_fallback,
+    }
+    bucket = st.radio("Reviews to explore", list(buckets), horizontal=True)
+    num_topics = st.slider("Number of topics", min_value=2, max_value=50, value=10)
+    mask = buckets[bucket]
+    st.caption(f"{mask.sum():,} of {len(mask):,} reviews")
+
+    key = stage_key('topics', labeled.key, bucket, num_topics)
+    if st.button("Discover topics", disabled=not mask.any()):
+        start_stage('topics', key, "Discovering topics", topic_stage, labeled.column('clean_review'), mask.to_numpy(),
+                    num_topics, labeled.meta.get('location'))
+    if show_stage_status('topics'):
+        return
+    topics = stage_result('topics', key)
+    if topics is None:
+        return
+    if topics.message:
+        st.info(topics.message)
+        return
+
+    st.subheader("Topics")
+    st.dataframe(topics.summary, hide_index=True)
+
+    topic = st.selectbox("Show topic", topics.summary['topic'])
+    row = topics.summary[topics.summary['topic'] == topic].iloc[0]
+    # Starting point for a new taxonomy entry: paste into taxonomies/categories.yaml and refine
+    st.code(yaml.safe_dump([{'name': f'Topic {topic}', 'keywords': row['top_terms'].split(', ')}], sort_keys=False), language='yaml')
+    members = topics.assignments.index[topics.assignments == topic]
+    st.dataframe(labeled.frame.loc[members, ['Review', 'Label', 'Category']].head(200))
+
+# Admin view of memory use per session and dataset
+def admin_page():
+    st.title('Server Memory Usage')
+    registry = get_registry()
+
+    if st.button('Evict idle sessions now'):
+        evicted = registry.evict_idle()
+        st.success(f"Evicted {len(evicted)} idle sessions")
+
+    now = time.time()
+    sessions = pd.DataFrame([{
+        'session': store.session_id[:8] + (' (you)' if store.session_id == session_id() else ''),
+        'memory_mb': store.memory_bytes / 2**20,
+        'spilled_mb': store.disk_bytes / 2**20,
+        'budget_mb': store.budget / 2**20,
+        'idle_seconds': int(now - store.last_seen),
+    } for store in registry.stores()])
+    st.subheader(f"Sessions (idle timeout {registry.idle_timeout:.0f} s)")
+    st.dataframe(sessions)
+
+    datasets = pd.DataFrame([
+        dict(session=store.session_id[:8], **row) for store in registry.stores() for row in store.usage()
+    ])
+    st.subheader("Datasets and stage outputs")
+    st.dataframe(datasets)
+
+    st.subheader("Shared cache")
+    st.json(get_shared_cache().stats())
 
 # Cover page with login
 def cover_page():
@@ -490,9 +1021,14 @@ def main():
     if not st.session_state['logged_in']:
         cover_page()
     else:
+        attach_finished_jobs()
         st.sidebar.image("https://github.com/skappal7/TextAnalyser/blob/main/logo.png?raw=true", width=200)
         st.sidebar.title('Navigation')
-        app_selection = st.sidebar.radio('Go to', ['Review Scraper', 'Review Labeler', 'Text2Insights', 'Sentiment Tree Map'])
+        app_selection = st.sidebar.radio('Go to', ['Review Scraper', 'Review Labeler', 'Text2Insights', 'Sentiment Tree Map', 'Topic Discovery', 'History', 'Live Stream', 'Admin'])
+        st.sidebar.selectbox(
+            'Analysis engine', ENGINES, index=ENGINES.index(DEFAULT_ENGINE), key='engine',
+            help="Polars runs normalization, labeling, word counts and the tree map as multi-threaded lazy queries; results are identical"
+        )
 
         if app_selection == 'Review Scraper':
             app1()
@@ -502,186 +1038,20 @@ def main():
             app3()
         elif app_selection == 'Sentiment Tree Map':
             app4()
-
-# Helper Functions for App1
-def scrape_google_play(app_id, num_reviews=100, sort_order=Sort.NEWEST, min_rating=None, max_rating=None):
-    all_reviews = []
-    next_token = None
-    while len(all_reviews) < num_reviews:
-        current_reviews, token = gp_reviews(
-            app_id,
-            lang='en',
-            country='us',
-            sort=sort_order,
-            count=min(num_reviews - len(all_reviews), 100),
-            filter_score_with=None if min_rating is None and max_rating is None else list(range(min_rating, max_rating + 1)),
-            continuation_token=next_token
-        )
-        all_reviews.extend(current_reviews)
-        next_token = token
-        if not next_token:
-            break
-        time.sleep(2)  # Add delay to avoid rate limiting
-    reviews_text = [review['content'] for review in all_reviews]
-    return reviews_text
-
-def fetch_google_play_app_details(app_id):
-    app_details = gp_app(app_id)
-    return {
-        'title': app_details['title'],
-        'installs': app_details['installs'],
-        'score': app_details['score'],
-        'ratings': app_details['ratings'],
-        'reviews': app_details['reviews'],
-        'description': app_details['description']
-    }
-
-# Helper Functions for App2
-def classify_review(review):
-    # Define keywords for each category
-    process_keywords = [
-        'smooth', 'seamless', 'process', 'efficient', 'straightforward', 'hassle-free', 'user-friendly',
-        'convenient', 'fast', 'prompt', 'timely', 'organized', 'structured', 'streamlined',
-        'consistent', 'transparent', 'informative', 'clear', 'secure', 'reliable', 'accurate',
-        'personalized', 'tailored', 'flexible', 'adaptable', 'responsive', 'accessible',
-        'compliant', 'ethical', 'trustworthy', 'confidential', 'supportive', 'value-added',
-        'cost-effective', 'comprehensive', 'end-to-end', 'customer-focused', 'needs-based',
-        'intuitive', 'logical', 'well-documented', 'standardized', 'repeatable', 'scalable',
-        'agile', 'data-driven', 'insightful', 'proactive', 'preventive', 'continuous improvement',
-        'innovative', 'transformative', 'sustainable', 'resilient', 'risk-aware', 'compliant',
-        'auditable', 'traceable', 'measurable', 'transparent', 'accountable', 'collaborative',
-        'workflow', 'procedure', 'protocol', 'methodology', 'approach', 'technique', 'strategy',
-        'framework', 'lifecycle', 'transition', 'migration', 'implementation', 'execution', 'delivery',
-        'simple', 'easy', 'slow', 'disorganized', 'inefficient', 'confusing', 'outdated', 
-        'cumbersome', 'rigid', 'error-prone', 'bureaucratic', 'redundant', 'inconsistent', 'unresponsive'
-    ]
-    technology_keywords = [
-        'intuitive', 'invalid', 'pin', 'user-friendly', 'modern', 'advanced', 'innovative', 'cutting-edge',
-        'reliable', 'efficient', 'fast', 'responsive', 'secure', 'robust', 'stable',
-        'integrated', 'seamless', 'accessible', 'mobile-friendly', 'omnichannel', 'personalized',
-        'customizable', 'interactive', 'intelligent', 'automated', 'self-service', 'convenient',
-        'informative', 'transparent', 'real-time', 'data-driven', 'analytical', 'insightful',
-        'scalable', 'flexible', 'adaptable', 'future-proof', 'compatibility', 'interoperability',
-        'cloud-based', 'virtualized', 'resilient', 'fault-tolerant', 'privacy-compliant',
-        'contextual', 'predictive', 'cognitive', 'conversational', 'natural language', 'voice-enabled',
-        'multi-modal', 'immersive', 'augmented', 'virtual', 'blockchain-powered', 'distributed',
-        'decentralized', 'sustainable', 'energy-efficient', 'eco-friendly', 'ethical', 'transparent',
-        'accountable', 'inclusive', 'accessible', 'register', 'buggy', 'glitchy', 'glitch',
-        'app', 'application', 'mobile app', 'android app', 'ios app', 'website', 'web app', 'portal',
-        'platform', 'interface', 'dashboard', 'chatbot', 'virtual assistant', 'voice assistant',
-        'bug', 'download', 'attachment', 'load', 'crashing', 'install', 'reinstall', 'code', 'error',
-        'rin', 'hack', 'hacking', 'scam', 'login', 'log', 'notification', 'track', 'location', 'offline',
-        'pdf', 'image', 'upload', 'photo', 'click', 'slow', 'unresponsive', 'insecure', 'complicated',
-        'hard-to-use', 'malfunction', 'fail', 'downtime'
-    ]
-    people_keywords = [
-        'friendly', 'knowledgeable', 'helpful', 'patient', 'attentive', 'empathetic', 'responsive',
-        'professional', 'courteous', 'communicative', 'efficient', 'dedicated', 'well-trained',
-        'reliable', 'accessible', 'multilingual', 'personable', 'understanding', 'supportive',
-        'experienced', 'reassuring', 'proactive', 'approachable', 'caring', 'compassionate',
-        'trustworthy', 'accommodating', 'service-minded', 'respectful', 'polite', 'empowering',
-        'motivating', 'encouraging', 'engaging', 'clear communication', 'problem-solving',
-        'situational awareness', 'emotional intelligence', 'customer-centric', 'culturally aware',
-        'adaptive', 'resilient', 'collaborative', 'team-oriented', 'passionate', 'committed',
-        'accountable', 'ethical', 'transparent', 'authentic', 'they', 'he', 'man', 'lady', 'she',
-        'rude', 'incompetent', 'unhelpful', 'impatient', 'inattentive', 'insensitive', 'unresponsive',
-        'unprofessional', 'discourteous', 'uncommunicative', 'inefficient', 'careless', 'untrained',
-        'unreliable', 'inaccessible', 'uninformed', 'impersonal', 'unsupportive', 'inexperienced',
-        'dismissive', 'passive', 'unapproachable', 'uncaring', 'untrustworthy', 'inflexible',
-        'condescending', 'demotivating', 'discouraging', 'disengaging', 'unclear communication',
-        'problem-ignoring', 'situationally unaware', 'emotionally unintelligent', 'self-centered',
-        'culturally insensitive', 'rigid', 'fragile', 'uncooperative', 'individualistic', 'apathetic',
-        'uncommitted', 'unaccountable', 'unethical', 'opaque', 'inauthentic'
-    ]
-
-    # Convert review to string and then to lowercase for case-insensitive matching
-    review = str(review).lower()
-
-    # Check for process-related keywords
-    for keyword in process_keywords:
-        if keyword in review:
-            return "Process"
-
-    # Check for technology-related keywords
-    for keyword in technology_keywords:
-        if keyword in review:
-            return "Technology"
-
-    # Check for people-related keywords
-    for keyword in people_keywords:
-        if keyword in review:
-            return "People"
-
-    # If no keywords found, return "Other Area"
-    return "Other Area"
-
-def categorize_review(review):
-    billing_keywords = ['invoice', 'payment', 'bill', 'charge', 'refund', 'credit', 'debit', 'balance', 'overdue', 'fee', 'statement', 'account', 'transaction', 'receipt', 'pay', 'finance', 'cost', 'expense', 'price', 'amount', 'due', 'overcharge', 'undercharge', 'billing cycle']
-    technical_support_keywords = ['tech support', 'technical', 'troubleshoot', 'error', 'issue', 'bug', 'glitch', 'malfunction', 'repair', 'fix', 'installation', 'setup', 'connectivity', 'network', 'software', 'hardware', 'reboot', 'reset', 'upgrade', 'update', 'compatibility', 'diagnostics', 'assistance', 'support']
-    account_management_keywords = ['account', 'profile', 'login', 'password', 'username', 'registration', 'sign up', 'sign in', 'subscription', 'renewal', 'cancel', 'deactivate', 'activate', 'update', 'modify', 'personal information', 'user ID', 'credentials', 'security', 'verification', 'access', 'account settings']
-    product_information_keywords = ['product', 'feature', 'specification', 'details', 'model', 'version', 'variant', 'description', 'availability', 'stock', 'price', 'cost', 'warranty', 'guarantee', 'manual', 'guide', 'brochure', 'catalog', 'options', 'selection', 'usage', 'demo', 'sample']
-    service_inquiry_keywords = ['service', 'inquiry', 'information', 'details', 'availability', 'schedule', 'appointment', 'booking', 'reservation', 'timing', 'location', 'facility', 'feature', 'benefit', 'offer', 'package', 'plan', 'subscription', 'contract', 'agreement', 'terms']
-    complaints_feedback_keywords = ['complaint', 'issue', 'problem', 'dissatisfaction', 'feedback', 'suggestion', 'review', 'criticism', 'concern', 'trouble', 'negative experience', 'poor service', 'bad', 'unhappy', 'unsatisfied', 'resolved', 'unresolved', 'escalate', 'escalation', 'grievance', 'refund', 'compensation']
-    sales_renewals_keywords = ['sales', 'purchase', 'buy', 'order', 'renew', 'renewal', 'contract', 'agreement', 'deal', 'discount', 'offer', 'promo', 'pricing', 'cost', 'quote', 'billing', 'payment', 'subscription', 'trial', 'demo', 'upgrade', 'conversion', 'checkout', 'transaction']
-    shipping_delivery_keywords = ['shipping', 'delivery', 'dispatch', 'shipment', 'package', 'courier', 'tracking', 'track', 'status', 'estimated delivery', 'delay', 'lost', 'damaged', 'return', 'replacement', 'logistics', 'freight', 'parcel', 'order', 'receive', 'warehouse', 'logistics', 'carrier']
-    returns_exchanges_keywords = ['return', 'exchange', 'replacement', 'refund', 'credit', 'policy', 'terms', 'conditions', 'process', 'procedure', 'defective', 'damaged', 'wrong item', 'incorrect', 'sent', 'receive', 'receipt', 'product', 'package', 'return label', 'authorization', 'approval', 'inspection']
-    general_inquiry_keywords = ['general', 'inquiry', 'question', 'ask', 'information', 'details', 'assistance', 'help', 'support', 'contact', 'reach out', 'need', 'want', 'clarify', 'understand', 'query', 'explore', 'guidance', 'advice', 'basic', 'common']
-
-    # Convert review to string and then to lowercase for case-insensitive matching
-    review = str(review).lower()
-
-    # Check for billing-related keywords
-    for keyword in billing_keywords:
-        if keyword in review:
-            return "Billing and Payments"
-
-    # Check for technical support-related keywords
-    for keyword in technical_support_keywords:
-        if keyword in review:
-            return "Technical Support"
-
-    # Check for account management-related keywords
-    for keyword in account_management_keywords:
-        if keyword in review:
-            return "Account Management"
-
-    # Check for product information-related keywords
-    for keyword in product_information_keywords:
-        if keyword in review:
-            return "Product Information"
-
-    # Check for service inquiry-related keywords
-    for keyword in service_inquiry_keywords:
-        if keyword in review:
-            return "Service Inquiry"
-
-    # Check for complaints and feedback-related keywords
-    for keyword in complaints_feedback_keywords:
-        if keyword in review:
-            return "Complaints and Feedback"
-
-    # Check for sales and renewals-related keywords
-    for keyword in sales_renewals_keywords:
-        if keyword in review:
-            return "Sales and Renewals"
-
-    # Check for shipping and delivery-related keywords
-    for keyword in shipping_delivery_keywords:
-        if keyword in review:
-            return "Shipping and Delivery"
-
-    # Check for returns and exchanges-related keywords
-    for keyword in returns_exchanges_keywords:
-        if keyword in review:
-            return "Returns and Exchanges"
-
-    # Check for general inquiry-related keywords
-    for keyword in general_inquiry_keywords:
-        if keyword in review:
-            return "General Inquiry"
-
-    # If no keywords found, return "Unexplored Category"
-    return "Unexplored Category"
+        elif app_selection == 'Topic Discovery':
+            topics_page()
+        elif app_selection == 'History':
+            history_page()
+        elif app_selection == 'Live Stream':
+            live_stream_page()
+        elif app_selection == 'Admin':
+            admin_page()
+
+        jobs_panel()
+
+        # Keep this session within its memory budget and drop sessions that went idle
+        data_store().enforce_budget()
+        get_registry().evict_idle()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,143 @@
+"""Streaming Play Store backfills: each page is appended to disk as it arrives, with a resumable checkpoint."""
+import fcntl
+import os
+import pickle
+import re
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from google_play_scraper import Sort
+
+from play_transport import get_transport, PageToken
+from shared_cache import CACHE_DIR
+
+BACKFILL_DIR = os.path.join(CACHE_DIR, 'backfills')
+PAGE_SIZE = 200
+
+SCHEMA = pa.schema([('Review', pa.string()), ('Date', pa.timestamp('us')), ('Rating', pa.int64())])
+
+
+class BackfillBusy(RuntimeError):
+    pass
+
+
+def backfill_dir(app_id, sort_order, min_rating, max_rating):
+    name = re.sub(r'[^A-Za-z0-9_.-]', '_', f'{app_id}-{sort_order.name}-{min_rating}-{max_rating}')
+    return os.path.join(BACKFILL_DIR, name)
+
+
+class Checkpoint:
+    """Continuation token and counters of a backfill, rewritten atomically after every page."""
+
+    def __init__(self, path, params):
+        self.path = path
+        self.params = params
+        self.token = None
+        self.rows = 0
+        self.parts = 0
+        self.done = False
+
+    @classmethod
+    def load(cls, path, params):
+        try:
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return cls(path, params)
+        if state.params != params:
+            raise ValueError(f"{path} belongs to a backfill with different parameters: {state.params}")
+        state.path = path
+        return state
+
+    def save(self):
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+
+
+# Exclusive lock on a backfill directory for a whole run, so two sessions never resume from
+# the same checkpoint and write the same parts; a second run is turned away, not queued
+@contextmanager
+def _locked(out_dir):
+    with open(os.path.join(out_dir, 'backfill.lock'), 'w') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise BackfillBusy("Another session is running this backfill; run it again once that one "
+                               "finishes to resume from where it stopped") from None
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _page_table(page):
+    return pa.table({
+        'Review': [review['content'] for review in page],
+        'Date': [review['at'] for review in page],
+        'Rating': [review['score'] for review in page],
+    }, schema=SCHEMA)
+
+
+def stream_google_play_reviews(app_id, num_reviews, sort_order=Sort.NEWEST, min_rating=None, max_rating=None,
+                               out_dir=None, page_size=PAGE_SIZE, progress=None):
+    """Fetch up to `num_reviews` reviews into parquet part files under `out_dir`.
+
+    Only one page is held in memory at a time. Rerunning with the same parameters
+    resumes from the last checkpoint, so an interrupted backfill loses at most a page.
+    Raises BackfillBusy while another run of the same backfill holds its directory.
+    Returns the directory and the checkpoint.
+    """
+    out_dir = out_dir or backfill_dir(app_id, sort_order, min_rating, max_rating)
+    os.makedirs(out_dir, exist_ok=True)
+    with _locked(out_dir):
+        return _stream(app_id, num_reviews, sort_order, min_rating, max_rating, out_dir, page_size, progress)
+
+
+def _stream(app_id, num_reviews, sort_order, min_rating, max_rating, out_dir, page_size, progress):
+    params = (app_id, sort_order.value, min_rating, max_rating, page_size)
+    checkpoint = Checkpoint.load(os.path.join(out_dir, 'checkpoint.pkl'), params)
+    transport = get_transport()
+    filter_score_with = None if min_rating is None and max_rating is None else list(range(min_rating, max_rating + 1))
+
+    while not checkpoint.done and checkpoint.rows < num_reviews:
+        page, token = transport.reviews(
+            app_id,
+            lang='en',
+            country='us',
+            sort=sort_order,
+            count=page_size,
+            filter_score_with=filter_score_with,
+            token=PageToken(checkpoint.token) if checkpoint.token else None
+        )
+        if page:
+            # Part files are numbered by page, so a page rewritten after a crash replaces itself; each is
+            # written under a temporary name and renamed, so readers never see a truncated part
+            path = os.path.join(out_dir, f'part-{checkpoint.parts:06d}.parquet')
+            pq.write_table(_page_table(page), f'{path}.tmp')
+            os.replace(f'{path}.tmp', path)
+            checkpoint.parts += 1
+            checkpoint.rows += len(page)
+        checkpoint.token = token.value
+        checkpoint.done = not token
+        checkpoint.save()
+        if progress is not None:
+            progress(min(checkpoint.rows / num_reviews, 1.0), f"Saved {checkpoint.rows:,} of {num_reviews:,} reviews to disk")
+        if not checkpoint.done:
+            time.sleep(transport.page_delay)  # Add delay to avoid rate limiting
+    return out_dir, checkpoint
+
+
+# Reviews of a backfill directory, optionally only some columns or the first `limit` rows
+def read_backfill(out_dir, columns=None, limit=None):
+    parts = sorted(name for name in os.listdir(out_dir) if name.endswith('.parquet'))
+    if not parts:
+        return pd.DataFrame(columns=columns or SCHEMA.names)
+    table = pq.ParquetDataset([os.path.join(out_dir, name) for name in parts], schema=SCHEMA).read(columns=columns)
+    if limit is not None:
+        table = table.slice(0, limit)
+    return table.to_pandas()
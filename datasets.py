@@ -0,0 +1,10 @@
+"""Helpers for identifying datasets so derived artifacts can be cached per dataset."""
+import hashlib
+
+import pandas as pd
+
+
+# Content fingerprint of a column (values and order), stable across reruns and sessions
+def dataset_fingerprint(values):
+    hashed = pd.util.hash_pandas_object(pd.Series(values).astype(str), index=False)
+    return hashlib.sha256(hashed.to_numpy().tobytes()).hexdigest()[:16]
@@ -0,0 +1,50 @@
+"""Exact-duplicate collapse: process each distinct review text once and broadcast the results."""
+import numpy as np
+import pandas as pd
+
+
+# Case- and whitespace-insensitive key used to decide that two reviews are the same text
+def dedup_key(reviews):
+    return reviews.astype(str).str.lower().str.split().str.join(' ')
+
+
+class DedupPlan:
+    """Maps every row to one representative row per distinct normalized text.
+
+    ``codes[i]`` is the position in ``unique_texts`` of row ``i``'s text, so any
+    per-text result computed on ``unique_texts`` is broadcast back with ``values[codes]``.
+    """
+
+    def __init__(self, reviews):
+        self.index = reviews.index
+        # Missing reviews are empty texts, so every row gets a code (factorize would give NaN -1)
+        reviews = reviews.fillna('')
+        self.codes, _ = pd.factorize(dedup_key(reviews))
+        # Codes are numbered in order of appearance; the first occurrence keeps its original spelling
+        first = np.flatnonzero(~pd.Series(self.codes).duplicated().to_numpy())
+        self.unique_texts = reviews.iloc[first].reset_index(drop=True)
+
+    @property
+    def num_rows(self):
+        return len(self.codes)
+
+    @property
+    def num_unique(self):
+        return len(self.unique_texts)
+
+    @property
+    def ratio(self):
+        # Share of rows that were duplicates of an earlier row
+        return 1 - self.num_unique / self.num_rows if self.num_rows else 0.0
+
+    def broadcast(self, values):
+        if isinstance(values, pd.DataFrame):
+            return values.iloc[self.codes].set_index(self.index)
+        return pd.Series(np.asarray(values)[self.codes], index=self.index)
+
+    # Apply `func` once per distinct text and broadcast the results to every row
+    def map(self, func):
+        return self.broadcast(self.unique_texts.map(func))
+
+    def summary(self):
+        return f"{self.num_rows:,} rows, {self.num_unique:,} unique texts ({self.ratio:.0%} duplicates processed once)"
@@ -0,0 +1,139 @@
+"""Hashed unigram/bigram features computed once per dataset, stored as CSR arrays and loaded memory-mapped."""
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from joblib import Parallel, delayed
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.utils import murmurhash3_32
+
+from datasets import dataset_fingerprint
+from dedup import DedupPlan
+from shared_cache import CACHE_DIR
+
+FEATURES_DIR = os.path.join(CACHE_DIR, 'features')
+# Bumped whenever the featurization changes so stores built by older code are not reused
+FEATURES_VERSION = 1
+N_FEATURES = 2 ** 20
+NGRAM_RANGE = (1, 2)
+CHUNK_SIZE = 20000
+
+_ARRAYS = ('data', 'indices', 'indptr', 'codes')
+
+
+# Fixed-dimension hashing vectorizer: no vocabulary to fit, so any chunk can be featurized on its own
+def make_vectorizer():
+    # Texts are already normalized (see normalize.py), so no further lowercasing
+    return HashingVectorizer(n_features=N_FEATURES, ngram_range=NGRAM_RANGE, lowercase=False,
+                             alternate_sign=False, norm=None, dtype=np.float32)
+
+
+def _featurize(texts):
+    return make_vectorizer().transform(texts)
+
+
+class FeatureStore:
+    """Raw hashed term counts of a dataset's distinct texts.
+
+    ``matrix`` has one row per distinct text and ``codes`` maps every dataset row to
+    its matrix row, as in DedupPlan. Arrays are memory-mapped, so loading is instant
+    and only the rows an analysis touches are read from disk.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.meta = None
+        self.matrix = None
+        self.codes = None
+
+    @property
+    def exists(self):
+        return os.path.exists(os.path.join(self.directory, 'meta.json'))
+
+    def load(self):
+        with open(os.path.join(self.directory, 'meta.json')) as f:
+            self.meta = json.load(f)
+        arrays = {name: np.load(os.path.join(self.directory, f'{name}.npy'), mmap_mode='r') for name in _ARRAYS}
+        self.matrix = sparse.csr_matrix(
+            (arrays['data'], arrays['indices'], arrays['indptr']), shape=tuple(self.meta['shape']), copy=False
+        )
+        self.codes = arrays['codes']
+        return self
+
+    # Feature rows of the given dataset rows (positions), read chunk by chunk by callers
+    def rows(self, positions):
+        return self.matrix[self.codes[positions]]
+
+    def estimated_size(self):
+        # Memory-mapped arrays live in the page cache, not in the session
+        return 64
+
+
+# Most frequent term in `texts` behind each hashed column (all columns, or only `columns`),
+# for naming columns in results
+def column_terms(texts, columns=None):
+    analyzer = make_vectorizer().build_analyzer()
+    wanted = None if columns is None else set(int(c) for c in columns)
+    counts = {}
+    for text in texts:
+        for term in analyzer(text):
+            column = abs(murmurhash3_32(term, seed=0)) % N_FEATURES
+            if wanted is None or column in wanted:
+                by_term = counts.setdefault(column, {})
+                by_term[term] = by_term.get(term, 0) + 1
+    return {column: max(by_term, key=by_term.get) for column, by_term in counts.items()}
+
+
+def build_feature_store(directory, texts, n_jobs=-1, chunk_size=CHUNK_SIZE, progress=None):
+    """Featurize the distinct texts of `texts` in parallel chunks and save them under `directory`."""
+    plan = DedupPlan(texts)
+    unique = plan.unique_texts
+    chunks = [unique.iloc[start:start + chunk_size].tolist() for start in range(0, len(unique), chunk_size)]
+    parts = []
+    jobs = Parallel(n_jobs=n_jobs, return_as='generator')(delayed(_featurize)(chunk) for chunk in chunks)
+    for i, part in enumerate(jobs):
+        parts.append(part)
+        if progress is not None:
+            progress((i + 1) / len(chunks), f"Featurized {min((i + 1) * chunk_size, len(unique)):,} of {len(unique):,} distinct texts")
+    matrix = sparse.vstack(parts, format='csr') if parts else sparse.csr_matrix((0, N_FEATURES), dtype=np.float32)
+    # Matching index dtypes keep scipy from copying the memory-mapped arrays on load
+    index_dtype = np.int32 if matrix.nnz < 2 ** 31 else np.int64
+
+    tmp_dir = tempfile.mkdtemp(prefix=os.path.basename(directory) + '.', suffix='.tmp', dir=os.path.dirname(directory))
+    np.save(os.path.join(tmp_dir, 'data.npy'), matrix.data.astype(np.float32, copy=False))
+    np.save(os.path.join(tmp_dir, 'indices.npy'), matrix.indices.astype(index_dtype, copy=False))
+    np.save(os.path.join(tmp_dir, 'indptr.npy'), matrix.indptr.astype(index_dtype, copy=False))
+    np.save(os.path.join(tmp_dir, 'codes.npy'), plan.codes.astype(np.int64, copy=False))
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump({
+            'version': FEATURES_VERSION,
+            'n_features': N_FEATURES,
+            'ngram_range': list(NGRAM_RANGE),
+            'shape': list(matrix.shape),
+            'rows': plan.num_rows,
+        }, f)
+    # Published with one atomic rename, never removing a store a reader may have mapped. Store names
+    # come from the texts, so when a concurrent build published first its store is the same: keep it
+    try:
+        os.rename(tmp_dir, directory)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not FeatureStore(directory).exists:
+            raise
+
+
+def get_feature_store(texts, parent=None, progress=None):
+    """Feature store of `texts` (normalized review text), built on first use and memory-mapped afterwards.
+
+    Stores live in `parent` (next to the dataset, e.g. a backfill directory) or in the
+    shared features directory, named by the text fingerprint.
+    """
+    directory = os.path.join(parent or FEATURES_DIR, f'features-{dataset_fingerprint(texts)}-v{FEATURES_VERSION}')
+    store = FeatureStore(directory)
+    if not store.exists:
+        os.makedirs(os.path.dirname(directory), exist_ok=True)
+        build_feature_store(directory, texts, progress=progress)
+    return store.load()
@@ -0,0 +1,397 @@
+"""Upload ingestion: read only the review column (and its date and rating) from CSV, Parquet,
+Arrow IPC and JSON Lines files, or from a zip archive of any of them.
+
+For CSV the first SNIFF_BYTES of a file decide its encoding, delimiter and header;
+the parse itself is Arrow's multithreaded CSV reader (or Polars' on the polars
+engine) with column projection, so the other columns of a wide export are tokenized
+but never converted. Files Arrow or Polars reject (for example rows with missing
+fields) fall back to pandas' reader with the same format and projection.
+
+Parquet reads only the selected column chunks, Arrow IPC columns are selected
+without copying the upload's buffers, and JSON Lines are parsed in streamed
+batches with only the selected fields kept. The members of a zip archive are
+read in parallel worker processes and combined with a Source column.
+"""
+import codecs
+import csv
+import io
+import json
+import os
+import tempfile
+import zipfile
+from collections import Counter
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.json as pajson
+import pyarrow.parquet as pq
+from joblib import Parallel, delayed
+from polars.exceptions import PolarsError
+
+import polars_backend
+
+SNIFF_BYTES = 256 * 1024
+SNIFF_ROWS = 50
+DELIMITERS = ',;\t|'
+BLOCK_SIZE = 16 * 2**20
+
+# Column name keywords for the review text and the metadata kept with it
+REVIEW_KEYWORDS = ('review', 'comment', 'feedback', 'text', 'content')
+DATE_KEYWORDS = ('date', 'time', 'created')
+RATING_KEYWORDS = ('rating', 'stars')
+# Cells read as missing: the markers pandas.read_csv treats as NA by default, so every reader agrees
+NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN', '<NA>', 'N/A',
+             'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+# Upload formats by file extension
+FORMATS = {
+    '.csv': 'csv', '.tsv': 'csv', '.txt': 'text',
+    '.parquet': 'parquet', '.pq': 'parquet',
+    '.arrow': 'arrow', '.feather': 'arrow', '.ipc': 'arrow',
+    '.jsonl': 'jsonl', '.ndjson': 'jsonl',
+    '.zip': 'zip',
+}
+UPLOAD_TYPES = [extension[1:] for extension in FORMATS]
+
+
+class CsvFormat:
+    """Encoding, delimiter and header of a CSV file, as sniffed from its first bytes."""
+
+    def __init__(self, encoding, delimiter, columns):
+        self.encoding = encoding
+        self.delimiter = delimiter
+        self.columns = columns
+
+    def __repr__(self):
+        return f"CsvFormat(encoding={self.encoding!r}, delimiter={self.delimiter!r}, columns={len(self.columns)})"
+
+
+# UTF-8 when the bytes decode as UTF-8 (a character cut off at the end of a sample is fine),
+# else cp1252 for Windows exports, else latin-1, which decodes anything
+def sniff_encoding(sample, complete=True):
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    for encoding in ('utf-8', 'cp1252'):
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=complete)
+            return encoding
+        except UnicodeDecodeError:
+            pass
+    return 'latin-1'
+
+
+def _sample_text(data, encoding):
+    sample = data[:SNIFF_BYTES]
+    text = codecs.getincrementaldecoder(encoding)(errors='replace').decode(sample, final=len(sample) == len(data))
+    return text.lstrip('\ufeff')
+
+
+def _rows(text, delimiter, truncated, limit=SNIFF_ROWS):
+    rows = []
+    try:
+        for row in csv.reader(io.StringIO(text), delimiter=delimiter):
+            if row:
+                rows.append(row)
+            if len(rows) > limit:
+                return rows[:limit]
+    except csv.Error:
+        pass
+    # The last row of a cut-off sample is usually incomplete
+    return rows[:-1] if truncated and len(rows) > 1 else rows
+
+
+# The delimiter whose sample rows most often have as many fields as the header, then the most fields
+def sniff_delimiter(text, truncated=False):
+    best, best_score = ',', (0, 0)
+    for delimiter in DELIMITERS:
+        rows = _rows(text, delimiter, truncated)
+        if not rows or len(rows[0]) < 2:
+            continue
+        width = len(rows[0])
+        score = (sum(len(row) == width for row in rows) / len(rows), width)
+        if score > best_score:
+            best, best_score = delimiter, score
+    return best
+
+
+# Header names as pandas gives them: blanks become 'Unnamed: i', repeats get '.1', '.2', ...
+def _column_names(header):
+    names = []
+    seen = Counter()
+    for i, name in enumerate(header):
+        name = name or f'Unnamed: {i}'
+        base = name
+        while name in seen:
+            name = f'{base}.{seen[base]}'
+            seen[base] += 1
+        seen[name] += 1
+        names.append(name)
+    return names
+
+
+def sniff_csv(data):
+    sample = data[:SNIFF_BYTES]
+    encoding = sniff_encoding(sample, complete=len(sample) == len(data))
+    text = _sample_text(data, encoding)
+    delimiter = sniff_delimiter(text, truncated=len(sample) < len(data))
+    header = next(csv.reader(io.StringIO(text), delimiter=delimiter), [])
+    return CsvFormat(encoding, delimiter, _column_names(header))
+
+
+# The first column whose name looks like review text, or None
+def review_column(columns):
+    for col in columns:
+        if any(keyword in str(col).lower() for keyword in REVIEW_KEYWORDS):
+            return col
+    return None
+
+
+def is_date_column(col):
+    col_lower = str(col).lower()
+    return col_lower == 'at' or any(keyword in col_lower for keyword in DATE_KEYWORDS)
+
+
+def is_rating_column(col):
+    col_lower = str(col).lower()
+    return col_lower == 'score' or any(keyword in col_lower for keyword in RATING_KEYWORDS)
+
+
+# The review column and every column that may hold its date or rating
+def needed_columns(columns, review_col):
+    return [review_col] + [col for col in columns if col != review_col and (is_date_column(col) or is_rating_column(col))]
+
+
+def _read_arrow(data, fmt, columns):
+    table = pacsv.read_csv(
+        pa.BufferReader(data),
+        read_options=pacsv.ReadOptions(use_threads=True, block_size=BLOCK_SIZE, column_names=fmt.columns,
+                                       skip_rows=1, encoding=fmt.encoding),
+        parse_options=pacsv.ParseOptions(delimiter=fmt.delimiter, newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(include_columns=columns, column_types={col: pa.string() for col in columns},
+                                             null_values=NA_VALUES, strings_can_be_null=True,
+                                             quoted_strings_can_be_null=True),
+    )
+    return table.to_pandas()
+
+
+# pandas cuts rows with more fields than the header short without a word (an unquoted comma
+# in a one-column file turns "hello, world" into "hello"), so such a row is an error instead
+def _check_row_widths(data, fmt):
+    rows = csv.reader(io.TextIOWrapper(io.BytesIO(data), encoding=fmt.encoding, errors='replace', newline=''),
+                      delimiter=fmt.delimiter)
+    try:
+        next(rows, None)
+        for row in rows:
+            if len(row) > len(fmt.columns):
+                raise ValueError(f"Line {rows.line_num} has {len(row)} fields but the header has {len(fmt.columns)}; "
+                                 f"quote values that contain {fmt.delimiter!r}")
+    except csv.Error:
+        pass
+
+
+def _read_pandas(data, fmt, columns):
+    return pd.read_csv(io.BytesIO(data), sep=fmt.delimiter, encoding=fmt.encoding, names=fmt.columns, header=0,
+                       usecols=columns, dtype=str)[columns]
+
+
+# Only the given columns (default all) of a CSV, every one as text with pandas' missing-value markers
+def read_csv(data, columns=None, fmt=None, engine='pandas'):
+    fmt = fmt or sniff_csv(data)
+    columns = list(fmt.columns if columns is None else columns)
+    try:
+        if engine == 'polars':
+            return polars_backend.read_csv(data, fmt.encoding, fmt.delimiter, fmt.columns, columns, NA_VALUES)
+        return _read_arrow(data, fmt, columns)
+    except (pa.ArrowInvalid, PolarsError):
+        # Invalid UTF-8 past the sniffed sample: decide the encoding on the whole file instead
+        if fmt.encoding == 'utf-8':
+            encoding = sniff_encoding(data)
+            if encoding != 'utf-8':
+                return read_csv(data, columns, CsvFormat(encoding, fmt.delimiter, fmt.columns), engine)
+        _check_row_widths(data, fmt)
+        return _read_pandas(data, fmt, columns)
+
+
+# Text of a plain-text upload, in the encoding sniffed from its first bytes
+def decode(data):
+    try:
+        return codecs.decode(data, sniff_encoding(data[:SNIFF_BYTES], complete=len(data) <= SNIFF_BYTES)).lstrip('\ufeff')
+    except UnicodeDecodeError:
+        return codecs.decode(data, sniff_encoding(data)).lstrip('\ufeff')
+
+
+def file_format(name):
+    return FORMATS.get(os.path.splitext(name)[1].lower())
+
+
+class CsvSource:
+    """A CSV upload: its columns are known from the sniffed header before anything is parsed."""
+
+    def __init__(self, data):
+        self.data = data
+        self.format = sniff_csv(data)
+        self.columns = self.format.columns
+
+    def read(self, columns, engine='pandas'):
+        return read_csv(self.data, columns, self.format, engine)
+
+
+class ParquetSource:
+    """A Parquet upload; only the column chunks of the selected columns are decoded."""
+
+    def __init__(self, data):
+        self.file = pq.ParquetFile(pa.BufferReader(data))
+        self.columns = self.file.schema_arrow.names
+
+    def read(self, columns, engine='pandas'):
+        return self.file.read(columns=columns, use_threads=True).to_pandas()
+
+
+class ArrowSource:
+    """An Arrow IPC file or stream upload; selected columns keep pointing into the upload's buffer."""
+
+    def __init__(self, data):
+        buffer = pa.py_buffer(data)
+        try:
+            self.table = pa.ipc.open_file(buffer).read_all()
+        except pa.ArrowInvalid:
+            self.table = pa.ipc.open_stream(buffer).read_all()
+        self.columns = self.table.column_names
+
+    def read(self, columns, engine='pandas'):
+        return self.table.select(columns).to_pandas()
+
+
+# Arrow type of a JSON field from the values seen in the sample, or None when they disagree
+def _json_type(values):
+    kinds = {type(value) for value in values if value is not None}
+    if kinds <= {str}:
+        return pa.string()
+    if kinds <= {int, float}:
+        return pa.float64()
+    if kinds == {bool}:
+        return pa.bool_()
+    return None
+
+
+class JsonlSource:
+    """A JSON Lines upload: the fields are those of the first rows, and only the selected ones are parsed."""
+
+    def __init__(self, data):
+        self.buffer = pa.py_buffer(data)
+        if data.startswith(codecs.BOM_UTF8):
+            self.buffer = self.buffer[len(codecs.BOM_UTF8):]
+        sample = self.buffer[:SNIFF_BYTES].to_pybytes()
+        lines = sample.splitlines()
+        if len(sample) < self.buffer.size:
+            lines = lines[:-1]  # The last line of a cut-off sample is usually incomplete
+        self.rows = [json.loads(line) for line in lines[:SNIFF_ROWS] if line.strip()]
+        self.columns = list(dict.fromkeys(key for row in self.rows if isinstance(row, dict) for key in row))
+
+    def read(self, columns, engine='pandas'):
+        types = {col: _json_type(row.get(col) for row in self.rows) for col in columns}
+        if None not in types.values():
+            schema = pa.schema([(col, types[col]) for col in columns])
+            try:
+                reader = pajson.open_json(
+                    pa.BufferReader(self.buffer),
+                    read_options=pajson.ReadOptions(block_size=BLOCK_SIZE),
+                    parse_options=pajson.ParseOptions(explicit_schema=schema, unexpected_field_behavior='ignore'),
+                )
+                return pa.Table.from_batches(list(reader), schema=schema).to_pandas()
+            except pa.ArrowInvalid:
+                pass
+        # Fields whose type varies between rows: pandas' reader, still one chunk at a time
+        chunks = pd.read_json(io.BytesIO(self.buffer.to_pybytes()), lines=True, dtype=False, chunksize=100_000)
+        return pd.concat([chunk.reindex(columns=columns) for chunk in chunks], ignore_index=True)
+
+
+SOURCES = {'csv': CsvSource, 'parquet': ParquetSource, 'arrow': ArrowSource, 'jsonl': JsonlSource}
+
+
+# A reader for a columnar or delimited upload of the given format (see FORMATS)
+def open_source(data, kind):
+    return SOURCES[kind](data)
+
+
+# Review date and star rating columns of an uploaded file, when it has them
+def review_metadata(df, review_col):
+    columns = {}
+    for col in df.columns:
+        if col == review_col:
+            continue
+        if 'Date' not in columns and is_date_column(col):
+            dates = pd.to_datetime(df[col], errors='coerce', format='mixed', utc=True).dt.tz_convert(None)
+            if dates.notna().mean() >= 0.5:
+                columns['Date'] = dates
+        elif 'Rating' not in columns and is_rating_column(col):
+            ratings = pd.to_numeric(df[col], errors='coerce')
+            if ratings.notna().any():
+                columns['Rating'] = ratings
+    return columns
+
+
+# The Review column of an upload with the Date and Rating found next to it
+def source_reviews(source, review_col, engine='pandas'):
+    df = source.read(needed_columns(source.columns, review_col), engine)
+    return pd.DataFrame({
+        'Review': df[review_col].astype(str),
+        **review_metadata(df, review_col)
+    })
+
+
+def text_reviews(data):
+    reviews = [line.strip() for line in decode(data).split('\n') if line.strip()]
+    return pd.DataFrame({'Review': reviews})
+
+
+def _is_member_file(info):
+    name = info.filename
+    return not info.is_dir() and not name.startswith('__MACOSX/') and not os.path.basename(name).startswith('.') \
+        and file_format(name) not in (None, 'zip')
+
+
+# Reviews of one archive member, read inside a worker process; None when it has no review column
+def _member_reviews(path, name, review_col, engine):
+    with zipfile.ZipFile(path) as archive:
+        data = archive.read(name)
+    kind = file_format(name)
+    if kind == 'text':
+        return text_reviews(data)
+    source = open_source(data, kind)
+    if review_col not in source.columns:
+        review_col = review_column(source.columns)
+        if review_col is None:
+            return None
+    return source_reviews(source, review_col, engine)
+
+
+def read_zip(data, review_col=None, engine='pandas', n_jobs=-1):
+    """Read every supported file in a zip archive into one frame with a Source column.
+
+    Members are read in parallel worker processes. The review column is `review_col`
+    where a member has it, else the one detected from its column names. Returns the
+    frame and the names of the members that were skipped.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'upload.zip')
+        with open(path, 'wb') as f:
+            f.write(data)
+        with zipfile.ZipFile(path) as archive:
+            infos = archive.infolist()
+        names = [info.filename for info in infos if _is_member_file(info)]
+        skipped = [info.filename for info in infos if not info.is_dir() and info.filename not in names]
+        n_jobs = min(len(names), os.cpu_count() or 1) if n_jobs == -1 else n_jobs
+        frames = Parallel(n_jobs=max(n_jobs, 1))(
+            delayed(_member_reviews)(path, name, review_col, engine) for name in names)
+    parts = []
+    for name, frame in zip(names, frames):
+        if frame is None:
+            skipped.append(name)
+            continue
+        frame['Source'] = pd.Series(name, index=frame.index, dtype='str')
+        parts.append(frame)
+    if not parts:
+        return None, skipped
+    return pd.concat(parts, ignore_index=True), skipped
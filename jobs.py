@@ -0,0 +1,122 @@
+"""Process-wide background job runner so long analyses survive Streamlit reruns."""
+import itertools
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """One row of the job table; updated by the worker thread, read by any session."""
+
+    def __init__(self, job_id, name, owner):
+        self.id = job_id
+        self.name = name
+        self.owner = owner
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = 'Waiting for a worker'
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    # Progress callback handed to the stage function; also the cancellation point
+    def report(self, fraction, message=None):
+        if self._cancel.is_set():
+            raise JobCancelled()
+        self.progress = min(max(float(fraction), 0.0), 1.0)
+        if message is not None:
+            self.message = message
+
+
+class JobRunner:
+    """Runs stage functions on a thread pool and keeps a table of their status and results.
+
+    Stage functions are called as ``func(*args, progress=job.report, **kwargs)`` and must
+    not touch Streamlit; ``progress`` raises JobCancelled once cancellation is requested.
+    """
+
+    def __init__(self, max_workers=4, retention=6 * 3600):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='revai-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.retention = retention
+
+    def submit(self, name, func, *args, owner=None, **kwargs):
+        with self._lock:
+            self._prune()
+            job = Job(f'job-{next(self._ids)}', name, owner)
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job.id
+
+    def _run(self, job, func, args, kwargs):
+        if job.cancel_requested:
+            job.status, job.finished_at = CANCELLED, time.time()
+            return
+        job.status, job.started, job.message = RUNNING, time.time(), 'Running'
+        try:
+            job.result = func(*args, progress=job.report, **kwargs)
+            job.status, job.progress, job.message = DONE, 1.0, 'Finished'
+        except JobCancelled:
+            job.status, job.message = CANCELLED, 'Cancelled'
+        except Exception as e:
+            job.status, job.message = FAILED, str(e)
+            job.error = traceback.format_exc()
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is not None and not job.finished:
+            job._cancel.set()
+            if job.status == QUEUED:
+                job.message = 'Cancelling'
+
+    def jobs(self, owner=None):
+        with self._lock:
+            return [j for j in self._jobs.values() if owner is None or j.owner == owner]
+
+    # Forget finished jobs older than the retention period
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
@@ -0,0 +1,115 @@
+"""Keyness: the terms that set each group of reviews apart, for every group of several groupings at once.
+
+A review × term count matrix X is built once over the distinct texts. Stacking the
+one-hot group indicators of every grouping (sentiment type, Category, ...) into Y,
+the count of every term in every group is the single sparse product Y.T @ X, so two
+groups cost the same as twenty. Each group is then compared with the rest of its
+grouping by
+
+* the log-odds ratio with an informative Dirichlet prior (Monroe, Colaresi and Quinn,
+  2008), as a z-score: words frequent everywhere, like "app", stay near zero;
+* Pearson's chi-square on the 2x2 table of the term's and all other tokens' counts.
+"""
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+
+METRICS = {'log_odds': "Log-odds z-score", 'chi2': "Chi-square"}
+# Weight of the prior, in multiples of the corpus' own term counts
+PRIOR_SCALE = 1.0
+
+
+class Keyness:
+    """Term counts per group with keyness statistics of each group against the rest of its grouping."""
+
+    def __init__(self, terms, groups, counts, term_totals, prior_scale=PRIOR_SCALE):
+        self.terms = terms
+        self.groups = groups
+        self.counts = counts
+        self.prior = term_totals * prior_scale
+        self._positions = {group: i for i, group in enumerate(groups)}
+
+    # No term survived tokenization, stop words, exclusions and min_count
+    @property
+    def empty(self):
+        return len(self.terms) == 0
+
+    def values(self, grouping):
+        return [value for name, value in self.groups if name == grouping]
+
+    def estimated_size(self):
+        return int(self.terms.nbytes + self.prior.nbytes + self.counts.data.nbytes + self.counts.indices.nbytes
+                   + self.counts.indptr.nbytes)
+
+    def statistics(self, grouping, value):
+        """Count, log-odds z-score and chi-square of every term in one group against the rest of its grouping."""
+        rows = [self._positions[(grouping, other)] for other in self.values(grouping)]
+        grouping_counts = np.asarray(self.counts[rows].sum(axis=0), dtype=float).ravel()
+        counts = self.counts[self._positions[(grouping, value)]].toarray().ravel().astype(float)
+        rest = grouping_counts - counts
+        n_group, n_rest = counts.sum(), rest.sum()
+
+        prior, prior_total = self.prior, self.prior.sum()
+        log_odds = (np.log((counts + prior) / (n_group + prior_total - counts - prior))
+                    - np.log((rest + prior) / (n_rest + prior_total - rest - prior)))
+        z = log_odds / np.sqrt(1 / (counts + prior) + 1 / (rest + prior))
+
+        other_group, other_rest = n_group - counts, n_rest - rest
+        denominator = n_group * n_rest * grouping_counts * (other_group + other_rest)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            chi2 = np.where(denominator > 0,
+                            (n_group + n_rest) * (counts * other_rest - other_group * rest) ** 2 / denominator, 0.0)
+        return pd.DataFrame({'word': self.terms, 'count': counts.astype(np.int64), 'log_odds': z, 'chi2': chi2})
+
+    # The terms over-represented in a group, most distinctive first
+    def top(self, grouping, value, limit=20, by='log_odds'):
+        stats = self.statistics(grouping, value)
+        stats = stats[(stats['count'] > 0) & (stats['log_odds'] > 0)]
+        return stats.sort_values(by, ascending=False, kind='stable').head(limit).reset_index(drop=True)
+
+
+def build_keyness(texts, groupings, stop_words=(), exclude_words='', min_count=1, prior_scale=PRIOR_SCALE):
+    """Count terms per group for every column of `groupings` (aligned with `texts`) in one aggregation.
+
+    Terms are the whitespace-separated words of the normalized `texts`, without stop
+    words and the comma-separated `exclude_words`, occurring at least `min_count` times.
+    Rows whose group is missing are left out of that grouping.
+    """
+    codes, unique_texts = pd.factorize(texts.fillna(''))
+    if not any(map(str.split, unique_texts)):
+        # Only empty or whitespace texts: CountVectorizer refuses an empty vocabulary
+        return Keyness(np.array([], dtype=object), [], sparse.csr_matrix((0, 0), dtype=np.int64), np.zeros(0), prior_scale)
+    vectorizer = CountVectorizer(analyzer=str.split, dtype=np.int64)
+    unique_counts = vectorizer.fit_transform(unique_texts).tocsc()
+    terms = vectorizer.get_feature_names_out()
+    excluded = set(stop_words) | {word for word in exclude_words.split(',') if word}
+    term_totals = (unique_counts.T @ np.bincount(codes, minlength=len(unique_texts))).astype(float)
+    keep = np.flatnonzero((term_totals >= min_count) & ~np.isin(terms, list(excluded)))
+    unique_counts = unique_counts[:, keep].tocsr()
+
+    # One row per (grouping, value), one column per distinct text: Y.T @ (rows -> distinct texts)
+    groups, group_rows, text_columns = [], [], []
+    for grouping in groupings.columns:
+        group_codes, values = pd.factorize(groupings[grouping])
+        present = group_codes >= 0
+        group_rows.append(group_codes[present] + len(groups))
+        text_columns.append(codes[present])
+        groups.extend((grouping, value) for value in values)
+    group_rows = np.concatenate(group_rows) if group_rows else np.array([], dtype=np.int64)
+    text_columns = np.concatenate(text_columns) if text_columns else np.array([], dtype=np.int64)
+    membership = sparse.csr_matrix((np.ones(len(group_rows)), (group_rows, text_columns)),
+                                   shape=(len(groups), len(unique_texts)))
+    return Keyness(terms[keep], groups, (membership @ unique_counts).tocsr(), term_totals[keep], prior_scale)
+
+
+def keyness_from_counts(counts, grouping, min_count=1, prior_scale=PRIOR_SCALE):
+    """Keyness of one grouping from a long table of value, word and count, as a database aggregation returns it."""
+    value_codes, values = pd.factorize(counts['value'])
+    term_codes, terms = pd.factorize(counts['word'], sort=True)
+    matrix = sparse.csr_matrix((counts['count'].to_numpy(np.int64), (value_codes, term_codes)),
+                               shape=(len(values), len(terms)))
+    term_totals = np.asarray(matrix.sum(axis=0), dtype=float).ravel()
+    keep = np.flatnonzero(term_totals >= min_count)
+    groups = [(grouping, value) for value in values]
+    return Keyness(np.asarray(terms, dtype=object)[keep], groups, matrix[:, keep].tocsr(), term_totals[keep], prior_scale)
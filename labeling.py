@@ -0,0 +1,125 @@
+"""Review labeling against the keyword taxonomies in `taxonomies/`."""
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from taxonomy import get_taxonomy, get_hit_scanner
+
+
+# Assign a Process / Technology / People area to a review
+def classify_review(review):
+    return get_taxonomy('areas').match(str(review).lower())
+
+
+# Assign a customer-service category to a review
+def categorize_review(review):
+    return get_taxonomy('categories').match(str(review).lower())
+
+
+# Lowercased text to match against; normalized text (see normalize.py) is already lowercase.
+# Missing reviews match as empty text (astype(str) keeps them missing under pandas 3)
+def _lowered(reviews, normalized):
+    return reviews if normalized else reviews.fillna('').astype(str).str.lower()
+
+
+# Label a whole column, resolving each taxonomy once instead of once per row
+def label_reviews(reviews, normalized=False):
+    areas = get_taxonomy('areas')
+    categories = get_taxonomy('categories')
+    lowered = _lowered(reviews, normalized)
+    return pd.DataFrame({
+        'Label': lowered.map(areas.match),
+        'Category': lowered.map(categories.match),
+    }, index=reviews.index)
+
+
+class LabelHits:
+    """Sparse review x label matrix of keyword hit counts for the areas and categories taxonomies.
+
+    Columns are ``(taxonomy name, label)`` pairs in taxonomy priority order, so the
+    first non-zero column of a taxonomy is exactly what classify/categorize return.
+    """
+
+    def __init__(self, matrix, columns, fallbacks, index, taxonomy_hash):
+        self.matrix = matrix
+        self.columns = columns
+        self.fallbacks = fallbacks
+        self.index = index
+        self.taxonomy_hash = taxonomy_hash
+
+    def _columns_of(self, taxonomy):
+        return [i for i, (name, _) in enumerate(self.columns) if name == taxonomy]
+
+    def labels_of(self, taxonomy):
+        return [self.columns[i][1] for i in self._columns_of(taxonomy)]
+
+    # First matching label per review, identical to the single-label functions
+    def primary(self, taxonomy):
+        cols = self._columns_of(taxonomy)
+        hits = self.matrix[:, cols].tocsr()
+        hits.eliminate_zeros()
+        # Column indices are sorted within each row, so the row's first entry is its primary label
+        has_hit = np.diff(hits.indptr) > 0
+        first = np.zeros(hits.shape[0], dtype=np.int64)
+        first[has_hit] = hits.indices[hits.indptr[:-1][has_hit]]
+        names = np.array(self.labels_of(taxonomy) + [self.fallbacks[taxonomy]], dtype=object)
+        first[~has_hit] = len(cols)
+        return pd.Series(names[first], index=self.index)
+
+    def primary_labels(self):
+        return pd.DataFrame({
+            'Label': self.primary('areas'),
+            'Category': self.primary('categories'),
+        }, index=self.index)
+
+    # Label x label matrix of how many reviews mention both
+    def co_occurrence(self, taxonomy='categories'):
+        cols = self._columns_of(taxonomy)
+        present = (self.matrix[:, cols] > 0).astype(np.int32)
+        counts = (present.T @ present).toarray()
+        labels = self.labels_of(taxonomy)
+        return pd.DataFrame(counts, index=labels, columns=labels)
+
+    # Boolean mask of reviews that mention `label` anywhere, whatever their primary label
+    def mentions(self, label, taxonomy='categories'):
+        column = self.columns.index((taxonomy, label))
+        return pd.Series(self.matrix[:, column].toarray().ravel() > 0, index=self.index)
+
+    # Expand hits computed on distinct texts back to every row of a DedupPlan
+    def broadcast(self, plan):
+        return LabelHits(self.matrix[plan.codes], self.columns, self.fallbacks, plan.index, self.taxonomy_hash)
+
+    # Same hits attached to another row index of equal length
+    def with_index(self, index):
+        return LabelHits(self.matrix, self.columns, self.fallbacks, index, self.taxonomy_hash)
+
+    # Comma-separated non-primary labels each review also mentions
+    def also_mentions(self, taxonomy='categories'):
+        cols = self._columns_of(taxonomy)
+        hits = self.matrix[:, cols].tocsr()
+        labels = self.labels_of(taxonomy)
+        others = [
+            ', '.join(labels[j] for j in hits.indices[start + 1:end])
+            for start, end in zip(hits.indptr[:-1], hits.indptr[1:])
+        ]
+        return pd.Series(others, index=self.index)
+
+
+# Record every area and category hit, with counts, in a single scan per review
+def label_hits(reviews, normalized=False):
+    scanner = get_hit_scanner('areas', 'categories')
+    indptr = [0]
+    indices = []
+    data = []
+    for text in _lowered(reviews, normalized):
+        counts = scanner.scan(text)
+        for column in sorted(counts):
+            indices.append(column)
+            data.append(counts[column])
+        indptr.append(len(indices))
+    matrix = sparse.csr_matrix(
+        (np.array(data, dtype=np.int32), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+        shape=(len(indptr) - 1, len(scanner.columns))
+    )
+    fallbacks = {name: get_taxonomy(name).fallback for name in scanner.taxonomies}
+    return LabelHits(matrix, scanner.columns, fallbacks, reviews.index, scanner.content_hash)
@@ -0,0 +1,103 @@
+"""Near-duplicate review clustering with MinHash signatures and LSH banding."""
+import re
+import zlib
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+TOKEN_RE = re.compile(r"\w+")
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+
+
+# Hashes of the word k-shingles of a text; short texts become a single shingle
+def shingle_hashes(text, shingle_size=3):
+    tokens = TOKEN_RE.findall(str(text).lower())
+    if len(tokens) <= shingle_size:
+        return [zlib.crc32(' '.join(tokens).encode('utf-8'))]
+    return list({
+        zlib.crc32(' '.join(tokens[i:i + shingle_size]).encode('utf-8'))
+        for i in range(len(tokens) - shingle_size + 1)
+    })
+
+
+class MinHasher:
+    """Universal-hash MinHash over 32-bit shingle hashes; fixed seed so signatures are reproducible."""
+
+    def __init__(self, num_perm=64, seed=1):
+        rng = np.random.default_rng(seed)
+        # a, b < 2**32 and shingle hashes < 2**32 keep a * x + b inside uint64
+        self.a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signatures(self, texts, shingle_size=3, chunk_size=20000):
+        texts = list(texts)
+        signatures = np.empty((len(texts), self.num_perm), dtype=np.uint64)
+        for start in range(0, len(texts), chunk_size):
+            shingles = [shingle_hashes(t, shingle_size) for t in texts[start:start + chunk_size]]
+            lengths = np.fromiter((len(s) for s in shingles), dtype=np.int64, count=len(shingles))
+            flat = np.fromiter((h for s in shingles for h in s), dtype=np.uint64, count=int(lengths.sum()))
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            # One permutation at a time, in place: a num_perm x shingles matrix of 20k long reviews runs to gigabytes
+            hashed = np.empty_like(flat)
+            for i in range(self.num_perm):
+                np.multiply(flat, self.a[i], out=hashed)
+                hashed += self.b[i]
+                hashed %= MERSENNE_PRIME
+                signatures[start:start + len(shingles), i] = np.minimum.reduceat(hashed, offsets)
+        return signatures
+
+
+# Candidate pairs from LSH bands: every member of a bucket is linked to the bucket's first member
+def _band_edges(signatures, bands):
+    rows = signatures.shape[1] // bands
+    sources, targets = [], []
+    for band in range(bands):
+        block = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        keys = block.view(np.dtype((np.void, block.dtype.itemsize * rows))).ravel()
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        representative = first[inverse]
+        linked = np.flatnonzero(representative != np.arange(len(keys)))
+        sources.append(linked)
+        targets.append(representative[linked])
+    return np.concatenate(sources), np.concatenate(targets)
+
+
+# Estimated Jaccard similarity of every candidate pair, gathering the pairs' signatures a block at a time
+def _similarity(signatures, sources, targets, block_size=16384):
+    similarity = np.empty(len(sources))
+    for start in range(0, len(sources), block_size):
+        block = slice(start, start + block_size)
+        similarity[block] = (signatures[sources[block]] == signatures[targets[block]]).mean(axis=1)
+    return similarity
+
+
+def near_duplicate_clusters(texts, threshold=0.7, num_perm=64, bands=16, shingle_size=3):
+    """Cluster near-identical texts; returns, per row, the position of its cluster representative.
+
+    The representative is the first row of each cluster, so ``clusters == arange(n)``
+    marks the rows to keep when collapsing. Candidate pairs found by LSH are only
+    joined when their estimated Jaccard similarity reaches `threshold`.
+    """
+    signatures = MinHasher(num_perm).signatures(texts, shingle_size)
+    n = len(signatures)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+
+    sources, targets = _band_edges(signatures, bands)
+    similarity = _similarity(signatures, sources, targets)
+    keep = similarity >= threshold
+    graph = sparse.coo_matrix(
+        (np.ones(int(keep.sum()), dtype=np.int8), (sources[keep], targets[keep])), shape=(n, n)
+    )
+    _, components = connected_components(graph, directed=False)
+
+    representative = np.full(components.max() + 1, n, dtype=np.int64)
+    np.minimum.at(representative, components, np.arange(n))
+    return representative[components]
+
+
+# Boolean mask keeping one representative row per near-duplicate cluster
+def representatives_mask(clusters):
+    return clusters == np.arange(len(clusters))
@@ -0,0 +1,22 @@
+"""Vectorized review text normalization, computed once per dataset and shared by every stage."""
+import re
+
+# Bumped whenever the normalization changes so outputs keyed by it are recomputed
+NORMALIZE_VERSION = 1
+
+# Punctuation stripped before tokenizing, as the per-row clean_text used to do
+PUNCTUATION = '!.:,?'
+# A character-class replace runs inside Arrow for Arrow-backed strings, where
+# Series.str.translate would fall back to a Python loop per row
+_PUNCTUATION_PATTERN = '[' + re.escape(PUNCTUATION) + ']'
+# Runs of whitespace, or any single whitespace character other than a plain space
+_WHITESPACE_PATTERN = r'\s\s+|[^\S ]'
+
+
+# NFKC, lowercase, punctuation strip and whitespace folding over a whole column
+def normalize_reviews(reviews):
+    text = reviews.fillna('').astype(str)
+    text = text.str.normalize('NFKC').str.lower()
+    text = text.str.replace(_PUNCTUATION_PATTERN, '', regex=True)
+    return text.str.replace(_WHITESPACE_PATTERN, ' ', regex=True).str.strip()
+
@@ -0,0 +1,255 @@
+"""Concurrent-session load test for the Streamlit app, driven headlessly with AppTest.
+
+    python perf/app_load.py --sessions 1,2,4,8 --rows 2000
+
+Each simulated analyst logs in, uploads a synthetic CSV, labels it, opens every
+Text2Insights tab and the Sentiment Tree Map, waiting for background jobs the way a
+browser would (rerunning until they finish). All sessions of a level run at once in
+one process, sharing the app's caches and job runner as they would on one server.
+
+Reported per concurrency level: rerun latency percentiles per page, wall time per
+session, and the process's peak RSS and mean CPU while the level ran.
+
+Needs the packages in perf/requirements.txt. The concurrent sessions rely on patching
+private parts of Streamlit's AppTest harness, so only the Streamlit release pinned
+there is supported; any other one stops with an error before anything is patched.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import traceback
+from collections import defaultdict
+
+import numpy as np
+import psutil
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import streamlit
+
+# Release whose ScriptRunner, app_test.Runtime and ScriptCache the session patches below were written against
+SUPPORTED_STREAMLIT = '1.66'
+if not streamlit.__version__.startswith(SUPPORTED_STREAMLIT + '.'):
+    sys.exit(f"app_load.py supports Streamlit {SUPPORTED_STREAMLIT}.x only (found {streamlit.__version__}); "
+             f"install perf/requirements.txt")
+
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner.script_runner import ScriptRunner
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1 import app_test as app_test_module
+from streamlit.testing.v1 import local_script_runner as local_script_runner_module
+
+APP_PATH = os.path.join(ROOT, 'TextAnalyticsWiz.py')
+INSIGHT_VIEWS = ["Word Cloud", "Text Analytics", "Sentiment Analysis", "N-grams", "Top Words", "Search", "Trends"]
+# Rerun every this many seconds while a background job runs, like the job progress fragment
+POLL_INTERVAL = 0.5
+JOB_TIMEOUT = 600
+
+WORDS = ("app crash login slow refund billing payment support agent rude helpful fast easy great terrible "
+         "update screen battery delivery late order account password error love hate price fee").split()
+FILLER = "the a is was very really my it and but so after since this".split()
+
+
+# AppTest runs every script with one fixed session ID, compiles the script afresh and
+# swaps a mock Runtime in and out around each run. Concurrent sessions need their own
+# IDs and, as on a real server, one runtime and one compiled script
+_session = threading.local()
+_original_init = ScriptRunner.__init__
+
+
+def _init_with_session_id(self, *args, session_id, **kwargs):
+    _original_init(self, *args, session_id=getattr(_session, 'id', session_id), **kwargs)
+
+
+class _SharedRuntime(type):
+    @property
+    def _instance(cls):
+        return Runtime._instance
+
+    @_instance.setter
+    def _instance(cls, runtime):
+        if runtime is not None and Runtime._instance is None:
+            Runtime._instance = runtime
+
+
+# Stands in for Runtime inside app_test; a Runtime subclass so mocks keep its spec
+class _RuntimeHolder(Runtime, metaclass=_SharedRuntime):
+    pass
+
+
+_script_cache = ScriptCache()
+
+
+def install_session_patches():
+    ScriptRunner.__init__ = _init_with_session_id
+    app_test_module.Runtime = _RuntimeHolder
+    app_test_module.ScriptCache = local_script_runner_module.ScriptCache = lambda: _script_cache
+
+
+def synthetic_csv(rows, seed):
+    rng = random.Random(seed)
+    lines = ['review_text,date,score']
+    for i in range(rows):
+        words = rng.choices(WORDS, k=rng.randint(3, 8)) + rng.choices(FILLER, k=rng.randint(2, 6))
+        rng.shuffle(words)
+        day = f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}'
+        lines.append(f'"{" ".join(words)}",{day},{rng.randint(1, 5)}')
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class Session:
+    """One simulated analyst; every rerun's latency is recorded under the page it was on."""
+
+    def __init__(self, name, latencies, timeout=JOB_TIMEOUT):
+        self.name = name
+        self.latencies = latencies
+        self.timeout = timeout
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.errors = []
+
+    def rerun(self, page, action=None):
+        started = time.perf_counter()
+        (action or self.at.run)()
+        self.latencies[page].append(time.perf_counter() - started)
+        self.errors.extend(f'{page}: {e.value}' for e in self.at.exception)
+
+    # Rerun until this session has no running jobs, as the progress fragment would
+    def wait_for_jobs(self, page):
+        deadline = time.monotonic() + self.timeout
+        while self.at.session_state['jobs'] and time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            self.rerun(page)
+
+    def go_to(self, page):
+        self.rerun(page, lambda: self.at.sidebar.radio[0].set_value(page).run())
+
+    def run(self, csv_bytes):
+        _session.id = self.name
+        at = self.at
+        self.rerun('Login')
+        at.text_input[0].set_value('Admin')
+        at.text_input[1].set_value('idontknow')
+        self.rerun('Login', lambda: at.button[0].click().run())
+        self.rerun('Review Scraper')
+
+        self.rerun('Upload', lambda: at.file_uploader[0].upload(f'{self.name}.csv', csv_bytes, 'text/csv').run())
+
+        self.go_to('Review Labeler')
+        self.wait_for_jobs('Review Labeler')
+
+        self.go_to('Text2Insights')
+        for view in INSIGHT_VIEWS:
+            at.session_state['insights_view'] = view
+            self.rerun(f'Text2Insights: {view}')
+            self.wait_for_jobs(f'Text2Insights: {view}')
+
+        self.go_to('Sentiment Tree Map')
+        self.wait_for_jobs('Sentiment Tree Map')
+
+
+class ResourceSampler(threading.Thread):
+    """Samples the process's RSS and CPU use in the background."""
+
+    def __init__(self, interval=0.25):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.process = psutil.Process()
+        self.rss = []
+        self.cpu = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        self.process.cpu_percent(None)
+        while not self._stop_event.wait(self.interval):
+            self.rss.append(self.process.memory_info().rss)
+            self.cpu.append(self.process.cpu_percent(None))
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def percentiles(values):
+    values = np.array(values) * 1000
+    return {'reruns': len(values), 'p50_ms': float(np.percentile(values, 50)),
+            'p95_ms': float(np.percentile(values, 95)), 'p99_ms': float(np.percentile(values, 99))}
+
+
+def run_level(sessions, rows, shared_dataset, level_id):
+    latencies = defaultdict(list)
+    wall_times = []
+    errors = []
+    lock = threading.Lock()
+
+    def analyst(i):
+        session = Session(f'load-{level_id}-{i}', latencies)
+        csv_bytes = synthetic_csv(rows, 0 if shared_dataset else hash((level_id, i)) & 0xFFFF)
+        started = time.perf_counter()
+        try:
+            session.run(csv_bytes)
+        except Exception:
+            session.errors.append(traceback.format_exc(limit=-3))
+        with lock:
+            wall_times.append(time.perf_counter() - started)
+            errors.extend(session.errors)
+
+    sampler = ResourceSampler()
+    sampler.start()
+    threads = [threading.Thread(target=analyst, args=(i,)) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sampler.stop()
+
+    return {
+        'sessions': sessions,
+        'session_seconds': percentiles(wall_times) if wall_times else None,
+        'pages': {page: percentiles(values) for page, values in sorted(latencies.items())},
+        'peak_rss_mb': max(sampler.rss, default=0) / 2**20,
+        'mean_cpu_percent': float(np.mean(sampler.cpu)) if sampler.cpu else 0.0,
+        'errors': errors[:20],
+    }
+
+
+def print_level(report):
+    print(f"\n== {report['sessions']} concurrent sessions: peak RSS {report['peak_rss_mb']:.0f} MB, "
+          f"mean CPU {report['mean_cpu_percent']:.0f}%, errors {len(report['errors'])}")
+    if report['session_seconds']:
+        print(f"Whole session: p50 {report['session_seconds']['p50_ms'] / 1000:.1f} s, "
+              f"p99 {report['session_seconds']['p99_ms'] / 1000:.1f} s")
+    print(f"{'page':<34}{'reruns':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for page, stats in report['pages'].items():
+        print(f"{page:<34}{stats['reruns']:>7}{stats['p50_ms']:>10.0f}{stats['p95_ms']:>10.0f}{stats['p99_ms']:>10.0f}")
+    for error in report['errors']:
+        print(f"  error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the Streamlit app")
+    parser.add_argument('--sessions', default='1,2,4', help="Comma-separated concurrency levels")
+    parser.add_argument('--rows', type=int, default=2000, help="Reviews in each synthetic upload")
+    parser.add_argument('--shared-dataset', action='store_true',
+                        help="Every session uploads the same file (exercises the shared cache)")
+    parser.add_argument('--json', help="Also write the full report to this file")
+    args = parser.parse_args()
+
+    install_session_patches()
+    reports = []
+    for level_id, sessions in enumerate(int(n) for n in args.sessions.split(',')):
+        report = run_level(sessions, args.rows, args.shared_dataset, level_id)
+        print_level(report)
+        reports.append(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
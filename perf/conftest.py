@@ -0,0 +1,13 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+# Print the whole budget table after the run, passing stages included
+def pytest_terminal_summary(terminalreporter):
+    from stage_budgets import report
+    from test_stage_budgets import BUDGETS, MEASUREMENTS
+    if MEASUREMENTS:
+        terminalreporter.write_sep('=', 'stage budgets (per 100k rows)')
+        terminalreporter.write_line(report(MEASUREMENTS, BUDGETS))
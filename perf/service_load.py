@@ -0,0 +1,117 @@
+"""Load test for service.py: concurrent clients against a local service, with latency percentiles.
+
+    python service.py &
+    python perf/service_load.py --clients 32 --duration 20
+
+Without ``--url`` the script starts its own service in-process on a free port, so
+``--max-batch`` and ``--max-wait-ms`` can be compared directly.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLE_REVIEWS = [
+    "The app keeps crashing after the latest update",
+    "Refund took three weeks and support never replied",
+    "Fast, simple and reliable. Love it!",
+    "Login fails with an error every single time",
+    "Customer service agent was rude and unhelpful",
+    "Billing charged me twice this month",
+    "Great features but the interface is confusing",
+    "Delivery was late and the tracking was wrong",
+    "Smooth checkout, very convenient",
+    "Too many ads, uninstalling",
+]
+
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def client(url, endpoint, texts_per_request, deadline, latencies, errors, seed):
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        # A random suffix keeps requests distinct so no layer can answer from a cache
+        texts = [f"{rng.choice(SAMPLE_REVIEWS)} #{rng.randrange(10**6)}" for _ in range(texts_per_request)]
+        payload = {'text': texts[0]} if texts_per_request == 1 else {'texts': texts}
+        started = time.perf_counter()
+        try:
+            post(f'{url}/{endpoint}', payload)
+        except OSError as e:
+            errors.append(repr(e))
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+def run(url, clients, duration, endpoint='label', texts_per_request=1):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=client, args=(url, endpoint, texts_per_request, deadline, latencies, errors, seed))
+        for seed in range(clients)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    values = np.array(latencies) * 1000
+    return {
+        'clients': clients,
+        'requests': len(values),
+        'errors': len(errors),
+        'requests_per_second': len(values) / elapsed,
+        'texts_per_second': len(values) * texts_per_request / elapsed,
+        'p50_ms': float(np.percentile(values, 50)) if len(values) else None,
+        'p99_ms': float(np.percentile(values, 99)) if len(values) else None,
+        'max_ms': float(values.max()) if len(values) else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="Running service, e.g. http://127.0.0.1:8765; default: start one in-process")
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds to run")
+    parser.add_argument('--endpoint', default='label', choices=['classify', 'categorize', 'sentiment', 'label'])
+    parser.add_argument('--texts-per-request', type=int, default=1)
+    parser.add_argument('--max-batch', type=int, default=None, help="In-process service only")
+    parser.add_argument('--max-wait-ms', type=float, default=None, help="In-process service only")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        from service import make_server, MAX_BATCH, MAX_WAIT
+        server = make_server(port=0, max_batch=args.max_batch or MAX_BATCH,
+                             max_wait=(args.max_wait_ms / 1000) if args.max_wait_ms is not None else MAX_WAIT)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_address[1]}'
+
+    # Warm up: the first request loads the taxonomies and TextBlob
+    post(f'{url}/label', {'text': SAMPLE_REVIEWS[0]})
+    report = run(url, args.clients, args.duration, args.endpoint, args.texts_per_request)
+    with urllib.request.urlopen(f'{url}/metrics') as response:
+        report['server'] = json.loads(response.read())
+    print(json.dumps(report, indent=2))
+
+    if server is not None:
+        server.shutdown()
+        server.batcher.stop()
+
+
+if __name__ == '__main__':
+    main()
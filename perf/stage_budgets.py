@@ -0,0 +1,239 @@
+"""Peak-memory and runtime budgets per pipeline stage, measured on fixed synthetic corpora.
+
+Each stage runs once under tracemalloc for its peak Python/numpy allocation, then a
+few times without it for its best wall time. Both are scaled to 100k rows and
+compared with the checked-in budgets in budgets.json:
+
+    python perf/stage_budgets.py             # report every stage against its budget
+    python perf/stage_budgets.py --update    # re-measure (worst of several runs) and rewrite budgets.json
+    python -m pytest perf                    # fail on any stage over budget
+
+Allocations made by Arrow's own memory pool (Arrow-backed pandas strings, Polars)
+are invisible to tracemalloc, so their peaks cover only the Python-side work. Time
+budgets depend on the machine; rerun --update on the reference machine after a
+deliberate change in cost and commit budgets.json with it.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dedup import DedupPlan
+from features import build_feature_store, FeatureStore
+from keyness import build_keyness
+from labeling import label_hits, label_reviews
+from near_duplicates import near_duplicate_clusters
+from normalize import normalize_reviews
+import polars_backend
+from rollups import TrendRollups
+from stages import polarity
+import text_stats
+from topics import discover_topics
+
+BUDGETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'budgets.json')
+# Budgets are measured values times this headroom, so ordinary noise does not fail the check
+MEMORY_HEADROOM = 1.3
+TIME_HEADROOM = 2.0
+# Floors for stages whose work happens mostly outside tracemalloc's view, or that finish so fast
+# (0.1 s at 20k rows) that scheduler noise alone can double their time
+MIN_PEAK_MB = 1.0
+MIN_SECONDS = 0.5
+TIMING_RUNS = 3
+# Independent measurements per stage behind each budget written by --update
+UPDATE_RUNS = 5
+PER_ROWS = 100_000
+
+WORDS = ("app crash login slow refund billing payment support agent rude helpful fast easy great terrible update "
+         "screen battery delivery late order account password error love hate price fee charge smooth reliable "
+         "staff service team friendly").split()
+FILLER = "the a is was very really my it and but so after since this not".split()
+STOP_WORDS = frozenset(FILLER)
+
+
+def synthetic_reviews(rows, seed=0, duplicate_share=0.2):
+    """Review texts with taxonomy keywords, punctuation, mixed case and some exact repeats."""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(rows):
+        if texts and rng.random() < duplicate_share:
+            texts.append(rng.choice(texts))
+            continue
+        words = rng.choices(WORDS, k=rng.randint(3, 10)) + rng.choices(FILLER, k=rng.randint(2, 8))
+        rng.shuffle(words)
+        text = ' '.join(words)
+        texts.append(text.capitalize() + rng.choice(['.', '!', '', '?']))
+    return pd.Series(texts)
+
+
+class Corpus:
+    """Inputs shared by the stages, built once per size."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.reviews = synthetic_reviews(rows)
+        self.normalized = normalize_reviews(self.reviews)
+        self.scored = label_reviews(self.normalized, normalized=True)
+        self.scored['Date'] = pd.Timestamp('2024-01-01') + pd.to_timedelta(self.reviews.index % 365, unit='D')
+        self.scored['sentiment'] = (self.reviews.index % 7 - 3) / 3
+        self.scored['sentiment_type'] = pd.cut(self.scored['sentiment'], [-1, -1e-9, 1e-9, 1],
+                                               labels=['Negative', 'Neutral', 'Positive'], include_lowest=True).astype(str)
+
+
+def _feature_store(corpus, directory):
+    build_feature_store(directory, corpus.normalized, n_jobs=1)
+    return FeatureStore(directory).load()
+
+
+def _topics(corpus):
+    with tempfile.TemporaryDirectory() as tmp:
+        features = _feature_store(corpus, os.path.join(tmp, 'features'))
+        return discover_topics(features, corpus.normalized, num_topics=8)
+
+
+def _build_features(corpus):
+    with tempfile.TemporaryDirectory() as tmp:
+        return _feature_store(corpus, os.path.join(tmp, 'features'))
+
+
+# name -> (rows of its corpus, function of the corpus)
+STAGES = {
+    'normalize': (20_000, lambda c: normalize_reviews(c.reviews)),
+    'normalize_polars': (20_000, lambda c: polars_backend.normalize_reviews(c.reviews)),
+    'dedup_plan': (20_000, lambda c: DedupPlan(c.normalized)),
+    'label_reviews': (20_000, lambda c: label_reviews(c.normalized, normalized=True)),
+    'label_reviews_polars': (20_000, lambda c: polars_backend.label_reviews(c.normalized, normalized=True)),
+    'label_hits': (20_000, lambda c: label_hits(c.normalized, normalized=True)),
+    'analyze_text': (20_000, lambda c: text_stats.analyze_text(c.normalized, STOP_WORDS)),
+    'word_frequencies': (20_000, lambda c: text_stats.word_frequencies(c.normalized, STOP_WORDS)),
+    'ngram_frequencies': (20_000, lambda c: text_stats.ngram_frequencies(c.normalized, STOP_WORDS, '', 3)),
+    'word_frequencies_polars': (20_000, lambda c: text_stats.word_frequencies(c.normalized, STOP_WORDS, engine='polars')),
+    'keyness': (20_000, lambda c: build_keyness(c.normalized, c.scored[['sentiment_type', 'Category']], STOP_WORDS)),
+    'near_duplicates': (20_000, lambda c: near_duplicate_clusters(c.normalized)),
+    'sentiment': (5_000, lambda c: c.normalized.map(polarity)),
+    'trend_rollups': (20_000, lambda c: TrendRollups().add(c.scored)),
+    'feature_store': (20_000, _build_features),
+    'topics': (20_000, _topics),
+}
+
+_corpora = {}
+
+
+def corpus(rows):
+    if rows not in _corpora:
+        _corpora[rows] = Corpus(rows)
+    return _corpora[rows]
+
+
+def measure(name):
+    """Peak traced allocation (MB) and best wall time (s) of one stage, both per 100k rows."""
+    rows, func = STAGES[name]
+    data = corpus(rows)
+    func(data)  # Warm up imports, compiled patterns and caches outside the measurement
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func(data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    best = float('inf')
+    for _ in range(TIMING_RUNS):
+        gc.collect()
+        started = time.perf_counter()
+        func(data)
+        best = min(best, time.perf_counter() - started)
+
+    scale = PER_ROWS / rows
+    return {'stage': name, 'rows': rows, 'peak_mb_per_100k': peak / 2**20 * scale, 'seconds_per_100k': best * scale}
+
+
+# The largest peak and slowest time of several measurements, so a budget covers the run-to-run spread
+def measure_worst(name, runs=UPDATE_RUNS):
+    measurements = [measure(name) for _ in range(runs)]
+    return dict(measurements[0], **{metric: max(m[metric] for m in measurements)
+                                    for metric in ('peak_mb_per_100k', 'seconds_per_100k')})
+
+
+def load_budgets(path=BUDGETS_PATH):
+    with open(path) as f:
+        return json.load(f)['stages']
+
+
+# Each metric's overshoot as a fraction of its budget (0.25 = 25% over); empty when within budget
+def overshoot(measurement, budget):
+    over = {}
+    for metric in ('peak_mb_per_100k', 'seconds_per_100k'):
+        if measurement[metric] > budget[metric]:
+            over[metric] = measurement[metric] / budget[metric] - 1
+    return over
+
+
+def format_row(measurement, budget):
+    over = overshoot(measurement, budget) if budget else {}
+
+    def cell(metric, unit):
+        value = f"{measurement[metric]:.2f}{unit}"
+        limit = f"{budget[metric]:.2f}{unit}" if budget else 'none'
+        flag = f"  +{over[metric]:.0%} OVER" if metric in over else ''
+        return f"{value:>10} / {limit:<10}{flag:<12}"
+
+    return f"{measurement['stage']:<26}{cell('peak_mb_per_100k', ' MB')}{cell('seconds_per_100k', ' s')}"
+
+
+def report(measurements, budgets):
+    lines = [f"{'stage':<26}{'peak per 100k rows / budget':<35}{'time per 100k rows / budget':<35}"]
+    lines += [format_row(m, budgets.get(m['stage'])) for m in measurements]
+    failed = [m['stage'] for m in measurements if m['stage'] in budgets and overshoot(m, budgets[m['stage']])]
+    lines.append(f"{len(failed)} of {len(measurements)} stages over budget" + (f": {', '.join(failed)}" if failed else ''))
+    return '\n'.join(lines)
+
+
+# Budgets of the measured stages replace theirs; other stages keep their budgets
+def write_budgets(measurements, path=BUDGETS_PATH):
+    stages = load_budgets(path) if os.path.exists(path) else {}
+    stages.update({
+        m['stage']: {
+            'peak_mb_per_100k': round(max(m['peak_mb_per_100k'] * MEMORY_HEADROOM, MIN_PEAK_MB), 2),
+            'seconds_per_100k': round(max(m['seconds_per_100k'] * TIME_HEADROOM, MIN_SECONDS), 3),
+        }
+        for m in measurements
+    })
+    stages = {name: stages[name] for name in STAGES if name in stages}
+    with open(path, 'w') as f:
+        json.dump({'headroom': {'memory': MEMORY_HEADROOM, 'time': TIME_HEADROOM}, 'stages': stages}, f, indent=2)
+        f.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check pipeline stages against their memory and runtime budgets")
+    parser.add_argument('stages', nargs='*', help="Stages to measure (default: all)")
+    parser.add_argument('--update', action='store_true', help="Rewrite budgets.json from this machine's measurements")
+    parser.add_argument('--runs', type=int, default=UPDATE_RUNS, help="Measurements per stage with --update")
+    args = parser.parse_args()
+
+    names = args.stages or list(STAGES)
+    if args.update:
+        measurements = [measure_worst(name, args.runs) for name in names]
+        write_budgets(measurements)
+        print(f"Wrote budgets for {len(measurements)} stages to {BUDGETS_PATH}")
+        return
+    measurements = [measure(name) for name in names]
+    text = report(measurements, load_budgets())
+    print(text)
+    sys.exit(1 if 'OVER' in text else 0)
+
+
+if __name__ == '__main__':
+    main()
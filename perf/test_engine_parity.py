@@ -0,0 +1,63 @@
+"""The Polars engine must return exactly what the pandas path returns: both engines share cached stage results."""
+import pandas as pd
+import pytest
+
+import polars_backend
+import text_stats
+from labeling import label_reviews
+from normalize import normalize_reviews
+from stage_budgets import STOP_WORDS, synthetic_reviews
+
+# Texts where NFKC, lowercasing, punctuation and whitespace handling could tell the engines apart
+EDGE_CASES = [
+    '', None, '   ', '!!!', float('nan'),
+    'ＦＵＬＬＷＩＤＴＨ Refund ＡＰＰ', 'ﬁne ligature ﬂow', 'İstanbul ΣΟΦΟΣ login', 'café cafe\u0301 CAFÉ',
+    'nbsp\u00a0space\u2003em\u2009thin', 'tabs\tand\nnew\r\nlines  double  spaces', '\u3000ideographic\u3000space',
+    'emoji 😀 great app', 'Ⅻ roman ⅻ', 'ǅungla ß STRASSE', '①②③ circled', 'x²+y³ ½ ¼',
+    'Zero\u200bwidth join\u200dhere', 'Ｒｅｆｕｎｄ, please!!', '¿Qué? ¡Sí! — “quoted” ‘text’',
+    'trailing space ', ' leading space', '\u0085next line\u2028line sep\u2029para sep',
+]
+
+
+@pytest.fixture(scope='module')
+def reviews():
+    texts = pd.concat([synthetic_reviews(3000, seed=1), pd.Series(EDGE_CASES * 5, dtype=object)], ignore_index=True)
+    return texts.sample(frac=1, random_state=0).reset_index(drop=True)
+
+
+@pytest.fixture(scope='module')
+def normalized(reviews):
+    return normalize_reviews(reviews)
+
+
+def test_normalize_reviews(reviews, normalized):
+    pd.testing.assert_series_equal(polars_backend.normalize_reviews(reviews), normalized)
+
+
+@pytest.mark.parametrize('is_normalized', [True, False])
+def test_first_match_labels(reviews, normalized, is_normalized):
+    texts = normalized if is_normalized else reviews.fillna('')
+    pd.testing.assert_frame_equal(polars_backend.label_reviews(texts, normalized=is_normalized),
+                                  label_reviews(texts, normalized=is_normalized))
+
+
+@pytest.mark.parametrize('exclude_words', ['', 'app,refund'])
+def test_word_counts(normalized, exclude_words):
+    assert (text_stats.analyze_text(normalized, STOP_WORDS, exclude_words, engine='polars')
+            == text_stats.analyze_text(normalized, STOP_WORDS, exclude_words))
+    pd.testing.assert_frame_equal(text_stats.word_frequencies(normalized, STOP_WORDS, exclude_words, engine='polars'),
+                                  text_stats.word_frequencies(normalized, STOP_WORDS, exclude_words))
+
+
+@pytest.mark.parametrize('n', [2, 3])
+def test_ngram_counts(normalized, n):
+    pd.testing.assert_frame_equal(text_stats.ngram_frequencies(normalized, STOP_WORDS, 'app', n, engine='polars'),
+                                  text_stats.ngram_frequencies(normalized, STOP_WORDS, 'app', n))
+
+
+def test_treemap_counts(normalized):
+    scored = label_reviews(normalized, normalized=True)
+    scored['sentiment_type'] = pd.Series(['Positive', 'Negative', 'Neutral'] * len(scored))[:len(scored)].to_numpy()
+    path = ['Label', 'Category', 'sentiment_type']
+    pd.testing.assert_frame_equal(polars_backend.treemap_counts(scored, path),
+                                  scored.groupby(path).size().reset_index(name='counts'))
@@ -0,0 +1,17 @@
+"""Fails when a pipeline stage's peak allocation or runtime per 100k rows exceeds budgets.json."""
+import pytest
+
+from stage_budgets import STAGES, format_row, load_budgets, measure, overshoot
+
+BUDGETS = load_budgets()
+MEASUREMENTS = []
+
+
+@pytest.mark.parametrize('stage', list(STAGES))
+def test_stage_within_budget(stage):
+    assert stage in BUDGETS, f"{stage} has no budget; run `python perf/stage_budgets.py --update {stage}`"
+    measurement = measure(stage)
+    MEASUREMENTS.append(measurement)
+    over = overshoot(measurement, BUDGETS[stage])
+    assert not over, "over budget: " + ', '.join(f"{metric} +{share:.0%}" for metric, share in over.items()) \
+        + "\n" + format_row(measurement, BUDGETS[stage])
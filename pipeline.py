@@ -0,0 +1,84 @@
+"""Immutable stage artifacts: every stage adds columns over its input's shared buffers."""
+import hashlib
+
+import pandas as pd
+
+from datasets import dataset_fingerprint
+
+# Copy-on-Write is always on from pandas 3; older versions need it enabled so that
+# derived frames share column buffers with their parents instead of copying them
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+
+def stage_key(stage, *parts):
+    return hashlib.sha256(repr((stage,) + parts).encode('utf-8')).hexdigest()[:16]
+
+
+class Artifact:
+    """Output of one pipeline stage.
+
+    The frame is never modified after construction: `frame` hands out a shallow
+    Copy-on-Write view, so a consumer that adds or overwrites columns only changes
+    its own view. `key` identifies the stage, its parameters and its inputs, so a
+    rerun can skip a stage whose key is unchanged; `source_key` is the key of the
+    dataset the artifact was derived from and `parent_key` that of the artifact it
+    was derived from directly, whose columns it shares.
+    """
+
+    def __init__(self, stage, frame, key, new_columns=None, meta=None, source_key=None, parent_key=None):
+        self.stage = stage
+        self.key = key
+        self.source_key = source_key or key
+        self.parent_key = parent_key
+        self._frame = frame
+        self.new_columns = list(frame.columns if new_columns is None else new_columns)
+        self.meta = meta or {}
+
+    @property
+    def frame(self):
+        return self._frame.copy(deep=False)
+
+    @property
+    def index(self):
+        return self._frame.index
+
+    def __len__(self):
+        return len(self._frame)
+
+    def __contains__(self, column):
+        return column in self._frame.columns
+
+    def column(self, name):
+        return self._frame[name]
+
+    # New artifact with extra columns; existing columns are shared, not copied, and the
+    # parent's meta is inherited unless overridden
+    def derive(self, stage, key, meta=None, **columns):
+        meta = dict(self.meta, **(meta or {}))
+        return Artifact(stage, self._frame.assign(**columns), key, list(columns), meta, self.source_key, self.key)
+
+    # Only the columns this stage added count towards memory while the parent holds the rest;
+    # `full_size` counts every column, for an artifact whose parent is gone
+    def estimated_size(self):
+        return int(self._frame[self.new_columns].memory_usage(deep=True, index=False).sum())
+
+    def full_size(self):
+        return int(self._frame.memory_usage(deep=True, index=False).sum())
+
+    # Just the columns this stage added, to be stored apart from the parent and re-attached to it
+    def detached(self):
+        return Artifact(self.stage, self._frame[self.new_columns], self.key, self.new_columns, self.meta,
+                        self.source_key, self.parent_key)
+
+    def attach(self, parent):
+        frame = parent._frame.assign(**{name: self._frame[name] for name in self.new_columns})
+        return Artifact(self.stage, frame, self.key, self.new_columns, self.meta, self.source_key, self.parent_key)
+
+
+# Root artifact for a freshly scraped or uploaded dataset, keyed by its content; `location` is
+# the directory the dataset lives in on disk, if any, where derived files are kept next to it
+def source_artifact(reviews_df, origin, location=None):
+    frame = reviews_df.assign(Review=reviews_df['Review'].astype(str))
+    key = stage_key('source', dataset_fingerprint(frame['Review']))
+    return Artifact('source', frame, key, meta={'origin': origin, 'location': location})
@@ -0,0 +1,52 @@
+"""Google Play Store scraping helpers."""
+import time
+
+import pandas as pd
+from google_play_scraper import Sort
+
+from play_transport import get_transport
+
+
+# Scraped reviews with their timestamp ('Date') and star rating ('Rating')
+def scrape_google_play_reviews(app_id, num_reviews=100, sort_order=Sort.NEWEST, min_rating=None, max_rating=None, progress=None):
+    transport = get_transport()
+    all_reviews = []
+    next_token = None
+    while len(all_reviews) < num_reviews:
+        current_reviews, token = transport.reviews(
+            app_id,
+            lang='en',
+            country='us',
+            sort=sort_order,
+            count=min(num_reviews - len(all_reviews), 100),
+            filter_score_with=None if min_rating is None and max_rating is None else list(range(min_rating, max_rating + 1)),
+            token=next_token
+        )
+        all_reviews.extend(current_reviews)
+        next_token = token
+        if progress is not None:
+            progress(len(all_reviews) / num_reviews, f"Scraped {len(all_reviews)} of {num_reviews} reviews")
+        if not next_token:
+            break
+        time.sleep(transport.page_delay)  # Add delay to avoid rate limiting
+    return pd.DataFrame({
+        'Review': [review['content'] for review in all_reviews],
+        'Date': pd.to_datetime([review['at'] for review in all_reviews]),
+        'Rating': [review['score'] for review in all_reviews],
+    }, columns=['Review', 'Date', 'Rating'])
+
+
+def scrape_google_play(app_id, num_reviews=100, sort_order=Sort.NEWEST, min_rating=None, max_rating=None, progress=None):
+    reviews = scrape_google_play_reviews(app_id, num_reviews, sort_order, min_rating, max_rating, progress)
+    return reviews['Review'].tolist()
+
+def fetch_google_play_app_details(app_id):
+    app_details = get_transport().app(app_id)
+    return {
+        'title': app_details['title'],
+        'installs': app_details['installs'],
+        'score': app_details['score'],
+        'ratings': app_details['ratings'],
+        'reviews': app_details['reviews'],
+        'description': app_details['description']
+    }
@@ -0,0 +1,195 @@
+"""Pluggable transports for the Google Play client: cached live calls, recording and offline replay.
+
+The mode is picked with REVAI_PLAY_TRANSPORT:
+
+- ``live`` (default): calls Google Play, reusing identical responses for REVAI_PLAY_CACHE_TTL seconds
+- ``record``: calls Google Play and saves every response to the cassette directory
+- ``replay``: serves responses from the cassette directory only and never touches the network
+"""
+import datetime
+import hashlib
+import json
+import os
+import threading
+
+from google_play_scraper import reviews as gp_reviews, app as gp_app
+# The library's token type; rebuilt from a plain string so tokens can be recorded and replayed
+from google_play_scraper.features.reviews import _ContinuationToken
+
+from shared_cache import get_shared_cache
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CASSETTE_DIR = os.environ.get('REVAI_CASSETTE_DIR', os.path.join(BASE_DIR, 'cassettes'))
+LIVE_TTL = float(os.environ.get('REVAI_PLAY_CACHE_TTL', 300))
+# Pause between live review pages to avoid rate limiting
+PAGE_DELAY = 2.0
+
+MODES = ('live', 'record', 'replay')
+
+
+class TransportError(RuntimeError):
+    pass
+
+
+class PageToken:
+    """Continuation token returned by every transport; falsy once there are no more pages."""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __bool__(self):
+        return self.value is not None
+
+    def __repr__(self):
+        return f'PageToken({self.value!r})'
+
+
+# Identity of one request, shared by the live cache and the cassette store
+def request_key(kind, **params):
+    return kind, tuple(sorted(params.items()))
+
+
+def _review_key(app_id, lang, country, sort, count, filter_score_with, token):
+    if isinstance(filter_score_with, list):
+        filter_score_with = tuple(filter_score_with)
+    return request_key('reviews', app_id=app_id, lang=lang, country=country, sort=sort.value, count=count,
+                       filter_score_with=filter_score_with, token=token.value if token else None)
+
+
+def _encode(value):
+    if isinstance(value, datetime.datetime):
+        return {'$datetime': value.isoformat()}
+    raise TypeError(f'Cannot record {type(value).__name__}')
+
+
+def _decode(obj):
+    if set(obj) == {'$datetime'}:
+        return datetime.datetime.fromisoformat(obj['$datetime'])
+    return obj
+
+
+class LiveTransport:
+    page_delay = PAGE_DELAY
+
+    def reviews(self, app_id, lang='en', country='us', sort=None, count=100, filter_score_with=None, token=None):
+        continuation = None
+        if token is not None:
+            # The library ignores `count` once given a token, so the requested page size is carried in it
+            continuation = _ContinuationToken(token.value, lang, country, sort.value, count, filter_score_with, None)
+        page, next_token = gp_reviews(
+            app_id, lang=lang, country=country, sort=sort, count=count,
+            filter_score_with=filter_score_with, continuation_token=continuation
+        )
+        return page, PageToken(next_token.token if page else None)
+
+    def app(self, app_id, lang='en', country='us'):
+        return gp_app(app_id, lang=lang, country=country)
+
+
+class CachedTransport:
+    """Live transport whose responses are reused for `ttl` seconds by every session."""
+
+    def __init__(self, inner, ttl=LIVE_TTL):
+        self.inner = inner
+        self.ttl = ttl
+        self.page_delay = inner.page_delay
+
+    def reviews(self, app_id, lang='en', country='us', sort=None, count=100, filter_score_with=None, token=None):
+        key = ('play',) + _review_key(app_id, lang, country, sort, count, filter_score_with, token)
+        return get_shared_cache().get_or_compute(
+            key, lambda: self.inner.reviews(app_id, lang, country, sort, count, filter_score_with, token), self.ttl
+        )
+
+    def app(self, app_id, lang='en', country='us'):
+        key = ('play',) + request_key('app', app_id=app_id, lang=lang, country=country)
+        return get_shared_cache().get_or_compute(key, lambda: self.inner.app(app_id, lang, country), self.ttl)
+
+
+class CassetteStore:
+    """One JSON file per recorded request, named by a hash of the request."""
+
+    def __init__(self, directory=CASSETTE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(repr(key).encode('utf-8')).hexdigest()[:24] + '.json')
+
+    def save(self, key, response):
+        path = self._path(key)
+        kind, params = key
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'request': {'kind': kind, **dict(params)}, 'response': response}, f, default=_encode)
+            os.replace(tmp_path, path)
+
+    def load(self, key):
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                return json.load(f, object_hook=_decode)['response']
+        except FileNotFoundError:
+            raise TransportError(
+                f"No recorded response for {key[0]} {dict(key[1])}; record it with REVAI_PLAY_TRANSPORT=record"
+            ) from None
+
+
+class RecordingTransport:
+    """Live transport that saves every response to a cassette store."""
+
+    def __init__(self, inner, cassettes):
+        self.inner = inner
+        self.cassettes = cassettes
+        self.page_delay = inner.page_delay
+
+    def reviews(self, app_id, lang='en', country='us', sort=None, count=100, filter_score_with=None, token=None):
+        page, next_token = self.inner.reviews(app_id, lang, country, sort, count, filter_score_with, token)
+        self.cassettes.save(_review_key(app_id, lang, country, sort, count, filter_score_with, token),
+                            {'page': page, 'token': next_token.value})
+        return page, next_token
+
+    def app(self, app_id, lang='en', country='us'):
+        details = self.inner.app(app_id, lang, country)
+        self.cassettes.save(request_key('app', app_id=app_id, lang=lang, country=country), details)
+        return details
+
+
+class ReplayTransport:
+    """Serves recorded responses only; an unrecorded request raises TransportError."""
+
+    page_delay = 0.0
+
+    def __init__(self, cassettes):
+        self.cassettes = cassettes
+
+    def reviews(self, app_id, lang='en', country='us', sort=None, count=100, filter_score_with=None, token=None):
+        recorded = self.cassettes.load(_review_key(app_id, lang, country, sort, count, filter_score_with, token))
+        return recorded['page'], PageToken(recorded['token'])
+
+    def app(self, app_id, lang='en', country='us'):
+        return self.cassettes.load(request_key('app', app_id=app_id, lang=lang, country=country))
+
+
+def make_transport(mode='live', cassette_dir=CASSETTE_DIR, ttl=LIVE_TTL):
+    if mode == 'live':
+        return CachedTransport(LiveTransport(), ttl)
+    if mode == 'record':
+        return RecordingTransport(LiveTransport(), CassetteStore(cassette_dir))
+    if mode == 'replay':
+        return ReplayTransport(CassetteStore(cassette_dir))
+    raise ValueError(f"Unknown transport mode {mode!r}; expected one of {', '.join(MODES)}")
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = make_transport(os.environ.get('REVAI_PLAY_TRANSPORT', 'live'))
+        return _transport
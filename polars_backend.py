@@ -0,0 +1,136 @@
+"""Polars lazy-query versions of the pandas column work, selected with the engine setting.
+
+Every function here returns exactly what its pandas counterpart returns (same values,
+order and dtypes), so the engine only changes how fast results arrive. Queries are
+built lazily and collected once, letting Polars optimize them and use every core.
+(Characters newer than Arrow's Unicode tables may normalize differently.)
+
+The default engine comes from REVAI_ENGINE (``pandas`` or ``polars``).
+"""
+import io
+import os
+
+import pandas as pd
+import polars as pl
+import pyarrow as pa
+
+from normalize import _PUNCTUATION_PATTERN
+from taxonomy import get_taxonomy
+
+ENGINES = ('pandas', 'polars')
+DEFAULT_ENGINE = os.environ.get('REVAI_ENGINE', 'pandas')
+
+# Whitespace as Arrow's regex engine (used by the pandas path) sees it: ASCII only
+_WHITESPACE_PATTERN = r'[\t\n\f\r ]{2,}|[\t\n\f\r]'
+# Characters whose full lowercase mapping differs from Arrow's simple one
+_SIMPLE_LOWER = {'İ': 'i', 'Σ': 'σ'}
+# Characters str.split() and str.strip() treat as whitespace, and the words between them
+_PY_WHITESPACE = ''.join(chr(c) for c in range(0x110000) if chr(c).isspace())
+_WORD_PATTERN = '[^' + ''.join(f'\\x{{{ord(c):x}}}' for c in _PY_WHITESPACE) + ']+'
+
+
+def check_engine(engine):
+    engine = engine or DEFAULT_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; expected one of {', '.join(ENGINES)}")
+    return engine
+
+
+# Columns cross between pandas and Polars as Arrow arrays, without copying the strings
+def _text(reviews):
+    return pl.LazyFrame({'text': pl.from_arrow(pa.array(reviews.astype('str').array))})
+
+
+def _to_series(frame, name, index):
+    return pd.Series(pd.array(frame.get_column(name).to_arrow(), dtype='str'), index=index)
+
+
+# Ingestion: a CSV read with every column as text and the given missing-value markers (see
+# ingest.NA_VALUES). With the header's names given (see ingest.sniff_csv), only the selected
+# columns are materialized
+def read_csv(data, encoding='utf-8', separator=',', names=None, columns=None, null_values=None):
+    if encoding.replace('-', '').lower() != 'utf8':
+        data = data.decode(encoding).encode('utf-8')
+    if names is None:
+        query = pl.scan_csv(io.BytesIO(data), separator=separator, infer_schema=False, null_values=null_values)
+    else:
+        query = pl.scan_csv(io.BytesIO(data), separator=separator, has_header=False, skip_rows=1, new_columns=names,
+                            infer_schema=False, null_values=null_values)
+    if columns is not None:
+        query = query.select(columns)
+    return query.collect().to_pandas()
+
+
+# Normalization: the same steps as normalize.normalize_reviews as one string expression
+def normalize_expr(column):
+    text = column.fill_null('').str.normalize('NFKC')
+    # Rust's full mapping would turn 'İ' into two characters and a word-final 'Σ' into 'ς'
+    text = text.str.replace_many(_SIMPLE_LOWER).str.to_lowercase()
+    text = text.str.replace_all(_PUNCTUATION_PATTERN, '')
+    return text.str.replace_all(_WHITESPACE_PATTERN, ' ').str.strip_chars(_PY_WHITESPACE)
+
+
+def normalize_reviews(reviews):
+    frame = _text(reviews).select(normalize_expr(pl.col('text'))).collect()
+    return _to_series(frame, 'text', reviews.index)
+
+
+# Keyword labeling: the first label whose keywords occur anywhere in the text, as in
+# CompiledTaxonomy.match, with each label's keywords scanned by one Aho-Corasick automaton
+def label_expr(column, taxonomy):
+    label = pl.lit(taxonomy.fallback)
+    for name, keywords in reversed(list(zip(taxonomy.labels, taxonomy.keywords))):
+        if keywords:
+            label = pl.when(column.str.contains_any(keywords)).then(pl.lit(name)).otherwise(label)
+    return label
+
+
+def label_reviews(reviews, normalized=False):
+    text = pl.col('text') if normalized else pl.col('text').str.to_lowercase()
+    frame = _text(reviews).select(
+        label_expr(text, get_taxonomy('areas')).alias('Label'),
+        label_expr(text, get_taxonomy('categories')).alias('Category'),
+    ).collect()
+    return pd.DataFrame({
+        'Label': _to_series(frame, 'Label', reviews.index),
+        'Category': _to_series(frame, 'Category', reviews.index),
+    }, index=reviews.index)
+
+
+# Tokenization: words of every text in order, without stop words and excluded words
+def _words(texts, stop_words, exclude_words=''):
+    excluded = set(stop_words) | (set(exclude_words.split(',')) if exclude_words else set())
+    words = _text(texts).select(pl.col('text').str.extract_all(_WORD_PATTERN).alias('word')).explode('word')
+    return words.filter(pl.col('word').is_not_null() & ~pl.col('word').is_in(list(excluded)))
+
+
+# Counts in descending order, ties in order of first occurrence, like Counter.most_common
+def _most_common(frame, column, limit=None):
+    counts = frame.group_by(column, maintain_order=True).agg(pl.len().alias('count'))
+    counts = counts.sort('count', descending=True, maintain_order=True)
+    if limit is not None:
+        counts = counts.head(limit)
+    counts = counts.collect()
+    return pd.DataFrame({column: counts.get_column(column).to_list(), 'count': counts.get_column('count').cast(pl.Int64).to_numpy()})
+
+
+def words(texts, stop_words, exclude_words=''):
+    return _words(texts, stop_words, exclude_words).collect().get_column('word').to_list()
+
+
+def word_frequencies(texts, stop_words, exclude_words='', limit=None):
+    return _most_common(_words(texts, stop_words, exclude_words), 'word', limit)
+
+
+# N-grams run across review boundaries, as the pandas path does over one joined word list
+def ngram_frequencies(texts, stop_words, exclude_words, n, limit=50):
+    words = _words(texts, stop_words, exclude_words)
+    grams = words.select(pl.concat_str([pl.col('word').shift(-i) for i in range(n)], separator=' ').alias('ngram'))
+    return _most_common(grams.drop_nulls(), 'ngram', limit)
+
+
+# Treemap aggregation: reviews per path, sorted by the path like groupby().size()
+def treemap_counts(df, path):
+    frame = pl.from_pandas(df[path]).lazy()
+    counts = frame.group_by(path).agg(pl.len().cast(pl.Int64).alias('counts')).sort(path).collect()
+    return counts.to_pandas()
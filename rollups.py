@@ -0,0 +1,94 @@
+"""Pre-aggregated daily and weekly review counts and mean polarity per Label and Category."""
+import numpy as np
+import pandas as pd
+
+FREQUENCIES = {'Daily': 'D', 'Weekly': 'W'}
+DIMENSIONS = ('Label', 'Category')
+
+
+# Start of the day or (Monday-based) week each timestamp falls in
+def period_start(dates, freq):
+    if getattr(dates.dt, 'tz', None) is not None:
+        dates = dates.dt.tz_convert(None)
+    if freq == 'D':
+        return dates.dt.floor('D')
+    return dates.dt.to_period(freq).dt.start_time
+
+
+class TrendRollups:
+    """Running sums per (period, label) for every frequency and dimension.
+
+    `add` folds a new batch of scored reviews into the sums, so appending data never
+    rescans what was already added; `query` turns the sums into counts and means.
+    `new_rows` finds the part of a grown dataset (a resumed backfill) not yet added.
+    """
+
+    def __init__(self, frequencies=FREQUENCIES, dimensions=DIMENSIONS, key=None):
+        self.key = key
+        self.frequencies = dict(frequencies)
+        self.dimensions = tuple(dimensions)
+        self._tables = {}
+        self.rows = 0
+        self.undated = 0
+        # Rows passed to `add` (dated or not) and the sum of their hashes, which does not depend on batching
+        self.rows_added = 0
+        self.checksum = 0
+
+    # Fold a batch with Date, sentiment and the dimension columns (and optionally Rating) into the sums
+    def add(self, batch):
+        self.rows_added += len(batch)
+        self.checksum = (self.checksum + self._checksum(batch)) % 2**64
+        dates = pd.to_datetime(batch['Date'], errors='coerce')
+        dated = dates.notna()
+        self.undated += int((~dated).sum())
+        if not dated.any():
+            return self
+        batch = batch[dated]
+        rating = batch['Rating'] if 'Rating' in batch.columns else pd.Series(float('nan'), index=batch.index)
+        rating = pd.to_numeric(rating, errors='coerce')
+        values = pd.DataFrame({
+            'reviews': 1,
+            'polarity_sum': batch['sentiment'].astype(float),
+            'rating_sum': rating.fillna(0.0),
+            'rated': rating.notna().astype(int),
+        }, index=batch.index)
+        for freq in self.frequencies.values():
+            period = period_start(dates[dated], freq).rename('period')
+            for dimension in self.dimensions:
+                sums = values.groupby([period, batch[dimension].rename('value')]).sum()
+                table = self._tables.get((freq, dimension))
+                self._tables[(freq, dimension)] = sums if table is None else table.add(sums, fill_value=0)
+        self.rows += len(batch)
+        return self
+
+    # The rows of `frame` after those already added, if `frame` starts with exactly those rows; else None
+    def new_rows(self, frame):
+        if len(frame) < self.rows_added or self._checksum(frame.iloc[:self.rows_added]) != self.checksum:
+            return None
+        return frame.iloc[self.rows_added:]
+
+    def _checksum(self, batch):
+        columns = [col for col in ('Date', 'sentiment', 'Rating') + self.dimensions if col in batch.columns]
+        hashes = pd.util.hash_pandas_object(batch[columns], index=False).to_numpy()
+        return int(hashes.sum(dtype=np.uint64))
+
+    # Tidy frame of period, value, reviews, mean polarity and mean rating
+    def query(self, frequency='Daily', dimension='Category', values=None):
+        freq = self.frequencies.get(frequency, frequency)
+        table = self._tables.get((freq, dimension))
+        if table is None:
+            return pd.DataFrame(columns=['period', dimension, 'reviews', 'mean_polarity', 'mean_rating'])
+        table = table.reset_index()
+        if values:
+            table = table[table['value'].isin(values)]
+        rated = table['rated'].where(table['rated'] > 0)
+        return pd.DataFrame({
+            'period': table['period'],
+            dimension: table['value'],
+            'reviews': table['reviews'].astype(int),
+            'mean_polarity': table['polarity_sum'] / table['reviews'],
+            'mean_rating': table['rating_sum'] / rated,
+        }).sort_values(['period', dimension], ignore_index=True)
+
+    def estimated_size(self):
+        return int(sum(t.memory_usage(deep=True).sum() for t in self._tables.values()))
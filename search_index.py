@@ -0,0 +1,142 @@
+"""Inverted index over loaded reviews with BM25 ranking, phrase queries and column filters."""
+import re
+from collections import Counter
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"\w+")
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(str(text).lower())
+
+
+class ReviewIndex:
+    """Token -> posting list of (review position, term frequency), stored as CSR-style arrays.
+
+    ``doc_ids[term_ptr[t]:term_ptr[t + 1]]`` are the (sorted) positions of the reviews
+    containing term ``t`` and ``term_freqs`` holds the matching term frequencies.
+    """
+
+    def __init__(self, texts, k1=1.2, b=0.75):
+        self.texts = texts
+        self.k1 = k1
+        self.b = b
+        self.vocab = {}
+
+        term_ids, doc_ids, term_freqs = [], [], []
+        doc_lengths = np.zeros(len(texts), dtype=np.int32)
+        vocab = self.vocab
+        for position, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths[position] = len(tokens)
+            for token, count in Counter(tokens).items():
+                term_ids.append(vocab.setdefault(token, len(vocab)))
+                doc_ids.append(position)
+                term_freqs.append(count)
+
+        term_ids = np.array(term_ids, dtype=np.int32)
+        # Stable sort keeps review positions ascending inside each posting list
+        order = np.argsort(term_ids, kind='stable')
+        self.doc_ids = np.array(doc_ids, dtype=np.int32)[order]
+        self.term_freqs = np.array(term_freqs, dtype=np.int32)[order]
+        self.term_ptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(vocab)), out=self.term_ptr[1:])
+
+        self.doc_lengths = doc_lengths
+        self.num_docs = len(texts)
+        self.avg_length = float(doc_lengths.mean()) if len(texts) else 0.0
+        # Per-review BM25 length normalisation, computed once
+        self._norm = (k1 * (1 - b + b * doc_lengths / max(self.avg_length, 1e-9))).astype(np.float32)
+
+    def postings(self, token):
+        term = self.vocab.get(token)
+        if term is None:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+        start, end = self.term_ptr[term], self.term_ptr[term + 1]
+        return self.doc_ids[start:end], self.term_freqs[start:end]
+
+    def document_frequency(self, token):
+        return len(self.postings(token)[0])
+
+    def _phrase_matches(self, phrase_tokens, candidates):
+        needle = ' ' + ' '.join(phrase_tokens) + ' '
+        keep = [p for p in candidates if needle in ' ' + ' '.join(tokenize(self.texts[p])) + ' ']
+        return np.array(keep, dtype=np.int32)
+
+    def search(self, query, mask=None, limit=50):
+        """Return ``(positions, scores)`` of the best matching reviews, best first.
+
+        Bare words are ranked with BM25 (any word may match); ``"quoted phrases"``
+        must appear verbatim. `mask` is an optional boolean array of allowed reviews.
+        """
+        terms, phrases = [], []
+        for phrase, word in QUERY_RE.findall(query):
+            if phrase:
+                tokens = tokenize(phrase)
+                if tokens:
+                    phrases.append(tokens)
+                    terms.extend(tokens)
+            else:
+                terms.extend(tokenize(word))
+        if not terms:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        matched = np.zeros(self.num_docs, dtype=bool)
+        for token in set(terms):
+            docs, freqs = self.postings(token)
+            if not len(docs):
+                continue
+            idf = np.log1p((self.num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * freqs * (self.k1 + 1) / (freqs + self._norm[docs])
+            matched[docs] = True
+
+        # Phrases: intersect the posting lists, then verify word order on the survivors only
+        for tokens in phrases:
+            candidates = None
+            for token in tokens:
+                docs = self.postings(token)[0]
+                candidates = docs if candidates is None else np.intersect1d(candidates, docs, assume_unique=True)
+            allowed = np.zeros(self.num_docs, dtype=bool)
+            if mask is not None:
+                candidates = candidates[mask[candidates]]
+            allowed[self._phrase_matches(tokens, candidates)] = True
+            matched &= allowed
+
+        if mask is not None:
+            matched &= mask
+        hits = np.flatnonzero(matched)
+        if len(hits) > limit:
+            hits = hits[np.argpartition(-scores[hits], limit)[:limit]]
+        hits = hits[np.argsort(-scores[hits], kind='stable')]
+        return hits, scores[hits]
+
+
+# Boolean mask over the frame's rows from {column: allowed values} filters
+def filter_mask(data, filters):
+    mask = np.ones(len(data), dtype=bool)
+    for column, values in filters.items():
+        if values and column in data.columns:
+            mask &= data[column].isin(values).to_numpy()
+    return mask
+
+
+# Run a query against `data` (whose 'Review' column was indexed) and return the matching rows;
+# `within` optionally restricts the search to a boolean row mask
+def search_reviews(index, data, query, filters=None, limit=50, within=None):
+    mask = filter_mask(data, filters or {})
+    if within is not None:
+        mask &= within
+    positions, scores = index.search(query, mask=mask, limit=limit)
+    results = data.iloc[positions].copy()
+    results.insert(0, 'score', scores)
+    return results
+
+
+# Rows containing `word` as a token, straight from its posting list
+def reviews_with_word(index, data, word, filters=None):
+    docs = index.postings(str(word).lower())[0]
+    mask = filter_mask(data, filters or {})
+    return data.iloc[docs[mask[docs]]]
@@ -0,0 +1,265 @@
+"""HTTP service labeling and scoring reviews with the app's taxonomies and sentiment.
+
+Run ``python service.py`` (see ``--help``) and POST JSON to:
+
+- ``/classify``: area label (classify_review)
+- ``/categorize``: customer-service category (categorize_review)
+- ``/sentiment``: TextBlob polarity and sentiment type
+- ``/label``: all of the above
+
+with ``{"text": "..."}`` or ``{"texts": [...]}``. ``GET /metrics`` reports request
+latency percentiles and batch sizes, ``GET /health`` answers when the service is up.
+
+Concurrent requests are collected into micro-batches: the worker waits at most
+``max_wait`` seconds after the first queued text, or until ``max_batch`` texts are
+queued, then normalizes, labels and scores the whole batch at once. Results are the
+same as the Review Labeler and Text2Insights pages give for the same text.
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from labeling import label_reviews
+from normalize import normalize_reviews
+from stages import polarity
+
+MAX_BATCH = 64
+MAX_WAIT = 0.005
+# Latencies kept per endpoint for the percentiles in /metrics
+LATENCY_WINDOW = 10000
+# Largest request accepted, in texts
+MAX_TEXTS = 1000
+
+FIELDS = {
+    'classify': ('label',),
+    'categorize': ('category',),
+    'sentiment': ('polarity', 'sentiment_type'),
+    'label': ('label', 'category', 'polarity', 'sentiment_type'),
+}
+
+
+def sentiment_type(score):
+    return 'Positive' if score > 0 else ('Negative' if score < 0 else 'Neutral')
+
+
+# Label and score a batch of texts the way the app's pipeline does
+def label_batch(texts):
+    normalized = normalize_reviews(pd.Series(texts, dtype=object))
+    labels = label_reviews(normalized, normalized=True)
+    scores = {text: polarity(text) for text in set(normalized)}
+    return [
+        {'label': label, 'category': category, 'polarity': scores[text], 'sentiment_type': sentiment_type(scores[text]),
+         'clean_review': text}
+        for text, label, category in zip(normalized, labels['Label'], labels['Category'])
+    ]
+
+
+class MicroBatcher:
+    """Queues texts from many request threads and processes them in batches on one worker thread."""
+
+    def __init__(self, process=label_batch, max_batch=MAX_BATCH, max_wait=MAX_WAIT):
+        self.process = process
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._batch_sizes = deque(maxlen=LATENCY_WINDOW)
+        self._stopped = threading.Event()
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    # Results for `texts`, blocking until the batch they landed in is processed
+    def submit(self, texts):
+        future = Future()
+        self._queue.put((list(texts), future))
+        return future.result()
+
+    def stop(self):
+        self._stopped.set()
+        self._queue.put(None)
+        self._worker.join()
+
+    def batch_sizes(self):
+        return list(self._batch_sizes)
+
+    def _collect(self, first):
+        items = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopped.set()
+                break
+            items.append(item)
+            size += len(item[0])
+        return items
+
+    def _run(self):
+        while not self._stopped.is_set():
+            first = self._queue.get()
+            if first is None:
+                break
+            items = self._collect(first)
+            texts = [text for item_texts, _ in items for text in item_texts]
+            self._batch_sizes.append(len(texts))
+            try:
+                results = self.process(texts)
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            start = 0
+            for item_texts, future in items:
+                future.set_result(results[start:start + len(item_texts)])
+                start += len(item_texts)
+
+
+class LatencyMetrics:
+    """Rolling request latencies per endpoint, summarized as counts and percentiles."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self._latencies = {}
+        self._counts = {}
+        self._errors = {}
+        self._window = window
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds, error=False):
+        with self._lock:
+            self._latencies.setdefault(endpoint, deque(maxlen=self._window)).append(seconds)
+            self._counts[endpoint] = self._counts.get(endpoint, 0) + 1
+            self._errors[endpoint] = self._errors.get(endpoint, 0) + error
+
+    def summary(self):
+        with self._lock:
+            latencies = {endpoint: np.array(values) for endpoint, values in self._latencies.items()}
+            counts = dict(self._counts)
+            errors = dict(self._errors)
+        return {
+            endpoint: {
+                'requests': counts[endpoint],
+                'errors': errors[endpoint],
+                'p50_ms': float(np.percentile(values, 50) * 1000),
+                'p99_ms': float(np.percentile(values, 99) * 1000),
+                'max_ms': float(values.max() * 1000),
+            }
+            for endpoint, values in latencies.items()
+        }
+
+
+def batch_summary(sizes):
+    if not sizes:
+        return {'batches': 0}
+    sizes = np.array(sizes)
+    return {'batches': len(sizes), 'mean_size': float(sizes.mean()), 'max_size': int(sizes.max())}
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'RevAIService/1.0'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send(200, {'status': 'ok'})
+        elif self.path == '/metrics':
+            self._send(200, {
+                'latency': self.server.metrics.summary(),
+                'batching': dict(batch_summary(self.server.batcher.batch_sizes()),
+                                 max_batch=self.server.batcher.max_batch, max_wait_ms=self.server.batcher.max_wait * 1000),
+            })
+        else:
+            self._send(404, {'error': f'Unknown path {self.path}'})
+
+    def do_POST(self):
+        started = time.perf_counter()
+        endpoint = self.path.strip('/')
+        if endpoint not in FIELDS:
+            self._send(404, {'error': f'Unknown path {self.path}'})
+            return
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            single = 'text' in payload
+            texts = [payload['text']] if single else payload['texts']
+            if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                raise ValueError("'texts' must be a list of strings")
+            if len(texts) > MAX_TEXTS:
+                raise ValueError(f"At most {MAX_TEXTS} texts per request")
+        except (ValueError, KeyError, TypeError) as e:
+            self._send(400, {'error': f"Expected {{'text': str}} or {{'texts': [str, ...]}}: {e}"})
+            return
+        try:
+            results = self.server.batcher.submit(texts) if texts else []
+        except Exception as e:
+            self._send(500, {'error': f"Processing failed: {e}"})
+            self.server.metrics.record(endpoint, time.perf_counter() - started, error=True)
+            return
+        fields = FIELDS[endpoint]
+        results = [{field: result[field] for field in fields} for result in results]
+        self._send(200, results[0] if single else {'results': results})
+        self.server.metrics.record(endpoint, time.perf_counter() - started)
+
+
+class ServiceServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections under a burst of concurrent clients
+    request_queue_size = 128
+
+
+def make_server(host='127.0.0.1', port=8765, max_batch=MAX_BATCH, max_wait=MAX_WAIT, verbose=False):
+    server = ServiceServer((host, port), ServiceHandler)
+    server.batcher = MicroBatcher(max_batch=max_batch, max_wait=max_wait)
+    server.metrics = LatencyMetrics()
+    server.verbose = verbose
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve review labeling and sentiment over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH, help="Most texts processed in one batch")
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT * 1000,
+                        help="Longest a queued text waits for its batch to fill")
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.max_batch, args.max_wait_ms / 1000, args.verbose)
+    print(f"Serving on http://{args.host}:{server.server_address[1]} "
+          f"(max batch {args.max_batch}, max wait {args.max_wait_ms:g} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""Per-session memory accounting for stage outputs, with spill-to-disk and idle-session eviction."""
+import itertools
+import os
+import pickle
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+from pipeline import Artifact
+from shared_cache import CACHE_DIR, estimate_size
+
+SESSION_BUDGET = int(float(os.environ.get('REVAI_SESSION_BUDGET_MB', 1024)) * 2**20)
+IDLE_TIMEOUT = float(os.environ.get('REVAI_SESSION_IDLE_TIMEOUT', 1800))
+SPILL_DIR = os.path.join(CACHE_DIR, 'sessions')
+
+
+class SessionStore:
+    """Named stage outputs of one session, kept within `budget` bytes of memory.
+
+    When the budget is exceeded the least recently used outputs are pickled to the
+    session's spill directory and reloaded on the next `get`.
+
+    An artifact shares its parent's column buffers, so it is sized by the columns it
+    added only while its parent is in memory here, and by its whole frame otherwise.
+    A parent is never spilled while a child in memory shares its columns; a spilled
+    child writes only its own columns and is re-attached to its parent on reload.
+    """
+
+    def __init__(self, session_id, budget=SESSION_BUDGET):
+        self.session_id = session_id
+        self.budget = budget
+        self.spill_dir = os.path.join(SPILL_DIR, session_id)
+        self._memory = OrderedDict()   # name -> (value, size)
+        self._spilled = {}             # name -> (path, size, key, parent_key)
+        self._dirty = set()
+        self._spill_ids = itertools.count()
+        self._lock = threading.RLock()
+        self.last_seen = time.time()
+
+    def get(self, name, default=None):
+        with self._lock:
+            if name in self._memory:
+                self._memory.move_to_end(name)
+                # Callers may add columns in place, so re-measure before the next budget check
+                self._dirty.add(name)
+                return self._memory[name][0]
+            if name in self._spilled:
+                path, size, _, parent_key = self._spilled.pop(name)
+                with open(path, 'rb') as f:
+                    value = pickle.load(f)
+                os.remove(path)
+                if parent_key is not None:
+                    value = value.attach(self.get(self._name_of(parent_key)))
+                self._memory[name] = (value, size)
+                self._dirty.add(name)
+                self.enforce_budget(keep=name)
+                return value
+            return default
+
+    def set(self, name, value):
+        with self._lock:
+            self.discard(name)
+            if value is None:
+                return
+            self._memory[name] = (value, self._size(value))
+            self.enforce_budget(keep=name)
+
+    def discard(self, name):
+        with self._lock:
+            key = self._key_of(name)
+            if key is not None:
+                # Children spilled without their columns are rebuilt while the parent is still here,
+                # and children in memory now hold all their columns themselves
+                for child in [child for child, entry in self._spilled.items() if entry[3] == key]:
+                    self.get(child)
+                self._dirty.update(child for child, (value, _) in self._memory.items() if _parent_key(value) == key)
+            self._memory.pop(name, None)
+            self._dirty.discard(name)
+            spilled = self._spilled.pop(name, None)
+            if spilled is not None:
+                _remove(spilled[0])
+
+    def __contains__(self, name):
+        return name in self._memory or name in self._spilled
+
+    # Spill least recently used outputs until memory use fits the budget
+    def enforce_budget(self, keep=None):
+        with self._lock:
+            for name in list(self._dirty):
+                if name in self._memory:
+                    value, _ = self._memory[name]
+                    self._memory[name] = (value, self._size(value))
+            self._dirty.clear()
+            # Spilling a parent would free nothing while a child still shares its columns, so
+            # parents become candidates only once their children are on disk
+            spilled = True
+            while spilled and self.memory_bytes > self.budget:
+                spilled = False
+                for name in list(self._memory):
+                    if self.memory_bytes <= self.budget:
+                        break
+                    if name != keep and not self._has_child_in_memory(name):
+                        self._spill(name)
+                        spilled = True
+
+    def _spill(self, name):
+        value, size = self._memory.pop(name)
+        parent_key = _parent_key(value)
+        if parent_key is not None and self._name_of(parent_key) is not None:
+            value = value.detached()
+        else:
+            parent_key = None
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = os.path.join(self.spill_dir, f'{next(self._spill_ids)}.pkl')
+        with open(path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._spilled[name] = (path, size, value.key if isinstance(value, Artifact) else None, parent_key)
+
+    def _size(self, value):
+        if isinstance(value, Artifact) and self._name_of(value.parent_key, in_memory=True) is None:
+            return value.full_size()
+        return estimate_size(value)
+
+    def _key_of(self, name):
+        if name in self._memory:
+            value = self._memory[name][0]
+            return value.key if isinstance(value, Artifact) else None
+        if name in self._spilled:
+            return self._spilled[name][2]
+        return None
+
+    # Name under which the artifact with `key` is stored, if any
+    def _name_of(self, key, in_memory=False):
+        if key is None:
+            return None
+        names = list(self._memory) if in_memory else list(self._memory) + list(self._spilled)
+        return next((name for name in names if self._key_of(name) == key), None)
+
+    def _has_child_in_memory(self, name):
+        key = self._key_of(name)
+        return key is not None and any(_parent_key(value) == key for value, _ in self._memory.values())
+
+    @property
+    def memory_bytes(self):
+        return sum(size for _, size in self._memory.values())
+
+    @property
+    def disk_bytes(self):
+        return sum(entry[1] for entry in self._spilled.values())
+
+    def usage(self):
+        rows = [{'dataset': name, 'location': 'memory', 'mb': size / 2**20} for name, (_, size) in self._memory.items()]
+        rows += [{'dataset': name, 'location': 'disk', 'mb': entry[1] / 2**20} for name, entry in self._spilled.items()]
+        return rows
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._spilled.clear()
+            self._dirty.clear()
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+
+class SessionRegistry:
+    """All live session stores, so usage can be reported and idle sessions evicted."""
+
+    def __init__(self, idle_timeout=IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._stores = {}
+        self._lock = threading.Lock()
+
+    def store(self, session_id):
+        with self._lock:
+            store = self._stores.get(session_id)
+            if store is None:
+                store = self._stores[session_id] = SessionStore(session_id)
+            store.last_seen = time.time()
+            return store
+
+    def evict_idle(self):
+        cutoff = time.time() - self.idle_timeout
+        with self._lock:
+            idle = [sid for sid, store in self._stores.items() if store.last_seen < cutoff]
+            for session_id in idle:
+                store = self._stores.pop(session_id)
+                store.clear()
+        return idle
+
+    def stores(self):
+        with self._lock:
+            return list(self._stores.values())
+
+
+def _parent_key(value):
+    return value.parent_key if isinstance(value, Artifact) else None
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SessionRegistry()
+            # Spill files of a previous server process can never be reloaded
+            shutil.rmtree(SPILL_DIR, ignore_errors=True)
+        return _registry
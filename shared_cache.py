@@ -0,0 +1,272 @@
+"""Process-wide cache shared by all sessions, with TTLs, LRU eviction and a disk tier."""
+import hashlib
+import itertools
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get('REVAI_CACHE_DIR', os.path.join(BASE_DIR, '.revai_cache'))
+
+# Scrapes of the same app/sort/rating range/count are reused for this long
+SCRAPE_TTL = float(os.environ.get('REVAI_SCRAPE_TTL', 3600))
+# Analysis outputs are keyed by content, so they only expire to free space
+ANALYSIS_TTL = float(os.environ.get('REVAI_ANALYSIS_TTL', 24 * 3600))
+# Longest a caller waits for another caller's computation of the same key before computing it itself
+COMPUTE_WAIT = float(os.environ.get('REVAI_CACHE_COMPUTE_WAIT', 600))
+
+
+# Approximate in-memory size of a cached value, in bytes
+def estimate_size(value):
+    if hasattr(value, 'estimated_size'):
+        return value.estimated_size()
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if sparse.issparse(value):
+        value = value.tocsr()
+        return int(value.data.nbytes + value.indices.nbytes + value.indptr.nbytes)
+    if isinstance(value, (list, tuple)):
+        # Lists of strings (scraped reviews) are the common case; sample long ones
+        if len(value) > 1000:
+            sample = value[:1000]
+            return int(sum(estimate_size(v) for v in sample) * len(value) / len(sample))
+        return sum(estimate_size(v) for v in value) + 8 * len(value)
+    if isinstance(value, dict):
+        return sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (str, bytes)):
+        return len(value) + 49
+    if hasattr(value, '__dict__'):
+        return estimate_size(vars(value))
+    return 64
+
+
+class _Entry:
+    __slots__ = ('value', 'size', 'expires')
+
+    def __init__(self, value, size, expires):
+        self.value = value
+        self.size = size
+        self.expires = expires
+
+
+class SharedCache:
+    """LRU cache bounded by total bytes, with per-entry TTLs.
+
+    Entries evicted from memory are spilled to `disk_dir` (itself LRU-bounded by
+    `max_disk_bytes`) and promoted back on the next hit. Pickling and unpickling
+    happen outside the lock, so one large spill does not stall every other session.
+    """
+
+    def __init__(self, max_bytes, disk_dir=None, max_disk_bytes=0, compute_wait=COMPUTE_WAIT):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes if disk_dir else 0
+        self.compute_wait = compute_wait
+        self._memory = OrderedDict()
+        self._disk = OrderedDict()    # key -> (path, size, expires)
+        self._bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.RLock()
+        self._inflight = {}
+        self._spill_ids = itertools.count()
+        # Spilled files are only indexed in memory, so leftovers from a previous process are stale
+        if disk_dir and os.path.isdir(disk_dir):
+            for name in os.listdir(disk_dir):
+                if name.endswith('.pkl'):
+                    self._remove_file(os.path.join(disk_dir, name))
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Every spill gets its own file, so two spills of one key never write to the same path
+    def _path(self, key):
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self.disk_dir, f'{digest}.{next(self._spill_ids)}.pkl')
+
+    def get(self, key, default=None):
+        value = self._lookup(key, default)
+        with self._lock:
+            if value is default:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def _lookup(self, key, default):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry.expires > now:
+                self._memory.move_to_end(key)
+                return entry.value
+            if entry is not None:
+                self._drop_memory(key)
+            stored = self._disk.pop(key, None)
+            if stored is None:
+                return default
+            path, size, expires = stored
+            self._disk_bytes -= size
+        value = default
+        if expires > now:
+            try:
+                with open(path, 'rb') as f:
+                    value = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                pass
+        self._remove_file(path)
+        if value is default:
+            return default
+        with self._lock:
+            self.disk_hits += 1
+            # A value set while this one was loading is newer
+            entry = self._memory.get(key)
+            if entry is not None:
+                return entry.value
+            evicted = self._store(key, value, size, expires)
+        self._spill(evicted)
+        return value
+
+    def set(self, key, value, ttl):
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._memory:
+                self._drop_memory(key)
+            evicted = self._store(key, value, size, time.time() + ttl)
+        self._spill(evicted)
+
+    def get_or_compute(self, key, compute, ttl):
+        """Return the cached value for `key`, computing it at most once across concurrent callers."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+        with self._lock:
+            event = self._inflight.get(key)
+            owner = event is None
+            if owner:
+                event = self._inflight[key] = threading.Event()
+        if not owner:
+            # Another caller is computing it: wait and count this as a hit, not a second miss.
+            # One that takes longer than `compute_wait` is not waited on; this caller computes too
+            if not event.wait(self.compute_wait):
+                value = compute()
+                self.set(key, value, ttl)
+                return value
+            value = self._lookup(key, missing)
+            if value is not missing:
+                with self._lock:
+                    self.misses -= 1
+                    self.hits += 1
+                return value
+            return self.get_or_compute(key, compute, ttl)
+        try:
+            value = compute()
+            self.set(key, value, ttl)
+            return value
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+
+    # Called under the lock; returns the evicted entries, which the caller spills once it has released it
+    def _store(self, key, value, size, expires):
+        self._memory[key] = _Entry(value, size, expires)
+        self._bytes += size
+        evicted = []
+        while self._bytes > self.max_bytes and len(self._memory) > 1:
+            old_key, old = self._memory.popitem(last=False)
+            self._bytes -= old.size
+            self.evictions += 1
+            evicted.append((old_key, old))
+        return evicted
+
+    def _drop_memory(self, key):
+        entry = self._memory.pop(key)
+        self._bytes -= entry.size
+
+    # Pickle evicted entries without holding the lock, then index the written files under it
+    def _spill(self, evicted):
+        for key, entry in evicted:
+            if not self.max_disk_bytes or entry.size > self.max_disk_bytes or entry.expires <= time.time():
+                continue
+            path = self._path(key)
+            try:
+                os.makedirs(self.disk_dir, exist_ok=True)
+                with open(path, 'wb') as f:
+                    pickle.dump(entry.value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            except (OSError, pickle.PicklingError, TypeError, AttributeError):
+                self._remove_file(path)
+                continue
+            stale = []
+            with self._lock:
+                if key in self._memory:
+                    # Set again while this copy was being written
+                    stale.append(path)
+                else:
+                    if key in self._disk:
+                        old_path, old_size, _ = self._disk.pop(key)
+                        self._disk_bytes -= old_size
+                        stale.append(old_path)
+                    self._disk[key] = (path, entry.size, entry.expires)
+                    self._disk_bytes += entry.size
+                    while self._disk_bytes > self.max_disk_bytes and self._disk:
+                        _, (old_path, old_size, _) = self._disk.popitem(last=False)
+                        self._disk_bytes -= old_size
+                        stale.append(old_path)
+            for stale_path in stale:
+                self._remove_file(stale_path)
+
+    @staticmethod
+    def _remove_file(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        with self._lock:
+            for path, _, _ in self._disk.values():
+                self._remove_file(path)
+            self._memory.clear()
+            self._disk.clear()
+            self._bytes = self._disk_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._memory),
+            'disk_entries': len(self._disk),
+            'memory_mb': self._bytes / 2**20,
+            'disk_mb': self._disk_bytes / 2**20,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_shared_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SharedCache(
+                max_bytes=int(float(os.environ.get('REVAI_CACHE_MAX_MB', 512)) * 2**20),
+                disk_dir=os.path.join(CACHE_DIR, 'shared'),
+                max_disk_bytes=int(float(os.environ.get('REVAI_CACHE_DISK_MB', 2048)) * 2**20),
+            )
+        return _cache
@@ -0,0 +1,154 @@
+"""Analysis stages that can run outside the Streamlit script, e.g. as background jobs.
+
+Each stage takes an optional ``progress(fraction, message)`` callback, which is also
+where a background job gets cancelled.
+"""
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from textblob import TextBlob
+
+from datasets import dataset_fingerprint
+from backfill import stream_google_play_reviews
+from dedup import DedupPlan
+from features import get_feature_store
+from normalize import NORMALIZE_VERSION, normalize_reviews
+from labeling import LabelHits, label_hits, label_reviews
+import polars_backend
+from play_store import scrape_google_play_reviews, fetch_google_play_app_details
+from shared_cache import get_shared_cache, SCRAPE_TTL, ANALYSIS_TTL
+from taxonomy import taxonomy_version
+from topics import Topics, discover_topics
+from warehouse import get_warehouse
+
+CHUNK_SIZE = 5000
+
+
+def _report(progress, fraction, message):
+    if progress is not None:
+        progress(fraction, message)
+
+
+# Normalized text of a dataset, computed once per content and shared by every session;
+# both engines give identical results, so they share the cached output
+def normalize_stage(reviews, engine=None, progress=None):
+    normalize = polars_backend.normalize_reviews if polars_backend.check_engine(engine) == 'polars' else normalize_reviews
+    normalized = get_shared_cache().get_or_compute(
+        ('normalized', dataset_fingerprint(reviews), NORMALIZE_VERSION),
+        lambda: normalize(reviews.reset_index(drop=True)),
+        ANALYSIS_TTL
+    )
+    return normalized.set_axis(reviews.index)
+
+
+# Scrapes and app details are shared by every session asking for the same app and parameters;
+# the reviews come back as a Review/Date/Rating frame
+def scrape_stage(app_id, num_reviews, sort_order, min_rating, max_rating, progress=None):
+    cache = get_shared_cache()
+    reviews = cache.get_or_compute(
+        ('scrape_reviews', app_id, str(sort_order), min_rating, max_rating, num_reviews),
+        lambda: scrape_google_play_reviews(app_id, num_reviews, sort_order, min_rating, max_rating, progress=progress),
+        SCRAPE_TTL
+    )
+    app_details = cached_app_details(app_id) if len(reviews) else None
+    return reviews, app_details
+
+
+# Large scrapes stream to parquet part files instead of memory; returns (directory, rows on disk, finished)
+def backfill_stage(app_id, num_reviews, sort_order, min_rating, max_rating, progress=None):
+    out_dir, checkpoint = stream_google_play_reviews(app_id, num_reviews, sort_order, min_rating, max_rating, progress=progress)
+    return out_dir, checkpoint.rows, checkpoint.done
+
+
+def cached_app_details(app_id):
+    return get_shared_cache().get_or_compute(
+        ('app_details', app_id), lambda: fetch_google_play_app_details(app_id), SCRAPE_TTL
+    )
+
+
+# Label each distinct normalized text once, in chunks; returns (labels, hits or None, dedup summary)
+def label_stage(reviews, multi_label=False, engine=None, progress=None):
+    key = ('labels', dataset_fingerprint(reviews), taxonomy_version(), multi_label)
+    labels, hits, summary = get_shared_cache().get_or_compute(
+        key, lambda: _label(reviews.reset_index(drop=True), multi_label, polars_backend.check_engine(engine), progress),
+        ANALYSIS_TTL
+    )
+    labels = labels.set_axis(reviews.index)
+    return labels, hits.with_index(reviews.index) if hits is not None else None, summary
+
+
+def _label(reviews, multi_label, engine, progress):
+    plan = DedupPlan(reviews)
+    texts = plan.unique_texts
+    # Hit counts need the keyword scanner; first-match labels can use either engine
+    label = polars_backend.label_reviews if engine == 'polars' else label_reviews
+    parts = []
+    for start in range(0, len(texts), CHUNK_SIZE):
+        _report(progress, start / max(len(texts), 1), f"Labeled {start:,} of {len(texts):,} unique texts")
+        chunk = texts.iloc[start:start + CHUNK_SIZE]
+        parts.append(label_hits(chunk, normalized=True) if multi_label else label(chunk, normalized=True))
+
+    if not multi_label:
+        labels = pd.concat(parts) if parts else label(texts, normalized=True)
+        return plan.broadcast(labels), None, plan.summary()
+
+    if not parts:
+        parts = [label_hits(texts, normalized=True)]
+    first = parts[0]
+    hits = LabelHits(
+        sparse.vstack([p.matrix for p in parts]).tocsr(), first.columns, first.fallbacks, texts.index, first.taxonomy_hash
+    ).broadcast(plan)
+    return hits.primary_labels(), hits, plan.summary()
+
+
+def _scaled(progress, offset, scale):
+    return None if progress is None else lambda fraction, message: progress(offset + scale * fraction, message)
+
+
+# Hashed features of a dataset's normalized text, built once and memory-mapped on later calls
+def feature_stage(texts, parent=None, progress=None):
+    return get_feature_store(texts, parent, progress=progress)
+
+
+# Topics of the rows of `texts` (normalized text of the whole dataset) selected by `mask`,
+# clustered from the dataset's feature store and shared by every session asking for the same
+def topic_stage(texts, mask, num_topics, parent=None, progress=None):
+    def compute():
+        features = feature_stage(texts, parent, progress=_scaled(progress, 0.0, 0.5))
+        positions = np.flatnonzero(np.asarray(mask))
+        subset = pd.Series(texts.to_numpy()[positions], index=positions)
+        return discover_topics(features, subset, num_topics, progress=_scaled(progress, 0.5, 0.5))
+
+    topics = get_shared_cache().get_or_compute(
+        ('topics', dataset_fingerprint(texts), dataset_fingerprint(mask), num_topics), compute, ANALYSIS_TTL
+    )
+    return Topics(topics.assignments.set_axis(texts.index[topics.assignments.index]), topics.summary, topics.message)
+
+
+def polarity(text):
+    return TextBlob(text).sentiment.polarity if text else 0
+
+
+# TextBlob polarity of each distinct normalized text, broadcast back to every row
+def sentiment_stage(cleaned_reviews, progress=None):
+    polarity = get_shared_cache().get_or_compute(
+        ('sentiment', dataset_fingerprint(cleaned_reviews)),
+        lambda: _sentiment(cleaned_reviews.reset_index(drop=True), progress),
+        ANALYSIS_TTL
+    )
+    return polarity.set_axis(cleaned_reviews.index)
+
+
+def _sentiment(cleaned_reviews, progress):
+    plan = DedupPlan(cleaned_reviews)
+    texts = plan.unique_texts
+    scores = []
+    for start in range(0, len(texts), CHUNK_SIZE):
+        _report(progress, start / max(len(texts), 1), f"Scored {start:,} of {len(texts):,} unique texts")
+        scores.extend(texts.iloc[start:start + CHUNK_SIZE].map(polarity))
+    return plan.broadcast(pd.Series(scores, dtype=float))
+
+
+# Append a scored dataset to the warehouse as a run; returns the run ID
+def warehouse_stage(scored_frame, source, dataset_key, progress=None):
+    return get_warehouse().append_run(scored_frame, source, dataset_key, progress=progress)
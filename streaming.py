@@ -0,0 +1,339 @@
+"""Streaming ingestion: tail a growing JSONL/CSV drop file (or stdin) and keep sliding-window aggregates.
+
+    python streaming.py reviews.jsonl            # new records only
+    python streaming.py reviews.csv --from-start # existing rows first, then new ones
+    producer | python streaming.py -
+
+New records are labeled and scored in small batches, exactly as service.py does, and
+folded into per-bucket counters. After every batch the window's sentiment mix,
+category counts and heavy-hitter terms are written to a JSON snapshot, which the Live
+Stream page polls; no processed record is ever read again.
+
+CSV drop files need one record per line (no quoted newlines) and a header row.
+"""
+import argparse
+import csv
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+from ingest import review_column
+from service import label_batch
+from shared_cache import CACHE_DIR
+
+SNAPSHOT_PATH = os.environ.get('REVAI_STREAM_SNAPSHOT', os.path.join(CACHE_DIR, 'stream', 'snapshot.json'))
+WINDOW_SECONDS = 3600
+BUCKET_SECONDS = 60
+BATCH_SIZE = 200
+# Longest a record waits for its batch to fill, and how often a quiet file is re-read
+POLL_INTERVAL = 1.0
+# Terms tracked by the heavy-hitter sketch of each bucket, and terms reported
+SKETCH_CAPACITY = 500
+TOP_TERMS = 25
+READ_SIZE = 1 << 20
+
+SENTIMENTS = ('Positive', 'Negative', 'Neutral')
+
+
+class SpaceSaving:
+    """Space-Saving heavy-hitter sketch: approximate counts of the most frequent terms in bounded memory.
+
+    Each tracked term keeps (count, error); a term's true count lies between
+    ``count - error`` and ``count``, and every term occurring more than
+    ``total / capacity`` times is guaranteed to be tracked.
+    """
+
+    def __init__(self, capacity=SKETCH_CAPACITY):
+        self.capacity = capacity
+        self.counters = {}
+        self.total = 0
+
+    def add(self, term, count=1):
+        self.total += count
+        counters = self.counters
+        if term in counters:
+            counters[term][0] += count
+        elif len(counters) < self.capacity:
+            counters[term] = [count, 0]
+        else:
+            # Replace the smallest counter; its count becomes the newcomer's error bound
+            smallest = min(counters, key=lambda t: counters[t][0])
+            floor = counters.pop(smallest)[0]
+            counters[term] = [floor + count, floor]
+
+    def update(self, counts):
+        # Heaviest first, so a batch's frequent terms are not evicted by its own tail
+        for term, count in sorted(counts.items(), key=lambda item: -item[1]):
+            self.add(term, count)
+
+    def top(self, k=TOP_TERMS):
+        ranked = sorted(self.counters.items(), key=lambda item: -item[1][0])[:k]
+        return [(term, count, error) for term, (count, error) in ranked]
+
+
+# Sketches of several buckets combined. A term a full sketch does not track may have
+# occurred up to that sketch's smallest count there, which is added to its count and error
+def merge_sketches(sketches, capacity=SKETCH_CAPACITY):
+    merged = SpaceSaving(capacity)
+    counters = {}
+    floors = 0
+    for sketch in sketches:
+        merged.total += sketch.total
+        floor = min(count for count, _ in sketch.counters.values()) if len(sketch.counters) >= sketch.capacity else 0
+        floors += floor
+        # Every term is credited every floor at the end, so a tracked term gives its floor back here
+        for term, (count, error) in sketch.counters.items():
+            entry = counters.setdefault(term, [0, 0])
+            entry[0] += count - floor
+            entry[1] += error - floor
+    top = sorted(counters.items(), key=lambda item: -item[1][0])[:capacity]
+    merged.counters = {term: [count + floors, error + floors] for term, (count, error) in top}
+    return merged
+
+
+class _Bucket:
+    __slots__ = ('start', 'records', 'sentiment', 'categories', 'labels', 'polarity_sum', 'terms')
+
+    def __init__(self, start, capacity):
+        self.start = start
+        self.records = 0
+        self.sentiment = Counter()
+        self.categories = Counter()
+        self.labels = Counter()
+        self.polarity_sum = 0.0
+        self.terms = SpaceSaving(capacity)
+
+
+class WindowedAggregates:
+    """Sentiment mix, category and label counts and heavy-hitter terms over a sliding time window.
+
+    Records are added to fixed-size time buckets; buckets older than the window are
+    dropped, so memory is bounded by the window length, not by the stream.
+    """
+
+    def __init__(self, window=WINDOW_SECONDS, bucket=BUCKET_SECONDS, capacity=SKETCH_CAPACITY):
+        self.window = window
+        self.bucket = bucket
+        self.capacity = capacity
+        self._buckets = deque()
+        self.records_total = 0
+        self.started = time.time()
+
+    def _bucket_at(self, now):
+        start = now - now % self.bucket
+        if not self._buckets or self._buckets[-1].start < start:
+            self._buckets.append(_Bucket(start, self.capacity))
+        return self._buckets[-1]
+
+    def expire(self, now=None):
+        now = time.time() if now is None else now
+        while self._buckets and self._buckets[0].start <= now - self.window:
+            self._buckets.popleft()
+
+    # Fold labeled and scored records (dicts as returned by label_batch) into the current bucket
+    def add(self, results, now=None):
+        now = time.time() if now is None else now
+        bucket = self._bucket_at(now)
+        terms = Counter()
+        for result in results:
+            bucket.sentiment[result['sentiment_type']] += 1
+            bucket.categories[result['category']] += 1
+            bucket.labels[result['label']] += 1
+            bucket.polarity_sum += result['polarity']
+            terms.update(word for word in result['clean_review'].split() if word not in ENGLISH_STOP_WORDS)
+        bucket.terms.update(terms)
+        bucket.records += len(results)
+        self.records_total += len(results)
+        self.expire(now)
+
+    def snapshot(self, top_k=TOP_TERMS, now=None):
+        now = time.time() if now is None else now
+        self.expire(now)
+        buckets = list(self._buckets)
+        records = sum(b.records for b in buckets)
+        return {
+            'updated': datetime.fromtimestamp(now).isoformat(timespec='seconds'),
+            'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+            'window_seconds': self.window,
+            'bucket_seconds': self.bucket,
+            'records_total': self.records_total,
+            'records_window': records,
+            'mean_polarity': sum(b.polarity_sum for b in buckets) / records if records else None,
+            'sentiment': dict(sum((b.sentiment for b in buckets), Counter())),
+            'categories': dict(sum((b.categories for b in buckets), Counter()).most_common()),
+            'labels': dict(sum((b.labels for b in buckets), Counter()).most_common()),
+            'heavy_hitters': [
+                {'term': term, 'count': count, 'error': error}
+                for term, count, error in merge_sketches([b.terms for b in buckets], self.capacity).top(top_k)
+            ],
+            'series': [
+                dict({'start': datetime.fromtimestamp(b.start).isoformat(timespec='seconds'), 'records': b.records},
+                     **{sentiment: b.sentiment.get(sentiment, 0) for sentiment in SENTIMENTS})
+                for b in buckets
+            ],
+        }
+
+
+def write_snapshot(snapshot, path=SNAPSHOT_PATH):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path=SNAPSHOT_PATH):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# Reader threads put complete lines on `lines`; None marks the end of the input
+def _read_stdin(lines, stop):
+    for line in sys.stdin.buffer:
+        if stop.is_set():
+            break
+        lines.put(line.rstrip(b'\r\n').decode('utf-8', 'replace'))
+    lines.put(None)
+
+
+def _follow_file(path, from_start, lines, stop, poll=POLL_INTERVAL):
+    with open(path, 'rb') as f:
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+        partial = b''
+        while not stop.is_set():
+            chunk = f.read(READ_SIZE)
+            if chunk:
+                # A line without its newline yet is kept until the writer finishes it
+                *complete, partial = (partial + chunk).split(b'\n')
+                for line in complete:
+                    lines.put(line.rstrip(b'\r').decode('utf-8', 'replace'))
+                continue
+            if os.stat(path).st_size < f.tell():
+                # Truncated or replaced in place: start over from the top
+                f.seek(0)
+                partial = b''
+            stop.wait(poll)
+
+
+class RecordParser:
+    """Turns JSONL or CSV lines into review texts, finding the review field like the upload page does."""
+
+    def __init__(self, fmt, column=None, header=None):
+        self.fmt = fmt
+        self.column = column
+        self.header = header
+
+    def _pick_column(self, names):
+        if self.column is None:
+            self.column = review_column(names)
+            if self.column is None:
+                raise ValueError(f"No review column among {list(names)}; pass --column")
+        return self.column
+
+    def parse(self, line):
+        if not line.strip():
+            return None
+        if self.fmt == 'jsonl':
+            record = json.loads(line)
+            if isinstance(record, str):
+                return record
+            if not isinstance(record, dict):
+                raise ValueError(f"Expected an object or a string, got {type(record).__name__}")
+            value = record.get(self._pick_column(record))
+            return None if value is None else str(value)
+        row = next(csv.reader([line]))
+        if self.header is None:
+            self.header = row
+            self._pick_column(row)
+            return None
+        index = self.header.index(self._pick_column(self.header))
+        return row[index] if index < len(row) else None
+
+
+def _csv_header(path):
+    with open(path, encoding='utf-8', errors='replace', newline='') as f:
+        return next(csv.reader([f.readline()]), None)
+
+
+def run_stream(source, fmt=None, column=None, from_start=False, window=WINDOW_SECONDS, bucket=BUCKET_SECONDS,
+               batch_size=BATCH_SIZE, poll=POLL_INTERVAL, snapshot_path=SNAPSHOT_PATH, stop=None, on_batch=None):
+    """Tail `source` (a path, or '-' for stdin) until it ends or `stop` is set, updating the snapshot per batch."""
+    fmt = fmt or ('csv' if str(source).lower().endswith('.csv') else 'jsonl')
+    stop = stop or threading.Event()
+    lines = queue.Queue(maxsize=100 * batch_size)
+    if source == '-':
+        parser = RecordParser(fmt, column)
+        reader = threading.Thread(target=_read_stdin, args=(lines, stop), daemon=True)
+    else:
+        # Tailing from the end skips the header row, so read it up front
+        parser = RecordParser(fmt, column, _csv_header(source) if fmt == 'csv' and not from_start else None)
+        reader = threading.Thread(target=_follow_file, args=(source, from_start, lines, stop, poll), daemon=True)
+    reader.start()
+
+    aggregates = WindowedAggregates(window, bucket)
+    write_snapshot(aggregates.snapshot(), snapshot_path)
+    ended = False
+    while not ended and not stop.is_set():
+        texts = []
+        deadline = time.monotonic() + poll
+        while len(texts) < batch_size:
+            try:
+                line = lines.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if line is None:
+                ended = True
+                break
+            try:
+                text = parser.parse(line)
+            except ValueError as e:
+                print(f"Skipping malformed record: {e}", file=sys.stderr)
+                continue
+            if text is not None:
+                texts.append(text)
+        if texts:
+            aggregates.add(label_batch(texts))
+        # Written on quiet ticks too, so old buckets age out of the dashboard
+        write_snapshot(aggregates.snapshot(), snapshot_path)
+        if on_batch is not None:
+            on_batch(aggregates, len(texts))
+    stop.set()
+    return aggregates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tail a JSONL/CSV drop file and keep live sentiment aggregates")
+    parser.add_argument('source', help="File to tail, or - for stdin")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help="Default: from the file extension, else jsonl")
+    parser.add_argument('--column', help="Review field; default: the first one named like review/comment/text")
+    parser.add_argument('--from-start', action='store_true', help="Process the file's existing records first")
+    parser.add_argument('--window', type=float, default=WINDOW_SECONDS, help="Sliding window, in seconds")
+    parser.add_argument('--bucket', type=float, default=BUCKET_SECONDS, help="Window resolution, in seconds")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--snapshot', default=SNAPSHOT_PATH, help="Where the live aggregates are written")
+    args = parser.parse_args()
+
+    def report(aggregates, added):
+        if added:
+            print(f"+{added} records ({aggregates.records_total:,} total)", flush=True)
+
+    try:
+        run_stream(args.source, args.format, args.column, args.from_start, args.window, args.bucket,
+                   args.batch_size, snapshot_path=args.snapshot, on_batch=report)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""Keyword taxonomies loaded from versioned YAML/JSON files and compiled into cached matchers."""
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+import time
+
+import yaml
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TAXONOMY_DIR = os.environ.get('REVAI_TAXONOMY_DIR', os.path.join(BASE_DIR, 'taxonomies'))
+CACHE_DIR = os.environ.get('REVAI_CACHE_DIR', os.path.join(BASE_DIR, '.revai_cache'))
+
+# Bumped whenever the compiled artifact layout changes so stale pickles are ignored
+ARTIFACT_FORMAT = 1
+
+# How often (seconds) a taxonomy file is re-stat'ed for hot reload
+RELOAD_CHECK_INTERVAL = 1.0
+
+_lock = threading.Lock()
+_compiled = {}   # content hash -> CompiledTaxonomy, ('hits', *hashes) -> HitScanner
+_loaded = {}     # taxonomy name -> (path, (mtime_ns, size), last check, CompiledTaxonomy)
+
+
+class TaxonomyError(ValueError):
+    pass
+
+
+class CompiledTaxonomy:
+    """Ordered labels with one compiled pattern per label; the first matching label wins."""
+
+    def __init__(self, name, version, content_hash, labels, keywords, fallback, patterns):
+        self.name = name
+        self.version = version
+        self.content_hash = content_hash
+        self.labels = labels
+        self.keywords = keywords
+        self.fallback = fallback
+        self.patterns = [re.compile(p) for p in patterns]
+
+    def match(self, text):
+        # `text` must already be lowercased
+        for label, pattern in zip(self.labels, self.patterns):
+            if pattern.search(text):
+                return label
+        return self.fallback
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['patterns'] = [p.pattern for p in self.patterns]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.patterns = [re.compile(p) for p in self.patterns]
+
+
+def _build_trie(keywords):
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    return trie
+
+
+# Build a regex from a keyword trie so shared prefixes are only scanned once
+def _trie_pattern(keywords):
+    def emit(node):
+        if '' in node:
+            # A keyword ends here, so anything longer is irrelevant for substring matching
+            return ''
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items())]
+        return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+    return emit(_build_trie(keywords)) if keywords else r'(?!)'
+
+
+# Regex matching the longest keyword that starts at the current position
+def _longest_match_pattern(keywords):
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Greedy optional: prefer a longer keyword, fall back to the one ending here
+        return f'(?:{body})?' if '' in node else body
+
+    return emit(_build_trie(keywords))
+
+
+class HitScanner:
+    """Counts keyword hits for every label of several taxonomies in one scan of the text."""
+
+    def __init__(self, taxonomies):
+        self.taxonomies = [t.name for t in taxonomies]
+        self.content_hash = '-'.join(t.content_hash for t in taxonomies)
+        self.columns = [(t.name, label) for t in taxonomies for label in t.labels]
+
+        keyword_columns = {}
+        column = 0
+        for t in taxonomies:
+            for keywords in t.keywords:
+                for keyword in set(keywords):
+                    keyword_columns.setdefault(keyword, []).append(column)
+                column += 1
+
+        # Every occurrence of a keyword is a prefix of the longest keyword matching at
+        # that position, so each longest match credits all of its keyword prefixes
+        self.hit_map = {}
+        for keyword in keyword_columns:
+            hits = []
+            for end in range(1, len(keyword) + 1):
+                hits.extend(keyword_columns.get(keyword[:end], ()))
+            self.hit_map[keyword] = hits
+        pattern = _longest_match_pattern(keyword_columns) if keyword_columns else '(?!)'
+        self.pattern = re.compile(f'(?=({pattern}))')
+
+    def scan(self, text):
+        # `text` must already be lowercased; returns {column: hit count}
+        counts = {}
+        hit_map = self.hit_map
+        for keyword in self.pattern.findall(text):
+            for column in hit_map[keyword]:
+                counts[column] = counts.get(column, 0) + 1
+        return counts
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['pattern'] = self.pattern.pattern
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.pattern = re.compile(self.pattern)
+
+
+def _parse(raw, path):
+    if path.endswith('.json'):
+        data = json.loads(raw.decode('utf-8'))
+    else:
+        data = yaml.safe_load(raw.decode('utf-8'))
+    if not isinstance(data, dict) or not isinstance(data.get('labels'), list):
+        raise TaxonomyError(f"{path}: expected a mapping with a 'labels' list")
+    labels, keywords = [], []
+    for entry in data['labels']:
+        if not isinstance(entry, dict) or 'name' not in entry:
+            raise TaxonomyError(f"{path}: every label needs a 'name'")
+        labels.append(str(entry['name']))
+        # Matching is done against lowercased text, so keywords are kept verbatim
+        # (a keyword with capitals can never match, exactly as before)
+        keywords.append([str(k) for k in entry.get('keywords') or []])
+    return data.get('name'), data.get('version'), data.get('fallback', 'Unknown'), labels, keywords
+
+
+def _find_file(name):
+    for ext in ('.yaml', '.yml', '.json'):
+        path = os.path.join(TAXONOMY_DIR, name + ext)
+        if os.path.exists(path):
+            return path
+    raise TaxonomyError(f"No taxonomy file named '{name}' in {TAXONOMY_DIR}")
+
+
+def _artifact_path(name, content_hash):
+    return os.path.join(CACHE_DIR, 'taxonomy', f'{name}-{content_hash}.pkl')
+
+
+def compile_taxonomy(path, name=None):
+    """Compile a taxonomy file, reusing the in-memory or on-disk artifact for the same content."""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    content_hash = hashlib.sha256(raw + str(ARTIFACT_FORMAT).encode()).hexdigest()[:16]
+    name = name or os.path.splitext(os.path.basename(path))[0]
+
+    if content_hash in _compiled:
+        return _compiled[content_hash]
+
+    artifact_path = _artifact_path(name, content_hash)
+    try:
+        with open(artifact_path, 'rb') as f:
+            compiled = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        file_name, version, fallback, labels, keywords = _parse(raw, path)
+        compiled = CompiledTaxonomy(
+            file_name or name, version, content_hash, labels, keywords, fallback,
+            [_trie_pattern(kws) for kws in keywords]
+        )
+        try:
+            os.makedirs(os.path.dirname(artifact_path), exist_ok=True)
+            tmp_path = f'{artifact_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(compiled, f)
+            os.replace(tmp_path, artifact_path)
+        except OSError:
+            pass  # The disk cache is an optimisation only
+
+    _compiled[content_hash] = compiled
+    return compiled
+
+
+def get_taxonomy(name):
+    """Return the compiled taxonomy `name`, hot-reloading it if its file changed."""
+    now = time.monotonic()
+    with _lock:
+        entry = _loaded.get(name)
+        if entry is not None and now - entry[2] < RELOAD_CHECK_INTERVAL:
+            return entry[3]
+        path = entry[0] if entry is not None and os.path.exists(entry[0]) else _find_file(name)
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if entry is not None and entry[0] == path and entry[1] == signature:
+            compiled = entry[3]
+        else:
+            compiled = compile_taxonomy(path, name)
+        _loaded[name] = (path, signature, now, compiled)
+        return compiled
+
+
+def taxonomy_version(*names):
+    """Combined content hash of the given taxonomies, for keying cached labels."""
+    names = names or ('areas', 'categories')
+    return '-'.join(get_taxonomy(name).content_hash for name in names)
+
+
+def get_hit_scanner(*names):
+    """Return a HitScanner over the given taxonomies, rebuilt whenever one of them changes."""
+    names = names or ('areas', 'categories')
+    taxonomies = [get_taxonomy(name) for name in names]
+    key = ('hits',) + tuple(t.content_hash for t in taxonomies)
+    with _lock:
+        scanner = _compiled.get(key)
+        if scanner is None:
+            scanner = _compiled[key] = HitScanner(taxonomies)
+    return scanner
@@ -0,0 +1,35 @@
+"""Word and n-gram counts behind the Text2Insights views, for either engine (see polars_backend.py)."""
+import pandas as pd
+from nltk.probability import FreqDist
+from nltk.util import ngrams
+
+import polars_backend
+
+
+# Words of all texts in order, without stop words and the comma-separated excluded words
+def analyze_text(texts, stop_words, exclude_words='', engine='pandas'):
+    if engine == 'polars':
+        return polars_backend.words(texts, stop_words, exclude_words)
+    words = ' '.join(texts).split()
+    words = [word for word in words if word not in stop_words]
+    if exclude_words:
+        exclude = exclude_words.split(',')
+        words = [word for word in words if word not in exclude]
+    return words
+
+
+def word_frequencies(texts, stop_words, exclude_words='', engine='pandas'):
+    if engine == 'polars':
+        return polars_backend.word_frequencies(texts, stop_words, exclude_words)
+    return pd.DataFrame(FreqDist(analyze_text(texts, stop_words, exclude_words)).most_common(), columns=['word', 'count'])
+
+
+# Most frequent n-grams of the joined word sequence
+def ngram_frequencies(texts, stop_words, exclude_words, n, limit=50, engine='pandas'):
+    if engine == 'polars':
+        return polars_backend.ngram_frequencies(texts, stop_words, exclude_words, n, limit)
+    n_grams = ngrams(analyze_text(texts, stop_words, exclude_words), n)
+    n_grams_df = pd.DataFrame(FreqDist(n_grams).most_common(limit), columns=['ngram', 'count'])
+    n_grams_df['ngram'] = n_grams_df['ngram'].apply(lambda x: ' '.join(x))
+    return n_grams_df
+
@@ -0,0 +1,112 @@
+"""Topic discovery for reviews no taxonomy keyword matched: TF-IDF features clustered with mini-batch k-means."""
+import numpy as np
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+from sklearn.preprocessing import normalize
+
+from features import column_terms
+
+CHUNK_SIZE = 10000
+# Terms are named from a sample, so memory does not grow with the number of reviews
+VOCABULARY_SAMPLE = 20000
+MAX_FEATURES = 20000
+FIT_PASSES = 3
+
+
+class Topics:
+    """Cluster of every row plus a summary table of each cluster's size, top terms and an example.
+
+    When there is too little text to cluster, both are empty and `message` says why.
+    """
+
+    def __init__(self, assignments, summary, message=None):
+        self.assignments = assignments
+        self.summary = summary
+        self.message = message
+
+    def estimated_size(self):
+        return int(self.assignments.memory_usage(deep=True) + self.summary.memory_usage(deep=True).sum())
+
+
+def _no_topics(message):
+    summary = pd.DataFrame({'topic': pd.Series(dtype=np.int64), 'reviews': pd.Series(dtype=np.int64),
+                            'top_terms': pd.Series(dtype=object), 'example': pd.Series(dtype=object)})
+    return Topics(pd.Series(dtype=np.int32), summary, message)
+
+
+def _chunks(rows, chunk_size):
+    for start in range(0, len(rows), chunk_size):
+        yield start, rows[start:start + chunk_size]
+
+
+# Unigrams and bigrams made only of content words
+def _is_topic_term(term):
+    return not any(word in ENGLISH_STOP_WORDS for word in term.split())
+
+
+def discover_topics(features, texts, num_topics=10, top_terms=10, chunk_size=CHUNK_SIZE, seed=0, progress=None):
+    """Cluster `texts` into `num_topics` topics using the dataset's hashed feature store.
+
+    `texts` are normalized review texts indexed by their row positions in the dataset
+    `features` was built from. Each distinct text is clustered once, weighted by how
+    often it occurs; feature rows are read from the memory-mapped store and turned
+    into TF-IDF one chunk at a time for MiniBatchKMeans.partial_fit.
+    """
+    feature_rows, inverse = np.unique(features.codes[texts.index.to_numpy()], return_inverse=True)
+    weights = np.bincount(inverse).astype(float)
+    if len(feature_rows) < num_topics:
+        return _no_topics(f"Only {len(feature_rows):,} distinct reviews, fewer than the {num_topics} topics asked for; "
+                          f"ask for fewer topics or pick a larger group of reviews.")
+
+    # Vocabulary: content-word columns seen in a sample, ranked by document frequency
+    sample = texts.sample(min(len(texts), VOCABULARY_SAMPLE), random_state=seed)
+    names = {column: term for column, term in column_terms(sample, None).items() if _is_topic_term(term)}
+    doc_freq = np.zeros(features.matrix.shape[1], dtype=np.int64)
+    for _, rows in _chunks(feature_rows, chunk_size):
+        doc_freq += np.bincount(features.matrix[rows].indices, minlength=len(doc_freq))
+    candidates = np.array(sorted(names), dtype=np.int64)
+    min_df = 2 if len(feature_rows) > 100 else 1
+    candidates = candidates[doc_freq[candidates] >= min_df]
+    columns = candidates[np.argsort(-doc_freq[candidates], kind='stable')[:MAX_FEATURES]]
+    if len(columns) == 0:
+        return _no_topics("No content word occurs in enough of these reviews to tell topics apart; "
+                          "pick a larger or more varied group of reviews.")
+    idf = np.log((1 + len(feature_rows)) / (1 + doc_freq[columns])) + 1
+
+    def tfidf(rows):
+        counts = features.matrix[rows][:, columns].tocsr()
+        counts.data = 1 + np.log(counts.data)
+        return normalize(counts.multiply(idf).tocsr())
+
+    kmeans = MiniBatchKMeans(n_clusters=num_topics, random_state=seed, batch_size=min(chunk_size, 4096), n_init=3)
+    total = (FIT_PASSES + 1) * len(feature_rows)
+    if len(feature_rows) <= chunk_size:
+        kmeans.fit(tfidf(feature_rows), sample_weight=weights)
+    else:
+        # Stream a few passes over the chunks; only one chunk of features is in memory at a time
+        for epoch in range(FIT_PASSES):
+            for start, rows in _chunks(feature_rows, chunk_size):
+                if progress is not None:
+                    progress((epoch * len(feature_rows) + start) / total, f"Clustering pass {epoch + 1}: {start:,} of {len(feature_rows):,} distinct reviews")
+                kmeans.partial_fit(tfidf(rows), sample_weight=weights[start:start + len(rows)])
+
+    labels = np.empty(len(feature_rows), dtype=np.int32)
+    for start, rows in _chunks(feature_rows, chunk_size):
+        if progress is not None:
+            progress((FIT_PASSES * len(feature_rows) + start) / total, f"Assigned {start:,} of {len(feature_rows):,} distinct reviews")
+        labels[start:start + len(rows)] = kmeans.predict(tfidf(rows))
+
+    order = np.argsort(-kmeans.cluster_centers_, axis=1)[:, :top_terms]
+    sizes = np.bincount(labels, weights=weights, minlength=num_topics).astype(int)
+    # The most frequent text of each cluster serves as its example
+    first_position = pd.Series(np.arange(len(texts))).groupby(inverse).first().to_numpy()
+    best = pd.DataFrame({'topic': labels, 'weight': weights}).sort_values('weight', ascending=False).drop_duplicates('topic')
+    examples = pd.Series(texts.to_numpy()[first_position[best.index]], index=best['topic'].to_numpy())
+    summary = pd.DataFrame({
+        'topic': np.arange(num_topics),
+        'reviews': sizes,
+        'top_terms': [', '.join(names[columns[i]] for i in row if center[i] > 0) for row, center in zip(order, kmeans.cluster_centers_)],
+        'example': [examples.get(topic, '') for topic in range(num_topics)],
+    }).sort_values('reviews', ascending=False, ignore_index=True)
+    return Topics(pd.Series(labels[inverse], index=texts.index), summary)
@@ -0,0 +1,174 @@
+"""Local DuckDB warehouse of every labeled and scored dataset, for analysis across runs.
+
+Each saved dataset is one run: a row in ``runs`` (run ID, source app or file, time and
+the dataset's artifact key) and its reviews in ``reviews``. The Text2Insights and tree
+map summaries are plain SQL over any set of runs, so comparing months of history does
+not need the original sessions.
+"""
+import os
+import threading
+import uuid
+from datetime import datetime
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+
+from shared_cache import CACHE_DIR
+
+WAREHOUSE_PATH = os.environ.get('REVAI_WAREHOUSE', os.path.join(CACHE_DIR, 'warehouse.duckdb'))
+INSERT_CHUNK = 100_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id VARCHAR PRIMARY KEY,
+    source VARCHAR,
+    created_at TIMESTAMP,
+    dataset_key VARCHAR UNIQUE,
+    rows BIGINT
+);
+CREATE TABLE IF NOT EXISTS reviews (
+    run_id VARCHAR,
+    review VARCHAR,
+    clean_review VARCHAR,
+    review_date TIMESTAMP,
+    rating DOUBLE,
+    label VARCHAR,
+    category VARCHAR,
+    sentiment DOUBLE,
+    sentiment_type VARCHAR
+);
+"""
+
+
+class Warehouse:
+    """One DuckDB file opened once per process; every thread queries through its own cursor."""
+
+    def __init__(self, path=WAREHOUSE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = duckdb.connect(path)
+        self._connection.execute(_SCHEMA)
+        self._write_lock = threading.Lock()
+
+    def _cursor(self):
+        return self._connection.cursor()
+
+    def query(self, sql, params=None):
+        return self._cursor().execute(sql, params or []).df()
+
+    # Run ID already saved for an artifact key, if any
+    def find_run(self, dataset_key):
+        row = self._cursor().execute('SELECT run_id FROM runs WHERE dataset_key = ?', [dataset_key]).fetchone()
+        return row[0] if row else None
+
+    def append_run(self, frame, source, dataset_key, progress=None):
+        """Save a scored frame as a new run and return its run ID.
+
+        A dataset already saved under `dataset_key` is not appended twice. Rows are
+        inserted in chunks inside one transaction, so a cancelled save leaves nothing behind.
+        """
+        with self._write_lock:
+            existing = self.find_run(dataset_key)
+            if existing is not None:
+                return existing
+            run_id = uuid.uuid4().hex[:12]
+            cursor = self._cursor()
+            cursor.execute('BEGIN TRANSACTION')
+            try:
+                for start in range(0, len(frame), INSERT_CHUNK):
+                    if progress is not None:
+                        progress(start / max(len(frame), 1), f"Saved {start:,} of {len(frame):,} reviews")
+                    batch = _reviews_table(frame.iloc[start:start + INSERT_CHUNK])
+                    cursor.register('batch', batch)
+                    cursor.execute('INSERT INTO reviews SELECT ?, * FROM batch', [run_id])
+                    cursor.unregister('batch')
+                cursor.execute('INSERT INTO runs VALUES (?, ?, ?, ?, ?)',
+                               [run_id, source, datetime.now(), dataset_key, len(frame)])
+                cursor.execute('COMMIT')
+            except BaseException:
+                cursor.execute('ROLLBACK')
+                raise
+            return run_id
+
+    def runs(self):
+        return self.query('SELECT * FROM runs ORDER BY created_at DESC')
+
+    # Reviews per sentiment type for each run
+    def sentiment_breakdown(self, run_ids):
+        return self.query(f"""
+            SELECT r.run_id, r.source, r.created_at, v.sentiment_type AS sentiment, count(*) AS count
+            FROM reviews v JOIN runs r USING (run_id)
+            WHERE {_in_runs(run_ids)}
+            GROUP BY ALL ORDER BY r.created_at, sentiment
+        """, list(run_ids))
+
+    # Reviews per month of review date (scrape time for undated reviews) and sentiment type
+    def monthly_sentiment(self, run_ids):
+        return self.query(f"""
+            SELECT date_trunc('month', coalesce(v.review_date, r.created_at)) AS month,
+                   v.sentiment_type AS sentiment, count(*) AS count, avg(v.sentiment) AS mean_polarity
+            FROM reviews v JOIN runs r USING (run_id)
+            WHERE {_in_runs(run_ids)}
+            GROUP BY ALL ORDER BY month, sentiment
+        """, list(run_ids))
+
+    # Same counts as the tree map's groupby over Label, Category and sentiment type
+    def treemap_counts(self, run_ids, sentiment=None):
+        condition = '' if sentiment in (None, 'All') else 'AND sentiment_type = ?'
+        params = list(run_ids) + ([] if sentiment in (None, 'All') else [sentiment])
+        return self.query(f"""
+            SELECT label AS "Label", category AS "Category", sentiment_type, count(*) AS counts
+            FROM reviews
+            WHERE {_in_runs(run_ids)} AND label IS NOT NULL AND category IS NOT NULL
+                AND sentiment_type IS NOT NULL {condition}
+            GROUP BY ALL ORDER BY ALL
+        """, params)
+
+    # Occurrences of every word per sentiment type, for keyness.keyness_from_counts
+    def sentiment_term_counts(self, run_ids, stop_words=()):
+        return self.query(f"""
+            SELECT sentiment_type AS value, word, count(*) AS count
+            FROM (SELECT sentiment_type, unnest(string_split(clean_review, ' ')) AS word
+                  FROM reviews WHERE {_in_runs(run_ids)} AND sentiment_type IS NOT NULL)
+            WHERE word <> '' AND NOT list_contains(?, word)
+            GROUP BY ALL ORDER BY value, word
+        """, list(run_ids) + [sorted(stop_words)])
+
+
+def _in_runs(run_ids):
+    return f"run_id IN ({', '.join('?' * len(run_ids))})" if run_ids else 'FALSE'
+
+
+def _column(frame, name, dtype):
+    if name in frame.columns:
+        return frame[name]
+    return pd.Series(None, index=frame.index, dtype=dtype)
+
+
+def _reviews_table(frame):
+    dates = pd.to_datetime(_column(frame, 'Date', 'datetime64[us]'), errors='coerce')
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_convert(None)
+    return pa.table({
+        'review': pa.array(frame['Review'].astype('str').array, pa.string()),
+        'clean_review': pa.array(frame['clean_review'].astype('str').array, pa.string()),
+        'review_date': pa.array(dates.astype('datetime64[us]'), pa.timestamp('us')),
+        'rating': pa.array(pd.to_numeric(_column(frame, 'Rating', float), errors='coerce'), pa.float64()),
+        'label': pa.array(frame['Label'].astype('str').array, pa.string()),
+        'category': pa.array(frame['Category'].astype('str').array, pa.string()),
+        'sentiment': pa.array(frame['sentiment'].astype(float), pa.float64()),
+        'sentiment_type': pa.array(frame['sentiment_type'].astype('str').array, pa.string()),
+    })
+
+
+_warehouse = None
+_warehouse_lock = threading.Lock()
+
+
+def get_warehouse():
+    global _warehouse
+    with _warehouse_lock:
+        if _warehouse is None:
+            _warehouse = Warehouse()
+        return _warehouse